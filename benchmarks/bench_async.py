@@ -0,0 +1,51 @@
+"""Measure add_expense latency of AsyncExpenseTracker as the number of concurrent users grows.
+
+Run with: python -m benchmarks.bench_async
+"""
+import asyncio
+import contextlib
+import io
+import shutil
+import tempfile
+import time
+
+from src.aio import AsyncExpenseTracker
+
+USERS = (1, 10, 100)
+LEDGERS = 10  # Users share these ledgers round-robin
+ADDS = 20  # Per user
+
+
+async def user(tracker: AsyncExpenseTracker, name: int, latencies: list):
+    for row in range(ADDS):
+        start = time.perf_counter()
+        await tracker.add_expense(f"2024-01-01 00:00:00\tUser {name}\t$1.00\tRow {row}")
+        latencies.append(time.perf_counter() - start)
+
+
+async def run(users: int, directory: str) -> list:
+    with contextlib.redirect_stdout(io.StringIO()):
+        trackers = [await AsyncExpenseTracker.open(f"ledger{users}_{ledger}.txt", directory)
+                    for ledger in range(LEDGERS)]
+    latencies = []
+    await asyncio.gather(*(user(trackers[name % LEDGERS], name, latencies) for name in range(users)))
+    for tracker in trackers:
+        await tracker.close()
+    return sorted(latencies)
+
+
+def main():
+    directory = tempfile.mkdtemp()
+    try:
+        print(f"{'users':>6} {'p50 ms':>8} {'p99 ms':>8}")
+        for users in USERS:
+            latencies = asyncio.run(run(users, directory))
+            p50 = latencies[len(latencies) // 2] * 1000
+            p99 = latencies[int(len(latencies) * 0.99)] * 1000
+            print(f"{users:>6} {p50:>8.2f} {p99:>8.2f}")
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+"""Compare adding expenses one by one with add_expense against add_expenses.
+
+Run with: python -m benchmarks.bench_bulk_add
+"""
+import contextlib
+import io
+import shutil
+import tempfile
+import time
+
+from src.expense import ExpenseTracker
+from src.record import Expense
+
+ROWS = 20_000
+
+
+def expenses(rows: int):
+    return [Expense(1_700_000_000 + idx, f"Category {idx % 10}", idx % 10_000, f"Expense {idx}")
+            for idx in range(rows)]
+
+
+def main():
+    directory = tempfile.mkdtemp()
+    try:
+        rows = expenses(ROWS)
+        looped = ExpenseTracker(file_path="looped.txt", directory=directory)
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            for expense in rows:
+                looped.add_expense(expense)
+        loop_time = time.perf_counter() - start
+
+        bulk = ExpenseTracker(file_path="bulk.txt", directory=directory)
+        start = time.perf_counter()
+        bulk.add_expenses(rows, fsync=True)
+        bulk_time = time.perf_counter() - start
+
+        assert looped.get_expenses() == bulk.get_expenses()
+        print(f"{'method':>12} {'seconds':>9} {'rows/s':>12}")
+        print(f"{'add_expense':>12} {loop_time:>9.3f} {ROWS / loop_time:>12,.0f}")
+        print(f"{'add_expenses':>12} {bulk_time:>9.3f} {ROWS / bulk_time:>12,.0f}")
+        print(f"speed-up: {loop_time / bulk_time:.1f}x")
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == "__main__":
+    main()
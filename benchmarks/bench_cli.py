@@ -0,0 +1,51 @@
+"""Time one-shot `add` calls and a piped `bulk-add` through main.py on a large ledger.
+
+Every call is a fresh process, as it is for scripts, so the times include
+interpreter startup; the bare startup time is printed for reference.
+
+Run with: python -m benchmarks.bench_cli
+"""
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.bench_suite import START, generate_lines, generate_ledger
+
+ROOT = Path(__file__).resolve().parent.parent
+ROWS = 1_000_000
+BULK_ROWS = 100_000
+REPEAT = 10
+
+
+def run(argv: list, stdin: str = None) -> float:
+    """Wall time of one process, in seconds"""
+    start = time.perf_counter()
+    subprocess.run(argv, input=stdin, text=True, cwd=ROOT, check=True, stdout=subprocess.DEVNULL)
+    return time.perf_counter() - start
+
+
+def main():
+    directory = Path(tempfile.mkdtemp())
+    try:
+        generate_ledger(directory / "ledger.txt", ROWS)
+        cli = [sys.executable, "main.py", "--directory", str(directory), "--file", "ledger.txt"]
+        # Build every sidecar once, as a ledger in use would have them
+        run(cli + ["search", "coffee"])
+        run(cli + ["summary"])
+        run(cli + ["list", "--range", "2020-01-01", "2020-01-01"])
+        bare = min(run([sys.executable, "-c", "pass"]) for _ in range(REPEAT))
+        add = min(run(cli + ["add", "Food", "12.50", "Benchmark lunch"]) for _ in range(REPEAT))
+        rows = "".join(generate_lines(BULK_ROWS, start=START + 600 * ROWS))
+        bulk = run(cli + ["bulk-add"], rows)
+        print(f"python startup:            {bare * 1000:8.1f} ms")
+        print(f"add on {ROWS:,} rows:   {add * 1000:8.1f} ms")
+        print(f"bulk-add of {BULK_ROWS:,} rows: {bulk:8.2f} s ({BULK_ROWS / bulk:,.0f} rows/s)")
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == "__main__":
+    main()
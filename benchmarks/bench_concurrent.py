@@ -0,0 +1,52 @@
+"""Measure append throughput of several processes sharing one ledger, with and without the WAL.
+
+Run with: python -m benchmarks.bench_concurrent
+"""
+import multiprocessing
+import shutil
+import tempfile
+import time
+
+from src.expense import ExpenseTracker
+
+PROCESSES = 4
+ROWS = 2_000  # Per process, added one at a time
+
+
+def write_rows(directory: str, writer: int, wal: bool):
+    tracker = ExpenseTracker(file_path="shared.txt", directory=directory, wal=wal)
+    for row in range(ROWS):
+        tracker.add_expenses([f"2024-01-01 00:00:00\tWriter {writer}\t$1.00\tRow {row}"])
+    tracker.close()
+
+
+def run(wal: bool) -> float:
+    directory = tempfile.mkdtemp()
+    try:
+        tracker = ExpenseTracker(file_path="shared.txt", directory=directory)
+        context = multiprocessing.get_context("fork")
+        processes = [context.Process(target=write_rows, args=(directory, writer, wal))
+                     for writer in range(PROCESSES)]
+        start = time.perf_counter()
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+        total = tracker.get_total_lines()  # Also moves any logged rows into the ledger
+        elapsed = time.perf_counter() - start
+        assert total == PROCESSES * ROWS, f"lost writes: {total} of {PROCESSES * ROWS}"
+        return elapsed
+    finally:
+        shutil.rmtree(directory)
+
+
+def main():
+    print(f"{PROCESSES} processes x {ROWS:,} single-row appends")
+    print(f"{'mode':>8} {'seconds':>9} {'rows/s':>12}")
+    for wal in (False, True):
+        elapsed = run(wal)
+        print(f"{'wal' if wal else 'locked':>8} {elapsed:>9.3f} {PROCESSES * ROWS / elapsed:>12,.0f}")
+
+
+if __name__ == "__main__":
+    main()
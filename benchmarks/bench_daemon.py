@@ -0,0 +1,82 @@
+"""Time requests to a ledger daemon against one-shot CLI processes, on a large ledger.
+
+Run with: python -m benchmarks.bench_daemon
+"""
+import shutil
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from benchmarks.bench_suite import generate_ledger
+from src.client import LedgerClient
+
+ROOT = Path(__file__).resolve().parent.parent
+ROWS = 1_000_000
+REQUESTS = 2_000
+CLIENTS = 8
+LINE = "2030-01-01 12:00:00\tFood\t$12.50\tBenchmark lunch"
+
+
+def latencies(function, count: int = REQUESTS) -> list:
+    times = []
+    for number in range(count):
+        start = time.perf_counter()
+        function(number)
+        times.append(time.perf_counter() - start)
+    return sorted(times)
+
+
+def percentile(times: list, fraction: float) -> float:
+    return times[min(len(times) - 1, int(fraction * len(times)))]
+
+
+def main():
+    directory = Path(tempfile.mkdtemp())
+    socket_path = directory / "tracker.sock"
+    daemon = None
+    try:
+        generate_ledger(directory / "ledger.txt", ROWS)
+        daemon = subprocess.Popen([sys.executable, "-m", "src.daemon", "--directory", str(directory),
+                                   "--socket", str(socket_path)], cwd=ROOT, stdout=subprocess.PIPE, text=True)
+        daemon.stdout.readline()
+        with LedgerClient(socket_path, "ledger.txt") as client:
+            # Warm the ledger's indexes and caches, as a long-running daemon would have them
+            client.find_expense(ROWS)
+            list(client.search("coffee"))
+            client.totals()
+            print(f"{'request':>10} {'p50 (ms)':>10} {'p99 (ms)':>10}")
+            # Every search word is in about 1 row in 16, so a search returns tens of thousands of lines
+            for name, function, count in (("find", lambda number: client.find_expense(number * 499 % ROWS + 1),
+                                           REQUESTS),
+                                          ("search", lambda number: list(client.search("airport")), 20),
+                                          ("totals", lambda number: client.totals(), REQUESTS),
+                                          ("add", lambda number: client.add_expense(LINE), REQUESTS)):
+                times = latencies(function, count)
+                print(f"{name:>10} {percentile(times, 0.5) * 1000:>10.3f} {percentile(times, 0.99) * 1000:>10.3f}")
+
+        def add_many(_):
+            with LedgerClient(socket_path, "ledger.txt") as client:
+                for _ in range(REQUESTS // CLIENTS):
+                    client.add_expense(LINE)
+        start = time.perf_counter()
+        with ThreadPoolExecutor(CLIENTS) as pool:
+            list(pool.map(add_many, range(CLIENTS)))
+        print(f"{CLIENTS} clients adding: {REQUESTS / (time.perf_counter() - start):,.0f} adds/s")
+
+        cli = [sys.executable, "main.py", "--directory", str(directory), "--file", "ledger.txt", "search", "airport"]
+        start = time.perf_counter()
+        subprocess.run(cli, cwd=ROOT, check=True, stdout=subprocess.DEVNULL)
+        print(f"one-shot CLI search: {(time.perf_counter() - start) * 1000:.1f} ms")
+    finally:
+        if daemon is not None:
+            daemon.send_signal(signal.SIGTERM)
+            daemon.wait()
+        shutil.rmtree(directory)
+
+
+if __name__ == "__main__":
+    main()
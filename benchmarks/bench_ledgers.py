@@ -0,0 +1,44 @@
+"""Measure how LedgerSet summaries scale with worker processes over many small ledgers.
+
+Run with: python -m benchmarks.bench_ledgers
+"""
+import os
+import shutil
+import tempfile
+import time
+from pathlib import Path
+
+from src.ledgers import LedgerSet
+
+LEDGERS = 2_000
+ROWS = 500  # Per ledger
+
+
+def write_ledgers(directory: Path):
+    for ledger in range(LEDGERS):
+        lines = (f"2024-{ledger % 12 + 1:02d}-{row % 28 + 1:02d} 12:00:00\tCategory {row % 10}\t"
+                 f"${row % 500}.{row % 100:02d}\tLedger {ledger} row {row}\n" for row in range(ROWS))
+        (directory / f"user{ledger}.txt").write_text("".join(lines))
+
+
+def main():
+    directory = Path(tempfile.mkdtemp())
+    try:
+        write_ledgers(directory)
+        print(f"{LEDGERS:,} ledgers x {ROWS:,} rows")
+        print(f"{'workers':>8} {'seconds':>9} {'speed-up':>9}")
+        single = None
+        workers = 1
+        while workers <= (os.cpu_count() or 1):
+            start = time.perf_counter()
+            LedgerSet(directory, workers=workers).summary("month")
+            elapsed = time.perf_counter() - start
+            single = single or elapsed
+            print(f"{workers:>8} {elapsed:>9.3f} {single / elapsed:>8.1f}x")
+            workers *= 2
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""Compare the integer-cents money codec with parsing and formatting amounts through float.
+
+Run with: python -m benchmarks.bench_money [--rows 1000000]
+"""
+import argparse
+import random
+import timeit
+
+from benchmarks.bench_suite import SEED
+from src import record
+from src.record import format_amount, parse_amount, parse_amounts
+
+ROWS = 1_000_000
+REPEAT = 5
+
+
+def float_parse(text: str) -> float:
+    """The old menu's path: strip the currency and go through float"""
+    return float(text.lstrip("$"))
+
+
+def best(function) -> float:
+    return min(timeit.repeat(function, number=1, repeat=REPEAT))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--rows", type=int, default=ROWS)
+    args = parser.parse_args(argv)
+    rng = random.Random(SEED)
+    cents = rng.choices(range(1, 50_000), k=args.rows)
+    texts = [format_amount(amount) for amount in cents]
+    floats = [amount / 100 for amount in cents]
+
+    distinct = [format_amount(amount) for amount in range(args.rows)]
+
+    def parse_new():
+        record._CENTS.clear()
+        return [parse_amount(text) for text in distinct]
+
+    results = (
+        ("parse float", best(lambda: [float_parse(text) for text in texts])),
+        ("parse float to cents", best(lambda: [round(float_parse(text) * 100) for text in texts])),
+        ("parse_amount, all new", best(parse_new)),
+        ("parse_amount", best(lambda: [parse_amount(text) for text in texts])),
+        ("parse_amounts column", best(lambda: parse_amounts(texts))),
+        ("format float '${:.2f}'", best(lambda: [f"${amount:.2f}" for amount in floats])),
+        ("format_amount", best(lambda: [format_amount(amount) for amount in cents])),
+        ("sum float", best(lambda: sum(floats))),
+        ("sum cents", best(lambda: sum(cents))),
+    )
+    # Ledger amounts repeat: rows draw from 50k values, as in bench_suite's synthetic ledgers
+    print(f"{'operation':>26} {'ns/row':>8}")
+    for name, seconds in results:
+        print(f"{name:>26} {seconds / args.rows * 1e9:>8.0f}")
+    print(f"float total {sum(floats)!r} vs exact {format_amount(sum(cents))}")
+
+
+if __name__ == "__main__":
+    main()
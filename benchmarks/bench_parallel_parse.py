@@ -0,0 +1,44 @@
+"""Compare parsing one large ledger in a single process with parse_ledger's worker processes.
+
+Run with: python -m benchmarks.bench_parallel_parse
+"""
+import os
+import shutil
+import tempfile
+import time
+from pathlib import Path
+
+from src.parallel import parse_ledger
+from src.record import Expense, ExpenseTable
+
+ROWS = 1_000_000
+
+
+def main():
+    directory = Path(tempfile.mkdtemp())
+    try:
+        path = directory / "large.txt"
+        with path.open("w") as f:
+            for start in range(0, ROWS, 100_000):
+                f.write("".join(Expense(1_700_000_000 + row, f"Category {row % 20}", row % 10_000,
+                                        f"Expense {row}").to_line() + "\n"
+                                for row in range(start, min(start + 100_000, ROWS))))
+        start = time.perf_counter()
+        with path.open() as f:
+            expected = ExpenseTable.from_lines(f)
+        single = time.perf_counter() - start
+        print(f"{ROWS:,} rows, {path.stat().st_size / 1e6:.0f} MB")
+        print(f"{'workers':>8} {'seconds':>9} {'speed-up':>9}")
+        print(f"{'1 (seq)':>8} {single:>9.3f} {1:>8.1f}x")
+        for workers in sorted({2, 4, os.cpu_count() or 1}):
+            start = time.perf_counter()
+            table = parse_ledger(path, workers=workers)
+            elapsed = time.perf_counter() - start
+            assert len(table) == len(expected)
+            print(f"{workers:>8} {elapsed:>9.3f} {single / elapsed:>8.1f}x")
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == "__main__":
+    main()
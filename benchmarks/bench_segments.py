@@ -0,0 +1,64 @@
+"""Compare a segmented ledger with a text ledger: disk size, cold summaries and narrow queries.
+
+Run with: python -m benchmarks.bench_segments [--rows 1000000]
+"""
+import argparse
+import shutil
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.bench_suite import START, generate_ledger
+from src.expense import ExpenseTracker
+from src.segments import SegmentedBackend
+
+ROWS = 1_000_000
+DAY = 86400
+
+
+def disk_size(path: Path) -> int:
+    """Bytes of a ledger with its sidecars, or of a segment directory"""
+    if path.is_dir():
+        return sum(child.stat().st_size for child in path.iterdir())
+    return sum(child.stat().st_size for child in path.parent.glob(path.name + "*"))
+
+
+def timed(function) -> float:
+    start = time.perf_counter()
+    function()
+    return time.perf_counter() - start
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--rows", type=int, default=ROWS)
+    args = parser.parse_args(argv)
+    directory = Path(tempfile.mkdtemp())
+    try:
+        text = directory / "ledger.txt"
+        generate_ledger(text, args.rows)
+        lines = text.read_text().splitlines()
+        # Rows are about 5 minutes apart, so a week near the end is a narrow slice of the ledger
+        end = START + args.rows * 300
+        week = (end - 14 * DAY, end - 7 * DAY)
+        print(f"{'ledger':>16} {'build (s)':>10} {'disk (MB)':>10} {'summary (s)':>12} {'week (ms)':>10}")
+        for name, make in (("text", lambda: ExpenseTracker("ledger.txt", directory)),
+                           ("segments zlib", lambda: ExpenseTracker(backend=SegmentedBackend(
+                               directory / "zlib.seg", codec="zlib"))),
+                           ("segments lzma", lambda: ExpenseTracker(backend=SegmentedBackend(
+                               directory / "lzma.seg", codec="lzma")))):
+            if name == "text":
+                build = 0.0
+            else:
+                build = timed(lambda: make().add_expenses(lines))
+            tracker = make()  # Reopened, so the summary below is not served from a warm cache
+            path = directory / "ledger.txt" if name == "text" else tracker._backend.path
+            summary = timed(lambda: tracker.summary("month"))
+            query = timed(lambda: list(tracker.query_range(*week)))
+            print(f"{name:>16} {build:>10.2f} {disk_size(path) / 1e6:>10.1f} {summary:>12.3f} {query * 1000:>10.1f}")
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == "__main__":
+    main()
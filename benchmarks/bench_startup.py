@@ -0,0 +1,50 @@
+"""Time opening an ExpenseTracker on ledgers of growing size.
+
+Run with: python -m benchmarks.bench_startup
+"""
+import shutil
+import tempfile
+import time
+from pathlib import Path
+
+from src.expense import ExpenseTracker
+
+SIZES = [10_000, 100_000, 1_000_000]
+REPEAT = 20
+LINE = "2024-01-01 12:00:00\tFood\t$12.50\tLunch with the team\n"
+
+
+def write_ledger(path: Path, rows: int):
+    with path.open("w") as f:
+        for _ in range(0, rows, 10_000):
+            f.write(LINE * min(10_000, rows))
+
+
+def time_open(name: str, directory: str) -> float:
+    """Best wall time, in milliseconds, of opening the ledger"""
+    best = float("inf")
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        ExpenseTracker(file_path=name, directory=directory)
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def main():
+    directory = tempfile.mkdtemp()
+    try:
+        print(f"{'rows':>10} {'first open (ms)':>16} {'cached open (ms)':>17}")
+        for rows in SIZES:
+            name = f"ledger_{rows}.txt"
+            write_ledger(Path(directory) / name, rows)
+            start = time.perf_counter()
+            tracker = ExpenseTracker(file_path=name, directory=directory)
+            tracker.find_expense(rows)  # Builds and persists the line index
+            first = (time.perf_counter() - start) * 1000
+            print(f"{rows:>10} {first:>16.2f} {time_open(name, directory):>17.3f}")
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == "__main__":
+    main()
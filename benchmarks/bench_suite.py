@@ -0,0 +1,231 @@
+"""Time ExpenseTracker's hot paths on synthetic ledgers and compare them with a stored baseline.
+
+Every operation is timed as the best of a few repeats, per call, and its
+peak memory is measured in a separate traced call. Results are written as
+JSON; given a baseline, any operation that got slower or hungrier by more
+than the tolerance is reported and the run exits with status 1. A fixed
+reference workload is timed in every run, and baseline timings are scaled
+by how much slower or faster it ran, so a baseline recorded on another
+machine, or a busy one, still compares fairly.
+
+Run with: python -m benchmarks.bench_suite [--sizes 1k,100k,10m] [--output results.json]
+          [--baseline benchmarks/baseline.json] [--save-baseline]
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+from src.expense import ExpenseTracker
+from src.record import Expense, format_amount, format_timestamp, parse_timestamp
+
+SIZES = "1k,100k"
+BASELINE = Path(__file__).with_name("baseline.json")
+REPEAT = 3
+MIN_REPEAT = 3  # Fewer runs per operation make the best time too noisy to compare
+TOLERANCE = 0.5  # Allowed slowdown or growth before a result counts as a regression
+MIN_SECONDS = 0.001  # Smaller differences per call are timer noise
+REFERENCE_CALLS = 10
+REFERENCE_LINES = [f"{row * 7919 % 100_003:06d}\tFood\t${row % 500}.00\tReference row" for row in range(20_000)]
+MIN_BYTES = 64 << 10  # Smaller differences in peak memory are noise
+SEED = 42
+START = parse_timestamp("2020-01-01 00:00:00")
+CHUNK_ROWS = 100_000  # Rows generated per write
+BULK_ROWS = 10_000  # Rows per add_expenses call
+
+CATEGORIES = ["Food", "Transport", "Rent", "Utilities", "Health", "Leisure", "Travel", "Shopping"]
+DESCRIPTIONS = ["Lunch with the team", "Bus fare", "Weekly groceries", "Morning coffee", "Electricity bill",
+                "Cinema tickets", "Train to the airport", "New running shoes", "Pharmacy", "Dinner out",
+                "Taxi home", "Phone plan", "Books", "Gym membership", "Hotel night", "Parking"]
+SEARCH_TERMS = ["coffee", "groceries", "train airport", "food", "parking"]
+
+# Calls per repeat: operations that rewrite the ledger are O(rows), so they run fewer times on big ones
+CALLS = {"init": 5, "find": 1000, "search": 20, "summary": 1, "add": 100, "update": 20, "remove": 20,
+         "bulk_add": 1}
+LARGE_CALLS = {"remove": 2, "update": 2, "add": 20, "find": 200, "search": 5}
+LARGE_ROWS = 1_000_000
+
+
+def parse_size(text: str) -> int:
+    """Rows for a size such as '1k', '100k' or '10m'"""
+    text = text.strip().lower()
+    scale = {"k": 1_000, "m": 1_000_000}.get(text[-1:], 1)
+    return int(text.rstrip("km")) * scale
+
+
+def generate_lines(rows: int, seed: int = SEED, start: int = START):
+    """Yield chunks of ledger text with increasing timestamps, drawn from small pools of values.
+
+    Timestamps and amounts are random but formatting is cached, so this is
+    fast enough for ledgers of tens of millions of rows.
+    """
+    rng = random.Random(seed)
+    timestamp = start
+    for first in range(0, rows, CHUNK_ROWS):
+        count = min(CHUNK_ROWS, rows - first)
+        steps = rng.choices(range(1, 600), k=count)
+        categories = rng.choices(CATEGORIES, k=count)
+        descriptions = rng.choices(DESCRIPTIONS, k=count)
+        amounts = rng.choices(range(1, 50_000), k=count)
+        lines = []
+        for step, category, amount, description in zip(steps, categories, amounts, descriptions):
+            timestamp += step
+            lines.append(f"{format_timestamp(timestamp)}\t{category}\t{format_amount(amount)}\t{description}\n")
+        yield "".join(lines)
+
+
+def generate_ledger(path: Path, rows: int, seed: int = SEED):
+    with path.open("w") as f:
+        for chunk in generate_lines(rows, seed):
+            f.write(chunk)
+
+
+def measure(operation, calls: int, repeat: int) -> dict:
+    """Best time per call over `repeat` runs of `calls` calls, then the peak memory of one traced call"""
+    best = float("inf")
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _ in range(repeat):
+            start = time.perf_counter()
+            for _ in range(calls):
+                operation()
+            best = min(best, (time.perf_counter() - start) / calls)
+        tracemalloc.start()
+        try:
+            operation()
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+    return {"seconds": best, "peak_bytes": peak}
+
+
+def reference():
+    """Interpreter-bound work that doesn't touch the tracker, so changes to it can't move this time"""
+    return sorted(line.split("\t")[0] for line in REFERENCE_LINES)
+
+
+def bench_size(directory: Path, rows: int, repeat: int) -> dict:
+    """Results of every operation on a fresh ledger of `rows` rows"""
+    name = f"ledger_{rows}.txt"
+    generate_ledger(directory / name, rows)
+    rng = random.Random(SEED)
+    calls = dict(CALLS, **(LARGE_CALLS if rows >= LARGE_ROWS else {}))
+    with contextlib.redirect_stdout(io.StringIO()):
+        tracker = ExpenseTracker(name, directory)
+        # Build every sidecar first, so each operation is timed in its steady state
+        tracker.find_expense(rows)
+        tracker.totals()
+        list(tracker.search(SEARCH_TERMS[0]))
+    later = START + 600 * rows
+    bulk = [Expense(later + row, CATEGORIES[row % len(CATEGORIES)], row, DESCRIPTIONS[row % len(DESCRIPTIONS)])
+            for row in range(BULK_ROWS)]
+
+    def line_number():
+        return rng.randrange(1, tracker.get_total_lines() + 1)
+
+    operations = {
+        "init": lambda: ExpenseTracker(name, directory).close(),
+        "find": lambda: tracker.find_expense(line_number()),
+        "search": lambda: list(tracker.search(rng.choice(SEARCH_TERMS))),
+        "summary": lambda: tracker.summary("category"),
+        "add": lambda: tracker.add_expense(Expense(later, "Food", 1250, "Benchmark lunch")),
+        "update": lambda: tracker.update_expense(line_number(), Expense(later, "Food", 990, "Updated").to_line()),
+        "remove": lambda: tracker.remove_expense(line_number()),
+        "bulk_add": lambda: tracker.add_expenses(bulk),  # Last, as it grows the ledger the most
+    }
+    results = {}
+    for operation, function in operations.items():
+        results[operation] = measure(function, calls[operation], repeat)
+    tracker.close()
+    return results
+
+
+def compare(results: dict, baseline: dict, tolerance: float = TOLERANCE, scale: float = 1.0) -> list:
+    """Messages for every operation slower or bigger than its baseline by more than the tolerance.
+
+    Baseline timings are multiplied by `scale`, this run's reference time over the baseline's.
+    """
+    regressions = []
+    for size, operations in results.items():
+        for operation, result in operations.items():
+            before = baseline.get(size, {}).get(operation)
+            if before is None:
+                continue
+            for key, noise, unit in (("seconds", MIN_SECONDS, "s"), ("peak_bytes", MIN_BYTES, "B")):
+                old, new = before[key] * (scale if key == "seconds" else 1), result[key]
+                if new > old * (1 + tolerance) and new - old > noise:
+                    regressions.append(f"{size} {operation} {key}: {old:.6g}{unit} -> {new:.6g}{unit} "
+                                       f"({new / old if old else float('inf'):.2f}x)")
+    return regressions
+
+
+def print_results(results: dict, baseline: dict):
+    print(f"{'size':>6} {'operation':>10} {'ms/call':>10} {'baseline':>10} {'peak KiB':>10} {'baseline':>10}")
+    for size, operations in results.items():
+        for operation, result in operations.items():
+            before = baseline.get(size, {}).get(operation, {})
+            old_ms = f"{before['seconds'] * 1000:.3f}" if before else "-"
+            old_kib = f"{before['peak_bytes'] / 1024:.0f}" if before else "-"
+            print(f"{size:>6} {operation:>10} {result['seconds'] * 1000:>10.3f} {old_ms:>10} "
+                  f"{result['peak_bytes'] / 1024:>10.0f} {old_kib:>10}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.bench_suite", description=__doc__.split("\n")[0])
+    parser.add_argument("--sizes", default=SIZES, help=f"comma-separated ledger sizes (default: {SIZES})")
+    parser.add_argument("--repeat", type=int, default=REPEAT,
+                        help=f"runs per operation, at least {MIN_REPEAT}; the best one counts")
+    parser.add_argument("--output", type=Path, help="write the results to this JSON file")
+    parser.add_argument("--baseline", type=Path, default=BASELINE, help="baseline JSON to compare with")
+    parser.add_argument("--save-baseline", action="store_true", help="store the results as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE,
+                        help=f"allowed relative slowdown or growth (default: {TOLERANCE})")
+    args = parser.parse_args(argv)
+
+    repeat = max(args.repeat, MIN_REPEAT)
+    # Timed first, before the ledgers below fill the heap
+    reference_seconds = measure(reference, REFERENCE_CALLS, repeat)["seconds"]
+    results = {}
+    directory = Path(tempfile.mkdtemp())
+    try:
+        for size in args.sizes.split(","):
+            results[size.strip().lower()] = bench_size(directory, parse_size(size), repeat)
+    finally:
+        shutil.rmtree(directory)
+    report = {"python": platform.python_version(), "platform": platform.platform(), "machine": platform.machine(),
+              "processor": platform.processor(), "cpus": os.cpu_count(),
+              "reference_seconds": reference_seconds, "results": results}
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2) + "\n")
+    if args.save_baseline:
+        args.baseline.write_text(json.dumps(report, indent=2) + "\n")
+        print_results(results, {})
+        print(f"Baseline saved to {args.baseline}")
+        return
+    stored = json.loads(args.baseline.read_text()) if args.baseline.exists() else None
+    baseline = stored["results"] if stored else {}
+    scale = report["reference_seconds"] / stored["reference_seconds"] if stored else 1.0
+    if stored and (stored["python"], stored["platform"]) != (report["python"], report["platform"]):
+        print(f"Baseline recorded with Python {stored['python']} on {stored['platform']}; "
+              f"its timings are scaled by the reference workload ({scale:.2f}x).")
+    print_results(results, baseline)
+    regressions = compare(results, baseline, args.tolerance, scale)
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) against {args.baseline}:", file=sys.stderr)
+        for regression in regressions:
+            print(f"  {regression}", file=sys.stderr)
+        sys.exit(1)
+    if baseline:
+        print(f"\nNo regressions against {args.baseline}.")
+
+
+if __name__ == "__main__":
+    main()
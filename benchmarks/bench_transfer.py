@@ -0,0 +1,38 @@
+"""Measure rows per second importing and exporting each transfer format.
+
+Run with: python -m benchmarks.bench_transfer
+"""
+import shutil
+import tempfile
+from pathlib import Path
+
+from src.expense import ExpenseTracker
+from src.record import Expense
+from src.transfer import FORMATS, SUFFIXES
+
+ROWS = 100_000
+SUFFIX = {format: suffix for suffix, format in SUFFIXES.items()}
+
+
+def main():
+    directory = Path(tempfile.mkdtemp())
+    try:
+        tracker = ExpenseTracker("ledger.txt", directory)
+        tracker.add_expenses(Expense(1_700_000_000 + row, f"Category {row % 20}", row % 10_000, f"Expense {row}")
+                             for row in range(ROWS))
+        print(f"{ROWS:,} rows")
+        print(f"{'format':>9} {'export rows/s':>14} {'import rows/s':>14} {'size MB':>8}")
+        for format in FORMATS:
+            path = directory / f"dump{SUFFIX[format]}"
+            exported = tracker.export_to(path)
+            copy = ExpenseTracker(f"copy-{format}.txt", directory)
+            imported = copy.import_from(path)
+            assert imported.rows == exported.rows == ROWS
+            print(f"{format:>9} {exported.rows_per_second:>14,.0f} {imported.rows_per_second:>14,.0f} "
+                  f"{path.stat().st_size / 1e6:>8.1f}")
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == "__main__":
+    main()
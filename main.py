@@ -1,3 +1,8 @@
 if __name__ == "__main__":
+    import sys
+    if len(sys.argv) > 1:
+        # Arguments given: run one command for scripts instead of the menu
+        from src.cli import main
+        sys.exit(main())
     from src.menu import display_menu
-    display_menu()
\ No newline at end of file
+    display_menu()
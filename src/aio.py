@@ -0,0 +1,154 @@
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+from .expense import BATCH_SIZE, DIRECTORY, ExpenseTracker
+from .record import Expense
+
+WORKERS = min(32, (os.cpu_count() or 1) + 4)  # Threads of the pool shared by every ledger
+PAGE_SIZE = 1_000  # Lines read per trip to the pool when streaming
+
+_executor = None
+
+
+def default_executor() -> ThreadPoolExecutor:
+    """Bounded thread pool shared by the trackers that aren't given one"""
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=WORKERS, thread_name_prefix="expenses")
+    return _executor
+
+
+class AsyncExpenseTracker:
+    """ExpenseTracker for asyncio code: disk work runs on a bounded thread pool.
+
+    Calls on one ledger run one at a time, since a tracker isn't thread-safe,
+    while different ledgers use the pool in parallel. Expenses added while
+    a write is in progress are appended together by a single add_expenses
+    call (flushed to disk once, with `fsync=True`), and reads stream through
+    async iterators a page at a time.
+    """
+
+    def __init__(self, tracker: ExpenseTracker, executor=None, fsync: bool = False):
+        self._tracker = tracker
+        self._executor = executor or default_executor()
+        self._fsync = fsync
+        self._lock = asyncio.Lock()
+        self._pending = []  # (line, future) waiting for the next batched append
+        self._flusher = None
+
+    @classmethod
+    async def open(cls, file_path=None, directory=DIRECTORY, executor=None, fsync: bool = False,
+                   **options) -> "AsyncExpenseTracker":
+        """Open a ledger without blocking the event loop; options are passed to ExpenseTracker"""
+        executor = executor or default_executor()
+        tracker = await asyncio.get_running_loop().run_in_executor(
+            executor, partial(ExpenseTracker, file_path, directory, **options))
+        return cls(tracker, executor, fsync)
+
+    @property
+    def tracker(self) -> ExpenseTracker:
+        return self._tracker
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def _run(self, function, *args):
+        """Run a blocking tracker call on the pool, one at a time for this ledger"""
+        async with self._lock:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, partial(function, *args))
+
+    async def add_expense(self, expense) -> int:
+        """Add an expense (a line of text or an Expense); returns its line number"""
+        line = expense.to_line() if isinstance(expense, Expense) else expense
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((line, future))
+        if self._flusher is None or self._flusher.done():
+            self._flusher = asyncio.ensure_future(self._flush())
+        return await future
+
+    async def add_expenses(self, expenses) -> int:
+        """Add several expenses in the same batched append; returns the new total number of lines"""
+        lines = [expense.to_line() if isinstance(expense, Expense) else expense for expense in expenses]
+        if not lines:
+            return await self.get_total_lines()
+        return await self.add_expense("\n".join(lines))
+
+    async def _flush(self):
+        """Append every pending expense with one add_expenses call per round"""
+        while self._pending:
+            batch, self._pending = self._pending, []
+            try:
+                total = await self._run(self._tracker.add_expenses, [line for line, _ in batch], BATCH_SIZE,
+                                        self._fsync)
+            except Exception as error:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(error)
+                continue
+            # Each expense ends where the ones added after it begin
+            for line, future in reversed(batch):
+                if not future.done():
+                    future.set_result(total)
+                total -= line.count("\n") + 1
+
+    async def get_expenses(self) -> list:
+        return await self._run(self._tracker.get_expenses)
+
+    async def iter_expenses(self, start: int = None, stop: int = None, page_size: int = PAGE_SIZE):
+        """Stream lines `start` to `stop` (1-indexed, inclusive), reading a page per trip to the pool"""
+        start = start if start and start > 1 else 1
+        while stop is None or start <= stop:
+            last = start + page_size - 1 if stop is None else min(start + page_size - 1, stop)
+            page = await self._run(lambda first=start, end=last: list(self._tracker.iter_expenses(first, end)))
+            for line in page:
+                yield line
+            if len(page) < last - start + 1:
+                return
+            start = last + 1
+
+    async def find_expense(self, line_pos: int) -> str:
+        return await self._run(self._tracker.find_expense, line_pos)
+
+    async def remove_expense(self, line_number: int) -> bool:
+        return await self._run(self._tracker.remove_expense, line_number)
+
+    async def update_expense(self, line_pos: int, new_value: str) -> bool:
+        return await self._run(self._tracker.update_expense, line_pos, new_value)
+
+    async def search(self, term: str, substring: bool = False):
+        """Yield (line number, line) for matching lines, like ExpenseTracker.search"""
+        found = await self._run(lambda: list(self._tracker.search(term, substring)))
+        for match in found:
+            yield match
+
+    async def search_amount(self, minimum: int, maximum: int = None):
+        """Yield (line number, line) for expenses of `minimum` to `maximum` cents"""
+        found = await self._run(lambda: list(self._tracker.search_amount(minimum, maximum)))
+        for match in found:
+            yield match
+
+    async def query_range(self, start, end):
+        """Yield (line number, line) for expenses timestamped from `start` up to, but not including, `end`"""
+        found = await self._run(lambda: list(self._tracker.query_range(start, end)))
+        for match in found:
+            yield match
+
+    async def summary(self, by: str = "category") -> dict:
+        return await self._run(self._tracker.summary, by)
+
+    async def totals(self, by: str = "category") -> dict:
+        return await self._run(self._tracker.totals, by)
+
+    async def get_total_lines(self) -> int:
+        return await self._run(self._tracker.get_total_lines)
+
+    async def close(self):
+        """Wait for pending appends, then close the ledger"""
+        while self._flusher is not None and not self._flusher.done():
+            await self._flusher
+        await self._run(self._tracker.close)
@@ -0,0 +1,90 @@
+import os
+from collections import OrderedDict
+from pathlib import Path
+
+BLOCK_SIZE = 64 << 10  # Bytes per cached block
+CACHE_BYTES = 16 << 20  # Default memory limit of a cache
+
+
+class BlockCache:
+    """Bounded LRU cache of fixed-size blocks of files, for random-access reads.
+
+    Blocks of a file are dropped as soon as its size or mtime differs from
+    when they were read; writers that can't rely on that, e.g. rewriting a
+    file in place within one mtime tick, call `invalidate` themselves.
+    """
+
+    def __init__(self, max_bytes: int = CACHE_BYTES, block_size: int = BLOCK_SIZE):
+        self._max_bytes = max_bytes
+        self._block_size = block_size
+        self._blocks = OrderedDict()  # (path, block number) -> bytes, least recently used first
+        self._signatures = {}  # path -> (size, mtime_ns) its cached blocks were read at
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._blocks)
+
+    @property
+    def block_size(self) -> int:
+        return self._block_size
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses, "blocks": len(self._blocks), "bytes": self._bytes,
+                "max_bytes": self._max_bytes}
+
+    def read(self, path: Path, start: int, end: int) -> bytes:
+        """Bytes [start, end) of a file, served from cached blocks where possible"""
+        stat = os.stat(path)
+        signature = (stat.st_size, stat.st_mtime_ns)
+        if self._signatures.get(path) != signature:
+            self.invalidate(path)
+            self._signatures[path] = signature
+        end = min(end, stat.st_size)
+        if start >= end:
+            return b""
+        size = self._block_size
+        first, last = start // size, (end - 1) // size
+        blocks = []
+        f = None
+        try:
+            for number in range(first, last + 1):
+                block = self._blocks.get((path, number))
+                if block is None:
+                    self.misses += 1
+                    if f is None:
+                        f = open(path, "rb")
+                    f.seek(number * size)
+                    block = f.read(size)
+                    self._store((path, number), block)
+                else:
+                    self.hits += 1
+                    self._blocks.move_to_end((path, number))
+                blocks.append(block)
+        finally:
+            if f is not None:
+                f.close()
+        data = blocks[0] if len(blocks) == 1 else b"".join(blocks)
+        offset = first * size
+        return data[start - offset:end - offset]
+
+    def invalidate(self, path: Path = None):
+        """Drop the cached blocks of one file, or of every file"""
+        if path is None:
+            self._blocks.clear()
+            self._signatures.clear()
+            self._bytes = 0
+            return
+        self._signatures.pop(path, None)
+        for key in [key for key in self._blocks if key[0] == path]:
+            self._bytes -= len(self._blocks.pop(key))
+
+    def _store(self, key: tuple, block: bytes):
+        if len(block) > self._max_bytes:
+            return
+        self._blocks[key] = block
+        self._bytes += len(block)
+        while self._bytes > self._max_bytes:
+            _, evicted = self._blocks.popitem(last=False)
+            self._bytes -= len(evicted)
@@ -0,0 +1,190 @@
+"""Non-interactive commands for scripts: python main.py [--directory D] [--file F] COMMAND ...
+
+Output is streamed as it is read, and the tracker only imports its optional
+parts (SQLite, transfer formats, profiling) when they're used, so a one-shot
+call stays cheap even on a large ledger.
+"""
+import argparse
+import os
+import sys
+from contextlib import redirect_stdout
+
+from .expense import BATCH_SIZE, DIRECTORY, ExpenseTracker
+from .record import Expense, parse_amount, parse_timestamp
+from .summary import BUCKETS, SECONDS_PER_DAY, format_summary
+
+FILE = "expense.txt"
+ERRORS = ("raise", "skip")
+
+
+def _tracker(args):
+    """The ExpenseTracker of the ledger named on the command line, its notices sent to stderr.
+
+    With --socket, a client of the daemon serving the ledger stands in for it.
+    """
+    if args.socket:
+        from .client import LedgerClient
+        return LedgerClient(args.socket, args.file)
+    with redirect_stdout(sys.stderr):
+        return ExpenseTracker(args.file, args.directory)
+
+
+def _expense(args):
+    """Ledger line of the expense described by the arguments of `add` or `update`"""
+    amount = parse_amount(args.amount)
+    if args.timestamp is None:
+        return Expense.now(args.category, amount, args.description).to_line()
+    return Expense(parse_timestamp(args.timestamp), args.category, amount, args.description).to_line()
+
+
+def _range_bound(text: str, end: bool) -> int:
+    """Timestamp of a range bound; a bare day as the end includes that whole day"""
+    if " " in text.strip():
+        return parse_timestamp(text)
+    return parse_timestamp(f"{text.strip()} 00:00:00") + (SECONDS_PER_DAY if end else 0)
+
+
+def _write_rows(rows, out):
+    """Print (line number, line) pairs as they come"""
+    for line_number, line in rows:
+        line = line.rstrip("\n")
+        out.write(f"{line_number}: {line}\n")
+
+
+def add(args, out):
+    tracker = _tracker(args)
+    line = _expense(args)
+    total = tracker.add_expenses([line])
+    out.write(f"{total}: {line}\n")
+
+
+def bulk_add(args, out):
+    """Add the ledger lines read from stdin, validated, in batches"""
+    skipped = 0
+
+    def valid_lines():
+        nonlocal skipped
+        for number, line in enumerate(sys.stdin, 1):
+            line = line.rstrip("\r\n")
+            if not line.strip():
+                continue
+            try:
+                Expense.parse(line)
+            except ValueError as error:
+                if args.errors == "raise":
+                    raise ValueError(f"line {number}: {error}") from None
+                skipped += 1
+                continue
+            yield line
+
+    tracker = _tracker(args)
+    before = tracker.get_total_lines()
+    total = tracker.add_expenses(valid_lines(), args.batch_size)
+    out.write(f"Added {total - before} expenses, skipped {skipped}.\n")
+
+
+def list_expenses(args, out):
+    tracker = _tracker(args)
+    if args.range:
+        rows = tracker.query_range(_range_bound(args.range[0], False), _range_bound(args.range[1], True))
+    else:
+        rows = enumerate(tracker.iter_expenses(), 1)
+    _write_rows(rows, out)
+
+
+def search(args, out):
+    tracker = _tracker(args)
+    if args.substring:
+        rows = tracker.search(args.term, substring=True)
+    else:
+        matches = dict(tracker.search(args.term))
+        try:
+            matches.update(tracker.search_amount(parse_amount(args.term)))
+        except ValueError:
+            pass  # Not an amount
+        rows = ((line_number, matches[line_number]) for line_number in sorted(matches))
+    _write_rows(rows, out)
+
+
+def summary(args, out):
+    tracker = _tracker(args)
+    result = tracker.summary(args.by)
+    for label in sorted(result):
+        out.write(format_summary(label, result[label]) + "\n")
+
+
+def remove(args, out):
+    if not _tracker(args).remove_expense(args.line):
+        raise ValueError(f"No expense at line {args.line}")
+    out.write(f"Removed line {args.line}.\n")
+
+
+def update(args, out):
+    tracker = _tracker(args)
+    line = _expense(args)
+    if not tracker.update_expense(args.line, line):
+        raise ValueError(f"No expense at line {args.line}")
+    out.write(f"{args.line}: {line}\n")
+
+
+def _parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python main.py", description="Record and query expenses from scripts. "
+                                     "Run without arguments for the interactive menu.")
+    parser.add_argument("--directory", default=DIRECTORY, help=f"directory holding the ledger (default: {DIRECTORY})")
+    parser.add_argument("--file", default=FILE, help=f"ledger file name (default: {FILE})")
+    parser.add_argument("--socket", help="send the command to the ledger daemon listening on this socket "
+                        "(python -m src.daemon), whose directory is used")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    def expense_arguments(command):
+        command.add_argument("category")
+        command.add_argument("amount", help="e.g. 25.50")
+        command.add_argument("description", nargs="?", default="")
+        command.add_argument("--timestamp", help="'YYYY-MM-DD HH:MM:SS' (default: now)")
+
+    command = commands.add_parser("add", help="add one expense")
+    expense_arguments(command)
+    command.set_defaults(run=add)
+    command = commands.add_parser("bulk-add", help="add tab-separated ledger lines read from stdin")
+    command.add_argument("--errors", choices=ERRORS, default="raise", help="stop at or skip invalid lines")
+    command.add_argument("--batch-size", type=int, default=BATCH_SIZE, help="lines written per batch")
+    command.set_defaults(run=bulk_add)
+    command = commands.add_parser("list", help="print expenses with their line numbers")
+    command.add_argument("--range", nargs=2, metavar=("START", "END"),
+                         help="only expenses between two days or timestamps; a day as END is included")
+    command.set_defaults(run=list_expenses)
+    command = commands.add_parser("search", help="print expenses matching every word of a term, or an amount")
+    command.add_argument("term")
+    command.add_argument("--substring", action="store_true", help="match any part of a line")
+    command.set_defaults(run=search)
+    command = commands.add_parser("summary", help="summarise expenses")
+    command.add_argument("--by", choices=BUCKETS, default="category")
+    command.set_defaults(run=summary)
+    command = commands.add_parser("remove", help="remove the expense at a line number")
+    command.add_argument("line", type=int)
+    command.set_defaults(run=remove)
+    command = commands.add_parser("update", help="replace the expense at a line number")
+    command.add_argument("line", type=int)
+    expense_arguments(command)
+    command.set_defaults(run=update)
+    return parser
+
+
+def main(argv=None) -> int:
+    """Run one command; returns the exit status"""
+    args = _parser().parse_args(argv)
+    try:
+        args.run(args, sys.stdout)
+        sys.stdout.flush()
+    except BrokenPipeError:
+        # The reader went away, e.g. `list | head`: stop quietly
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        return 1
+    except (ValueError, OSError) as error:  # OSError: e.g. no daemon on the socket
+        print(f"error: {error}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,130 @@
+import json
+import socket
+import struct
+
+from .expense import BATCH_SIZE
+from .record import Expense
+from .summary import Summary
+
+# Every message is a JSON array prefixed with its length. Requests are [operation, ledger, *arguments];
+# replies are [true, result] or [false, error message].
+FRAME = struct.Struct("!I")
+MAX_FRAME = 64 << 20  # Larger messages are refused rather than buffered
+PAGE_SIZE = 1_000  # Lines fetched per request when streaming
+
+
+def encode(message) -> bytes:
+    body = json.dumps(message, separators=(",", ":")).encode("utf-8")
+    if len(body) > MAX_FRAME:
+        raise ValueError(f"Message of {len(body)} bytes is larger than the {MAX_FRAME} allowed")
+    return FRAME.pack(len(body)) + body
+
+
+def decode(body: bytes):
+    return json.loads(body)
+
+
+def summary_rows(summaries: dict) -> dict:
+    """Summaries by label as [count, total, minimum, maximum] lists, to be sent"""
+    return {label: [summary.count, summary.total, summary.minimum, summary.maximum]
+            for label, summary in summaries.items()}
+
+
+class LedgerClient:
+    """Blocking client of a ledger daemon (src.daemon), for one of the ledgers it serves.
+
+    It has the ExpenseTracker methods scripts need, with the same results,
+    so it can stand in for a tracker; errors raised by the ledger are raised
+    again as ValueError.
+    """
+
+    def __init__(self, socket_path, ledger: str = None, timeout: float = None):
+        self._ledger = ledger
+        self._socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._socket.settimeout(timeout)
+        try:
+            self._socket.connect(str(socket_path))
+        except OSError as error:
+            self._socket.close()
+            raise ConnectionError(f"No ledger daemon listening on {socket_path}: {error.strerror}") from error
+        self._reader = self._socket.makefile("rb")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def request(self, operation: str, *args):
+        """Send one request and wait for its result"""
+        self._socket.sendall(encode([operation, self._ledger, *args]))
+        header = self._reader.read(FRAME.size)
+        if len(header) < FRAME.size:
+            raise ConnectionError("The ledger daemon closed the connection")
+        (size,) = FRAME.unpack(header)
+        ok, result = decode(self._reader.read(size))
+        if not ok:
+            raise ValueError(result)
+        return result
+
+    def add_expense(self, expense) -> int:
+        """Add an expense (a line of text or an Expense); returns its line number"""
+        return self.add_expenses([expense])
+
+    def add_expenses(self, expenses, batch_size: int = BATCH_SIZE) -> int:
+        """Add many expenses, one request per batch; returns the new total number of lines"""
+        total = None
+        batch = []
+        for expense in expenses:
+            batch.append(expense.to_line() if isinstance(expense, Expense) else expense)
+            if len(batch) >= batch_size:
+                total = self.request("add", batch)
+                batch = []
+        if batch or total is None:
+            total = self.request("add", batch)
+        return total
+
+    def get_total_lines(self) -> int:
+        return self.request("count")
+
+    def find_expense(self, line_pos: int) -> str:
+        return self.request("find", line_pos)
+
+    def iter_expenses(self, start: int = None, stop: int = None, page_size: int = PAGE_SIZE):
+        """Yield lines `start` to `stop` (1-indexed, inclusive), a page per request"""
+        start = start if start and start > 1 else 1
+        while stop is None or start <= stop:
+            last = start + page_size - 1 if stop is None else min(start + page_size - 1, stop)
+            page = self.request("lines", start, last)
+            yield from page
+            if len(page) < last - start + 1:
+                return
+            start = last + 1
+
+    def search(self, term: str, substring: bool = False):
+        for line_number, line in self.request("search", term, substring):
+            yield line_number, line
+
+    def search_amount(self, minimum: int, maximum: int = None):
+        for line_number, line in self.request("amount", minimum, maximum):
+            yield line_number, line
+
+    def query_range(self, start, end):
+        for line_number, line in self.request("range", start, end):
+            yield line_number, line
+
+    def summary(self, by: str = "category") -> dict:
+        return {label: Summary(*row) for label, row in self.request("summary", by).items()}
+
+    def totals(self, by: str = "category") -> dict:
+        return {label: Summary(*row) for label, row in self.request("totals", by).items()}
+
+    def remove_expense(self, line_number: int) -> bool:
+        return self.request("remove", line_number)
+
+    def update_expense(self, line_pos: int, new_value: str) -> bool:
+        return self.request("update", line_pos, new_value)
+
+    def close(self):
+        self._reader.close()
+        self._socket.close()
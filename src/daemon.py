@@ -0,0 +1,178 @@
+"""Serve ledgers kept open in one process over a Unix domain socket.
+
+Run with: python -m src.daemon [--directory expenses/] [--socket PATH] [--fsync]
+and talk to it with src.client.LedgerClient, or `python main.py --socket PATH ...`.
+"""
+import argparse
+import asyncio
+import os
+import signal
+import socket
+from pathlib import Path
+
+from .aio import AsyncExpenseTracker
+from .client import FRAME, MAX_FRAME, decode, encode, summary_rows
+from .expense import DIRECTORY
+
+SOCKET_NAME = "tracker.sock"  # Socket created in the ledger directory unless another path is given
+LEDGER = "expense.txt"  # Ledger of requests that don't name one
+
+
+class LedgerServer:
+    """Answers requests for the ledgers of a directory, each opened once and kept warm.
+
+    Every ledger is an AsyncExpenseTracker, so its line index, block cache,
+    keyword index and summaries stay in memory between requests, and adds
+    from every client arriving while a write is in progress are committed
+    together by the next one. Clients are served concurrently; each
+    connection's requests are answered in order.
+    """
+
+    def __init__(self, socket_path, directory=DIRECTORY, fsync: bool = False):
+        self._socket_path = Path(socket_path)
+        self._directory = directory
+        self._fsync = fsync
+        self._ledgers = {}  # name -> task opening its AsyncExpenseTracker
+        self._server = None
+        self._operations = {
+            "add": self._add,
+            "count": lambda tracker: tracker.get_total_lines(),
+            "find": lambda tracker, line_pos: tracker.find_expense(line_pos),
+            "lines": self._lines,
+            "search": lambda tracker, term, substring=False: self._matches(tracker.search(term, substring)),
+            "amount": lambda tracker, minimum, maximum=None: self._matches(tracker.search_amount(minimum, maximum)),
+            "range": lambda tracker, start, end: self._matches(tracker.query_range(start, end)),
+            "summary": self._summary,
+            "totals": self._totals,
+            "remove": lambda tracker, line_number: tracker.remove_expense(line_number),
+            "update": lambda tracker, line_pos, new_value: tracker.update_expense(line_pos, new_value),
+        }
+
+    @property
+    def socket_path(self) -> Path:
+        return self._socket_path
+
+    async def start(self):
+        """Listen on the socket, replacing a stale one left by a daemon that died"""
+        if self._socket_path.exists():
+            probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            try:
+                probe.connect(str(self._socket_path))
+            except OSError:
+                self._socket_path.unlink()
+            else:
+                raise ValueError(f"A daemon is already listening on {self._socket_path}")
+            finally:
+                probe.close()
+        self._server = await asyncio.start_unix_server(self._serve, str(self._socket_path))
+        os.chmod(self._socket_path, 0o600)  # Only this user's processes may use the ledgers
+
+    async def close(self):
+        """Stop listening, then commit pending adds and close every ledger"""
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._socket_path.unlink(missing_ok=True)
+        for opening in self._ledgers.values():
+            try:
+                tracker = await opening
+            except Exception:
+                continue  # Never opened
+            await tracker.close()
+        self._ledgers = {}
+
+    async def _tracker(self, name) -> AsyncExpenseTracker:
+        """The open tracker of a ledger, opening it on first use"""
+        name = name or LEDGER
+        if name != Path(name).name or name.startswith("."):
+            raise ValueError(f"Invalid ledger name {name!r}: expected a file name in the ledger directory")
+        opening = self._ledgers.get(name)
+        if opening is None or (opening.done() and opening.exception() is not None):
+            opening = self._ledgers[name] = asyncio.ensure_future(
+                AsyncExpenseTracker.open(name, self._directory, fsync=self._fsync))
+        return await opening
+
+    async def _serve(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """Answer the requests of one connection until it closes"""
+        try:
+            while True:
+                try:
+                    header = await reader.readexactly(FRAME.size)
+                except asyncio.IncompleteReadError:
+                    break
+                (size,) = FRAME.unpack(header)
+                if size > MAX_FRAME:
+                    writer.write(encode([False, f"Request of {size} bytes is larger than the {MAX_FRAME} allowed"]))
+                    break
+                writer.write(encode(await self.handle(await reader.readexactly(size))))
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def handle(self, body: bytes) -> list:
+        """Reply to one encoded request"""
+        try:
+            operation, ledger, *args = decode(body)
+            function = self._operations.get(operation)
+            if function is None:
+                raise ValueError(f"Unknown operation {operation!r}")
+            result = function(await self._tracker(ledger), *args)
+            if asyncio.iscoroutine(result):
+                result = await result
+        except Exception as error:
+            # Whatever a ledger raises is the caller's answer; it must not drop the connection
+            return [False, str(error) or type(error).__name__]
+        return [True, result]
+
+    @staticmethod
+    async def _add(tracker: AsyncExpenseTracker, lines: list) -> int:
+        if not all(isinstance(line, str) for line in lines):
+            raise ValueError("Expenses must be sent as lines of text")
+        return await tracker.add_expenses(lines)
+
+    @staticmethod
+    async def _lines(tracker: AsyncExpenseTracker, start: int, stop: int) -> list:
+        return [line async for line in tracker.iter_expenses(start, stop, page_size=stop - start + 1)]
+
+    @staticmethod
+    async def _matches(found) -> list:
+        return [match async for match in found]
+
+    @staticmethod
+    async def _summary(tracker: AsyncExpenseTracker, by: str = "category") -> dict:
+        return summary_rows(await tracker.summary(by))
+
+    @staticmethod
+    async def _totals(tracker: AsyncExpenseTracker, by: str = "category") -> dict:
+        return summary_rows(await tracker.totals(by))
+
+
+async def serve(socket_path, directory=DIRECTORY, fsync: bool = False):
+    """Run a LedgerServer until SIGINT or SIGTERM"""
+    server = LedgerServer(socket_path, directory, fsync)
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(signum, stop.set)
+    await server.start()
+    print(f"Serving ledgers in {directory} on {server.socket_path}", flush=True)
+    try:
+        await stop.wait()
+    finally:
+        await server.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m src.daemon", description=__doc__.split("\n")[0])
+    parser.add_argument("--directory", default=DIRECTORY, help=f"directory holding the ledgers (default: {DIRECTORY})")
+    parser.add_argument("--socket", type=Path, help=f"socket to listen on (default: {SOCKET_NAME} in the directory)")
+    parser.add_argument("--fsync", action="store_true", help="flush every group of adds to disk before replying")
+    args = parser.parse_args(argv)
+    Path(args.directory).mkdir(parents=True, exist_ok=True)
+    asyncio.run(serve(args.socket or Path(args.directory) / SOCKET_NAME, args.directory, args.fsync))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,93 @@
+import os
+from contextlib import contextmanager
+from functools import wraps
+from itertools import islice
 from pathlib import Path
+from bisect import bisect_left
+from .index import LineIndex, Tombstones, TimeIndex, CHUNK_SIZE
+from .record import Expense, ExpenseTable, parse_timestamp
+from .summary import SummaryCache
+from .search import KeywordIndex, parse_expense
+from .storage import BACKEND_SUFFIXES, SQLiteBackend, StorageBackend
+from .segments import SegmentedBackend
+from .snapshot import SNAPSHOT_SUFFIX, Snapshot, write_snapshot
+from .lock import LedgerLock, WriteAheadLog
+from .cache import CACHE_BYTES, BlockCache
+from .instrument import Instrumentation, enabled_from_env
+
+BACKENDS = {"text": None, "sqlite": SQLiteBackend, "segments": SegmentedBackend}  # None: the built-in text ledger
 
 DIRECTORY = "expenses/"
+ENCODING = "utf-8"
+SUMMARY_ROWS = 100_000  # Lines parsed per chunk when summarising
+BATCH_SIZE = 10_000  # Expenses written per write() call by add_expenses
+COMPACT_RATIO = 0.25  # Share of tombstoned lines that triggers compaction
+PAD = b" "  # Fills fixed-width records; trailing blanks are never part of an expense
+# Methods timed by the optional instrumentation
+INSTRUMENTED = ("add_expense", "add_expenses", "get_expenses", "iter_expenses", "find_expense", "remove_expense",
+                "update_expense", "search", "search_amount", "query_range", "summary", "totals", "compact",
+                "clear_expenses", "import_from", "export_to")
+
+
+def _splice_file(path: Path, start: int, end: int, data: bytes, size: int, chunk_size: int = CHUNK_SIZE):
+    """Replace bytes [start, end) of the file with `data`, moving the tail in fixed-size chunks"""
+    delta = len(data) - (end - start)
+    with path.open("r+b") as f:
+        if delta < 0:
+            # Shrinking: copy the tail towards the front, first chunk first
+            src = end
+            while src < size:
+                f.seek(src)
+                chunk = f.read(min(chunk_size, size - src))
+                f.seek(src + delta)
+                f.write(chunk)
+                src += len(chunk)
+            f.truncate(size + delta)
+        elif delta > 0:
+            # Growing: copy the tail towards the back, last chunk first
+            src = size
+            while src > end:
+                length = min(chunk_size, src - end)
+                src -= length
+                f.seek(src)
+                chunk = f.read(length)
+                f.seek(src + delta)
+                f.write(chunk)
+        f.seek(start)
+        f.write(data)
+
+
+def _locked(exclusive: bool = False):
+    """Run a tracker method holding the ledger lock, shared unless it rewrites the ledger"""
+    def decorate(method):
+        @wraps(method)
+        def locked(self, *args, **kwargs):
+            with self._locking(exclusive):
+                return method(self, *args, **kwargs)
+        return locked
+    return decorate
+
+
 class ExpenseTracker:
     _file_path = None
     _total_lines = 0
+    _index = None
+    _tombs = None
+    _totals = None
+    _keywords = None
+    _times = None
+    _instrument = None
+    _backend = None
+    _lock = None
+    _seen = None
 
-    def __init__(self, file_path=None, directory=DIRECTORY):
+    def __init__(self, file_path=None, directory=DIRECTORY, tombstones=False, compact_ratio=COMPACT_RATIO,
+                 record_width=None, backend=None, wal=False, cache_bytes=CACHE_BYTES, instrument=None):
+        if instrument or (instrument is None and enabled_from_env()):
+            # Only then are the methods wrapped, so uninstrumented trackers pay nothing for it
+            self._instrument = Instrumentation()
+            for name in INSTRUMENTED:
+                setattr(self, name, self._instrument.wrap(name, getattr(self, name)))
         if not file_path:
             file_path = "expense.txt"  # Default filename if not provided
         if "." not in file_path:
@@ -13,70 +95,707 @@ class ExpenseTracker:
         # Set up the file path using the directory if provided
         self._file_path = Path(directory) / file_path
         self._file_path.parent.mkdir(parents=True, exist_ok=True)
-        # Check if the file exists; if not, create it
-        if not self._file_path.exists():
-            self._file_path.touch()  # Create an empty file if it doesn't exist
-            print(f"File {self._file_path} created.")
-        else:
-            # Count lines in the file if it already exists
-            with self._file_path.open('r') as f:
-                self._total_lines = len(f.readlines())
+        if isinstance(backend, StorageBackend):
+            # Configured by the caller, e.g. SegmentedBackend(path, by_month=True)
+            self._file_path = backend.path
+            self._backend = backend
+            self._refresh_count()
+            return
+        # The storage engine is picked by name, or else by file extension
+        backend = backend or BACKEND_SUFFIXES.get(self._file_path.suffix.lower(), "text")
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown backend {backend!r}, expected one of {', '.join(BACKENDS)}")
+        if BACKENDS[backend]:
+            self._backend = BACKENDS[backend](self._file_path)
+            self._refresh_count()
+            return
+        self._tombstones = tombstones
+        self._compact_ratio = compact_ratio
+        # Bytes reserved per line, newline included, so updates that fit are written in place
+        self._record_width = record_width
+        # Other processes may share the ledger: rewrites lock it, and appends can go through a log
+        self._lock = LedgerLock(self._file_path)
+        self._wal = WriteAheadLog(self._file_path)
+        self._use_wal = wal
+        # Recently read blocks of the ledger and its index, for lookups and paging (0 to disable)
+        self._cache = BlockCache(cache_bytes) if cache_bytes else None
+        with self._lock.exclusive():
+            # Check if the file exists; if not, create it
+            if not self._file_path.exists():
+                self._file_path.touch()  # Create an empty file if it doesn't exist
+                print(f"File {self._file_path} created.")
+                Tombstones(self._file_path).reset()  # Left over from an earlier file of the same name
+                # Nothing to total or index yet, so the caches start out current
+                self._totals = SummaryCache(self._file_path)
+                self._totals.save()
+                self._keywords = KeywordIndex(self._file_path)
+                self._keywords.reset()
+                self._times = TimeIndex(self._file_path)
+                self._times.save()
+            self._open_index()
+            self._wal.drain(self._append_logged)
+            self._refresh_count()
+            self._seen = self._ledger_stat()
     
     def __str__(self):
         return f"ExpenseTracker(file_path={self._file_path}, total_lines={self._total_lines})"
     
+    @_locked()
     def get_total_lines(self):
         """Get total lines on file"""
         return self._total_lines
 
+    def _refresh_count(self):
+        if self._backend is not None:
+            self._total_lines = len(self._backend)
+            return
+        self._total_lines = len(self._index) - len(self._tombs)
+
+    def close(self):
+        """Release the storage backend, if any, and the ledger lock"""
+        if self._backend is not None:
+            self._backend.close()
+        if self._lock is not None:
+            self._lock.close()
+
+    @contextmanager
+    def _locking(self, exclusive: bool = False):
+        """Hold the ledger lock, catching up with changes made by other processes first"""
+        if self._backend is not None:
+            yield  # The backend does its own locking
+            return
+        if not exclusive and not self._lock.held and self._wal:
+            exclusive = True  # Logged appends have to be moved into the ledger first
+        with (self._lock.exclusive() if exclusive else self._lock.shared()) as acquired:
+            if acquired:
+                self._sync()
+                if exclusive:
+                    self._wal.drain(self._append_logged)
+            yield
+            if acquired:
+                self._seen = self._ledger_stat()
+
+    def _open_index(self):
+        """Open the line index and the tombstones that apply to it"""
+        # The line count comes from the index header, or a chunked newline count if it is stale
+        self._index = LineIndex(self._file_path, self._cache)
+        # Removed lines stay in the file until it is compacted when tombstones are used
+        self._tombs = Tombstones(self._file_path)
+        if not self._index.fresh and len(self._tombs):
+            # Every change the tracker makes keeps the index current, so the ledger was rewritten
+            # behind its back and the dead line numbers no longer point at the lines that were removed
+            self._tombs.reset()
+        else:
+            self._tombs.truncate(len(self._index))
+
+    def _ledger_stat(self) -> tuple:
+        """Size and mtime of the ledger and size of its tombstone log: cheap to check on every lock"""
+        stat = self._file_path.stat()
+        try:
+            removed = self._tombs.path.stat().st_size
+        except FileNotFoundError:
+            removed = 0
+        return stat.st_size, stat.st_mtime_ns, removed
+
+    def _sync(self):
+        """Reload the line index and tombstones if another process changed the ledger"""
+        seen = self._ledger_stat()
+        if seen != self._seen:
+            if self._cache is not None:
+                self._cache.invalidate()
+            self._open_index()
+            self._refresh_count()
+            self._seen = seen
+
+    def stats(self) -> dict:
+        """Calls, latency percentiles and histogram, bytes read and written and rows per instrumented method"""
+        if self._instrument is None:
+            return {}
+        return self._instrument.stats()
+
+    def cache_stats(self) -> dict:
+        """Hits, misses and size of the block cache used for random-access reads"""
+        if self._cache is None:
+            return {}
+        return self._cache.stats()
+
+    def _encode(self, text: str) -> bytes:
+        """Encode lines of text for the file, padding them to the record width if one is set"""
+        if not self._record_width:
+            return (text + "\n").encode(ENCODING)
+        width = self._record_width - 1
+        return b"".join(line.encode(ENCODING).ljust(width, PAD) + b"\n" for line in text.split("\n"))
+
+    def _count_write(self, size: int, rows: int = 0):
+        """Count bytes (and appended rows) written against the instrumented call in progress"""
+        if self._instrument is not None:
+            self._instrument.wrote(size, rows)
+
+    def _uses_tombstones(self) -> bool:
+        """Removals are tombstoned when asked for, or while the file still holds dead lines"""
+        return self._tombstones or len(self._tombs) > 0
+
+    @_locked()
     def get_expenses(self):
         """Get all expenses from the file"""
         # Read and return all the expenses
-        with self._file_path.open('r') as f:
-            return f.readlines()
-
-    def add_expense(self, expense: str):
-        """Add expense to the file"""
-        # line = self._total_lines + 1
-        with self._file_path.open(mode="a") as f:
-            # f.write(str(line) + "\t" + "\"" + expense + "\"" + "\n")
-            f.write(expense + "\n")
-        self._total_lines += 1
+        return list(self.iter_expenses())
+
+    def iter_expenses(self, start: int = None, stop: int = None, chunk_size: int = CHUNK_SIZE):
+        """Stream expenses from line `start` to line `stop` (1-indexed, inclusive) with a fixed-size buffer"""
+        if self._backend is not None:
+            yield from self._backend.iter_lines(start, stop)
+            return
+        for _, line in self._iter_lines(start, stop, chunk_size):
+            yield line
+
+    def _iter_lines(self, start: int = None, stop: int = None, chunk_size: int = CHUNK_SIZE):
+        """Yield (physical line number, line) for the live lines from `start` to `stop`, skipping tombstones"""
+        start = start if start and start > 1 else 1
+        remaining = None if stop is None else stop - start + 1
+        if remaining is not None and remaining <= 0:
+            return
+        with self._locking():
+            index, dead, moved = self._index, self._tombs.dead, self._tombs.moved
+            physical = self._tombs.physical(start)
+            if physical > len(index):
+                return
+            offset = index.span(physical - 1)[0] if physical > 1 else 0
+            end = index.size  # Lines appended meanwhile aren't in this view of the ledger
+        next_dead = bisect_left(dead, physical)
+        # Bounded ranges, like pages of a listing, are read through the block cache
+        cache = self._cache if stop is not None else None
+        if cache is not None:
+            chunk_size = cache.block_size
+        instrument = self._instrument
+        with self._file_path.open("rb") as f:
+            f.seek(offset)
+            pending = b""
+            while offset < end:
+                # The lock is only held per chunk, so a slow consumer doesn't hold up writers
+                with self._lock.shared():
+                    if cache is not None:
+                        chunk = cache.read(self._file_path, offset, min(offset + chunk_size, end))
+                    else:
+                        chunk = f.read(min(chunk_size, end - offset))
+                if not chunk:
+                    break
+                if instrument is not None:
+                    instrument.read(len(chunk))
+                offset += len(chunk)
+                lines = (pending + chunk).split(b"\n")
+                pending = lines.pop()
+                for line in lines:
+                    if next_dead < len(dead) and dead[next_dead] == physical:
+                        next_dead += 1  # Removed or moved, but not compacted away yet
+                    else:
+                        if moved and physical in moved:
+                            line = self._read_raw(moved[physical])
+                        elif line[-1:] == PAD:
+                            line = line.rstrip(PAD)
+                        yield physical, line.decode(ENCODING) + "\n"
+                        if remaining is not None:
+                            remaining -= 1
+                            if not remaining:
+                                return
+                    physical += 1
+            if pending and not (next_dead < len(dead) and dead[next_dead] == physical):
+                yield physical, pending.rstrip(PAD).decode(ENCODING)
+
+    def _read_raw(self, physical: int) -> bytes:
+        """Read one physical line with a single seek and read, without newline or padding"""
+        start, end = self._index.span(physical - 1)
+        if self._cache is not None:
+            line = self._cache.read(self._file_path, start, end)
+        else:
+            with self._file_path.open("rb") as f:
+                f.seek(start)
+                line = f.read(end - start)
+        if self._instrument is not None:
+            self._instrument.read(len(line))
+        return line.rstrip(b"\n").rstrip(PAD)
+
+    def _read_line(self, slot: int) -> str:
+        """Read the current contents of a slot, following it if the line was moved"""
+        return self._read_raw(self._tombs.target(slot)).decode(ENCODING).strip()
+
+    @_locked()
+    def load_table(self, workers: int = 1) -> ExpenseTable:
+        """Load every expense line of the file into a columnar table.
+
+        With `workers` other than 1 (None for one per core) the file is parsed
+        by that many processes, unless it has tombstones, which only this
+        process can resolve.
+        """
+        if workers != 1 and self._backend is None and not len(self._tombs):
+            from .parallel import parse_ledger  # Process pools are slow to import, so only when asked for
+            return parse_ledger(self._file_path, workers)
+        return ExpenseTable.from_lines(self.iter_expenses())
+
+    @_locked()
+    def export_snapshot(self, path=None) -> Path:
+        """Write the ledger to a binary columnar snapshot, by default next to it.
+
+        Raises ValueError if a line isn't an expense, since free text can't be
+        stored in the snapshot's columns and the conversion must be lossless.
+        """
+        path = Path(path) if path else self._file_path.with_name(self._file_path.name + SNAPSHOT_SUFFIX)
+        table = ExpenseTable()
+        for line_number, line in enumerate(self.iter_expenses(), 1):
+            if not table.append_line(line, line_number):
+                raise ValueError(f"Line {line_number} is not an expense: {line.rstrip()!r}")
+        write_snapshot(table, path)
+        return path
+
+    def open_snapshot(self, path=None, verify: bool = False) -> Snapshot:
+        """Memory-map a snapshot written by export_snapshot, by default the one next to the ledger"""
+        return Snapshot(path or self._file_path.with_name(self._file_path.name + SNAPSHOT_SUFFIX), verify)
+
+    @_locked(exclusive=True)
+    def import_snapshot(self, path):
+        """Replace the contents of the ledger with the expenses of a snapshot"""
+        with Snapshot(path, verify=True) as snapshot:
+            self.write_table(snapshot)
+
+    def import_from(self, path, format: str = None, errors: str = "raise",
+                    batch_size: int = BATCH_SIZE) -> "TransferReport":
+        """Append the expenses of a CSV, JSONL or columnar file, streaming it in batches.
+
+        The format comes from the extension unless named. Every row is
+        validated before it's written; an invalid row raises ValueError, after
+        the batches before it were added, or with `errors="skip"` is counted
+        in the report and left out.
+        """
+        from .transfer import read_rows, timed, transfer_format
+        format = transfer_format(path, format)
+        return timed(lambda report: self.add_expenses(read_rows(path, format, errors, report), batch_size))
+
+    def export_to(self, path, format: str = None, errors: str = "raise") -> "TransferReport":
+        """Write the ledger's expenses to a CSV, JSONL or columnar file, streaming it in chunks.
+
+        Lines that aren't expenses raise ValueError, or with `errors="skip"`
+        are left out and counted in the report.
+        """
+        from .transfer import timed, transfer_format, write_rows
+        format = transfer_format(path, format)
+        return timed(write_rows, self.iter_expenses(), path, format, errors)
+
+    @_locked(exclusive=True)
+    def write_table(self, table: ExpenseTable):
+        """Replace the contents of the file with the rows of a table"""
+        if self._backend is not None:
+            self._backend.clear()
+            self._backend.append(list(table.to_lines()))
+            self._refresh_count()
+            return
+        with self._file_path.open(mode="wb") as f:
+            buffer = []
+            for line in table.to_lines():
+                buffer.append(line)
+                if len(buffer) >= BATCH_SIZE:
+                    f.write(self._encode("\n".join(buffer)))
+                    buffer.clear()
+            if buffer:
+                f.write(self._encode("\n".join(buffer)))
+        self._tombs.reset()
+        self._index.rebuild()
+        self._refresh_count()
+        self._totals = None
+        self._keywords = None
+        self._times = None
+
+    def iter_tables(self, rows: int = None):
+        """Stream the file as ExpenseTable chunks of a bounded number of lines"""
+        rows = rows or SUMMARY_ROWS
+        lines = self.iter_expenses()
+        first_line = 1
+        while True:
+            chunk = list(islice(lines, rows))
+            if not chunk:
+                break
+            yield ExpenseTable.from_lines(chunk, first_line)
+            first_line += len(chunk)
+
+    @_locked()
+    def summary(self, by: str = "category") -> dict:
+        """Sum/count/min/max/mean of the expenses grouped by category, day, week or month"""
+        if self._backend is not None:
+            return self._backend.summary(by)
+        # Summaries come from the per-category and per-day cache, rebuilt if a removal left an extreme unknown
+        totals = self._summary_cache()
+        result = totals.summaries(by)
+        if result is None:
+            totals.rebuild(self.iter_tables())
+            result = totals.summaries(by)
+        return result
+
+    @_locked()
+    def totals(self, by: str = "category") -> dict:
+        """Count and total per category or month, from the incrementally maintained cache"""
+        if self._backend is not None:
+            return self._backend.totals(by)
+        return self._summary_cache().totals(by)
+
+    def _summary_cache(self, rebuild: bool = True):
+        """Totals cache matching the file; None if it is stale and `rebuild` is False"""
+        if self._totals is None or not self._totals.is_current():
+            totals = SummaryCache(self._file_path)
+            if not totals.load():
+                if not rebuild:
+                    self._totals = None
+                    return None
+                totals.rebuild(self.iter_tables())
+            self._totals = totals
+        return self._totals
+
+    def search(self, term: str, substring: bool = False):
+        """Yield (line number, line) for lines whose category or description contain every word of `term`.
+
+        With `substring=True` every line is scanned for `term` as a plain
+        case-insensitive substring instead of using the keyword index.
+        """
+        if substring:
+            term = term.lower()
+            for line_number, line in enumerate(self.iter_expenses(), 1):
+                if term in line.lower():
+                    yield line_number, line
+            return
+        if self._backend is not None:
+            yield from self._backend.lookup(term)
+            return
+        with self._locking():
+            found = [(self._tombs.logical(physical), self._read_line(physical))
+                     for physical in self._keyword_index().lookup(term)]
+        yield from found
+
+    def search_amount(self, minimum: int, maximum: int = None):
+        """Yield (line number, line) for expenses of `minimum` to `maximum` cents"""
+        maximum = minimum if maximum is None else maximum
+        if self._backend is not None:
+            yield from self._backend.amount_range(minimum, maximum)
+            return
+        with self._locking():
+            found = [(self._tombs.logical(physical), self._read_line(physical))
+                     for physical in self._keyword_index().amount_range(minimum, maximum)]
+        yield from found
+
+    def query_range(self, start, end):
+        """Yield (line number, line) for expenses timestamped from `start` up to, but not including, `end`.
+
+        Times are epoch seconds, as in Expense.timestamp, or timestamp text.
+        Only the blocks of lines the time index can't rule out are read.
+        """
+        start = parse_timestamp(start) if isinstance(start, str) else start
+        end = parse_timestamp(end) if isinstance(end, str) else end
+        if self._backend is not None:
+            yield from self._backend.time_range(start, end)
+            return
+        with self._locking():
+            first, last = self._time_index().lines(start, end)
+            if first > last:
+                return
+            line_number = self._tombs.logical(first)
+        for physical, line in self._iter_lines(line_number):
+            if physical > last:
+                break
+            try:
+                timestamp = Expense.parse(line).timestamp
+            except ValueError:
+                timestamp = None
+            if timestamp is not None and start <= timestamp < end:
+                yield line_number, line.strip()
+            line_number += 1
+
+    def _time_index(self, rebuild: bool = True):
+        """Time index matching the file; None if it is stale and `rebuild` is False"""
+        if self._times is None or not self._times.is_current():
+            times = TimeIndex(self._file_path)
+            if not times.load():
+                if not rebuild:
+                    self._times = None
+                    return None
+                times.rebuild(self._iter_lines())
+            self._times = times
+        return self._times
+
+    def _keyword_index(self, rebuild: bool = True):
+        """Keyword index matching the file; None if it is stale and `rebuild` is False"""
+        if self._keywords is None or not self._keywords.is_current():
+            keywords = self._keywords or KeywordIndex(self._file_path)
+            if not keywords.load():
+                if not rebuild:
+                    self._keywords = None
+                    return None
+                keywords.rebuild(self._iter_lines())
+            self._keywords = keywords
+        return self._keywords
+
+    def _appending_keyword_index(self):
+        """Keyword index to log appended lines to, without loading it if this tracker hasn't yet"""
+        if self._keywords is None:
+            keywords = KeywordIndex(self._file_path)
+            if keywords.attach():
+                return keywords  # Not kept: it can't answer queries
+        return self._keyword_index(rebuild=False)
+
+    @staticmethod
+    def _parse_lines(text: str) -> list:
+        """Expenses among the lines of `text`, skipping free text"""
+        expenses = []
+        for line in text.split("\n"):
+            try:
+                expenses.append(Expense.parse(line))
+            except ValueError:
+                pass
+        return expenses
+
+    def add_expense(self, expense):
+        """Add expense (a line of text or an Expense) to the file"""
+        if isinstance(expense, Expense):
+            expense = expense.to_line()
+        self.add_expenses([expense])
         print(f"Expense added: {expense}")
         return self._total_lines
+
+    def add_expenses(self, expenses, batch_size: int = BATCH_SIZE, fsync: bool = False) -> int:
+        """Add many expenses (lines of text or Expenses) with one write per batch.
+
+        Nothing is printed per expense; with `fsync=True` the file is flushed
+        to disk once at the end. Returns the new total number of lines.
+        """
+        if self._backend is not None:
+            expenses = iter(expenses)
+            while True:
+                batch = [expense.to_line() if isinstance(expense, Expense) else expense
+                         for expense in islice(expenses, batch_size)]
+                if not batch:
+                    break
+                self._backend.append("\n".join(batch).split("\n"))
+            self._refresh_count()
+            return self._total_lines
+        if self._use_wal:
+            # Logged without waiting for the ledger lock; moved into the ledger by the next locked call
+            expenses = iter(expenses)
+            while True:
+                batch = [expense.to_line() if isinstance(expense, Expense) else expense
+                         for expense in islice(expenses, batch_size)]
+                if not batch:
+                    break
+                text = "\n".join(batch)
+                self._wal.append(text, fsync)
+                self._total_lines += text.count("\n") + 1
+                self._count_write(len(text) + 1, text.count("\n") + 1)
+            return self._total_lines
+        with self._locking(exclusive=True):
+            return self._append(expenses, batch_size, fsync)
+
+    def _append_logged(self, text: str):
+        """Write lines taken from the write-ahead log to the ledger"""
+        self._append(text.split("\n"))
+
+    def _append(self, expenses, batch_size: int = BATCH_SIZE, fsync: bool = False) -> int:
+        """Append to the ledger and its index and caches; the caller holds the exclusive lock"""
+        index = self._index
+        totals = self._summary_cache(rebuild=False)
+        keywords = self._appending_keyword_index()
+        times = self._time_index(rebuild=False)
+        expenses = iter(expenses)
+        with self._file_path.open(mode="ab") as f:
+            while True:
+                batch = [expense.to_line() if isinstance(expense, Expense) else expense
+                         for expense in islice(expenses, batch_size)]
+                if not batch:
+                    break
+                text = "\n".join(batch)
+                data = self._encode(text)
+                if not index.terminated:
+                    data = b"\n" + data  # Don't glue the new expenses onto an unterminated last line
+                first_line = len(index) + 1
+                f.write(data)
+                f.flush()
+                index.append(data)
+                self._count_write(len(data), text.count("\n") + 1)
+                if totals or keywords or times is not None:
+                    # Each line is parsed once for all the sidecars
+                    for line_number, line in enumerate(text.split("\n"), first_line):
+                        expense = parse_expense(line)
+                        if totals and expense is not None:
+                            totals.add(expense)
+                        if keywords:
+                            keywords.add(line_number, line, expense)
+                        if times is not None:
+                            times.add_timestamp(line_number, None if expense is None else expense.timestamp)
+                # Flushed batch by batch, so a streaming import holds one batch at a time
+                if totals:
+                    totals.save()
+                if keywords:
+                    keywords.checkpoint()
+                if times is not None:
+                    times.save()
+            if fsync:
+                os.fsync(f.fileno())
+        self._refresh_count()
+        if keywords:
+            keywords.save()
+        return self._total_lines
     
+    @_locked(exclusive=True)
     def clear_expenses(self):
         """Clear all expenses from the file"""
+        if self._backend is not None:
+            self._backend.clear()
+            self._refresh_count()
+            return
         with self._file_path.open(mode="w") as f:
             f.truncate(0)
-        self._total_lines = 0
+        self._index.reset()
+        self._tombs.reset()
+        self._refresh_count()
+        self._totals = SummaryCache(self._file_path)
+        self._totals.save()
+        self._keywords = KeywordIndex(self._file_path)
+        self._keywords.reset()
+        self._times = TimeIndex(self._file_path)
+        self._times.save()
 
+    @_locked(exclusive=True)
     def remove_expense(self, line_number: int):
         """Remove an expense by line number (1-indexed)"""
-        expenses = self.get_expenses()
-        if 1 <= line_number <= len(expenses):
-            del expenses[line_number - 1]
-            with self._file_path.open(mode="w") as f:
-                f.writelines(expenses)
-            self._total_lines -= 1
+        index = self._index
+        if self._backend is not None and 1 <= line_number <= self._total_lines:
+            self._backend.remove(line_number)
+            self._refresh_count()
+            return True
+        if 1 <= line_number <= self._total_lines:
+            totals = self._summary_cache(rebuild=False)
+            keywords = self._keyword_index(rebuild=False)
+            times = self._time_index(rebuild=False)
+            physical = self._tombs.physical(line_number)
+            old = self._read_line(physical) if totals or keywords else None
+            tombstoned = self._uses_tombstones()
+            if tombstoned:
+                self._tombs.add(physical)
+            else:
+                start, end = index.span(physical - 1)
+                _splice_file(self._file_path, start, end, b"", index.size)
+                self._count_write(index.size - end)
+                index.replace(physical - 1, b"")
+            self._refresh_count()
+            if totals:
+                for parsed in self._parse_lines(old):
+                    totals.remove(parsed)
+                totals.save()
+            if keywords:
+                keywords.remove(physical, old, renumber=not tombstoned)
+                keywords.save()
+            if times is not None:
+                if not tombstoned:
+                    times.remove(physical)
+                times.save()
+            if tombstoned and len(self._tombs) > self._compact_ratio * len(index):
+                self.compact()
             return True
         return False
+
+    @_locked(exclusive=True)
+    def compact(self) -> int:
+        """Rewrite the file without its tombstoned lines; returns how many were dropped"""
+        if self._backend is not None:
+            return 0
+        removed = len(self._tombs)
+        if not removed:
+            return 0
+        totals = self._summary_cache(rebuild=False)
+        times = TimeIndex(self._file_path)  # Rebuilt with the new line numbers as the file is rewritten
+        compacted = self._file_path.with_name(self._file_path.name + ".compact")
+        with compacted.open("wb") as f:
+            buffer = []
+            for line_number, (_, line) in enumerate(self._iter_lines(), 1):
+                times.add(line_number, line)
+                buffer.append(line[:-1] if line.endswith("\n") else line)
+                if len(buffer) >= BATCH_SIZE:
+                    f.write(self._encode("\n".join(buffer)))
+                    buffer.clear()
+            if buffer:
+                f.write(self._encode("\n".join(buffer)))
+            self._count_write(f.tell())
+        os.replace(compacted, self._file_path)
+        self._tombs.reset()
+        self._index.rebuild()
+        self._refresh_count()
+        if totals:
+            totals.save()  # Same expenses, rewritten file
+        times.save()
+        self._times = times
+        self._keywords = None  # Line numbers changed; the index is rebuilt on the next search
+        return removed
     
+    @_locked()
     def find_expense(self, line_pos: int) -> str:
         if line_pos > self._total_lines or line_pos < 1:
             raise ValueError("Number given is not in the range of values added")
-        line = ""
-        with self._file_path.open("r") as f:
-            line = f.readlines()[line_pos-1]
-            # Print confirmation after adding the expense
-        return line.strip()
+        if self._backend is not None:
+            return self._backend.read(line_pos).strip()
+        return self._read_line(self._tombs.physical(line_pos))
     
+    @_locked(exclusive=True)
     def update_expense(self, line_pos: int, new_value: str)->bool:
+        index = self._index
         if line_pos > self._total_lines or line_pos < 1:
             raise ValueError("Line out of range")
-        lines = self._file_path.read_text().splitlines()
-        # Replace the line (if the line index is valid)
-        lines[line_pos-1] = new_value
-        # Write the updated lines back to the file
-        self._file_path.write_text("\n".join(lines))
-        return True
\ No newline at end of file
+        if self._backend is not None:
+            self._backend.update(line_pos, new_value)
+            self._refresh_count()
+            return True
+        totals = self._summary_cache(rebuild=False)
+        # A value spanning several lines renumbers the rest, so the keyword and time indexes are left to go stale
+        keywords = self._keyword_index(rebuild=False) if "\n" not in new_value else None
+        times = self._time_index(rebuild=False) if "\n" not in new_value else None
+        slot = self._tombs.physical(line_pos)
+        physical = self._tombs.target(slot)
+        old = self._read_line(slot) if totals or keywords else None
+        if self._record_width and "\n" not in new_value:
+            start, end = index.span(physical - 1)
+            data = self._encode(new_value)
+            if len(data) <= end - start and (physical < len(index) or index.terminated):
+                # Fits in the record: overwrite it with one seek and write
+                with self._file_path.open("r+b") as f:
+                    f.seek(start)
+                    f.write(data[:-1].ljust(end - start - 1, PAD) + b"\n")
+                self._count_write(end - start)
+                index.touch()
+            else:
+                # Too long: append the new version and point the slot at it
+                if not index.terminated:
+                    data = b"\n" + data
+                with self._file_path.open("ab") as f:
+                    f.write(data)
+                self._count_write(len(data))
+                index.append(data)
+                self._tombs.move(slot, len(index))
+        else:
+            # Replace the slot's own line by moving the rest of the file; a moved slot's copy stays removed
+            self._tombs.restore(slot)
+            start, end = index.span(slot - 1)
+            data = self._encode(new_value)
+            _splice_file(self._file_path, start, end, data, index.size)
+            self._count_write(len(data) + index.size - end)
+            index.replace(slot - 1, data)
+            if new_value.count("\n"):
+                self._tombs.shift(slot, new_value.count("\n"))
+        self._refresh_count()
+        if totals:
+            for parsed in self._parse_lines(old):
+                totals.remove(parsed)
+            for parsed in self._parse_lines(new_value):
+                totals.add(parsed)
+            totals.save()
+        if keywords:
+            keywords.update(slot, old, new_value)
+            keywords.save()
+        if times is not None:
+            times.add(slot, new_value)  # The old bounds still hold, so a rewritten timestamp only widens them
+            times.save()
+        if len(self._tombs) > self._compact_ratio * len(index):
+            self.compact()
+        return True
@@ -0,0 +1,536 @@
+import struct
+import zlib
+from array import array
+from bisect import bisect_left, bisect_right, insort
+from itertools import accumulate
+from pathlib import Path
+
+from .record import parse_timestamp
+
+INDEX_SUFFIX = ".idx"
+TOMBSTONE_SUFFIX = ".tomb"
+TIME_INDEX_SUFFIX = ".tix"
+TIME_STRIDE = 256  # Lines per block of the time index
+CHUNK_SIZE = 1 << 20  # Bytes read at a time when scanning a ledger
+TAIL_SIZE = 4096  # Bytes at the end of a ledger covered by its checksum
+
+# Sidecar layout: header followed by one native int64 offset per line
+_MAGIC = b"EXPIDX01"
+_HEADER = struct.Struct("<8sqqq")  # magic, ledger size, ledger mtime_ns, line count
+_OFFSET = struct.Struct("=q")
+
+# Time index sidecar: header followed by the smallest then largest timestamp of each block (native int64),
+# block after block so an append only rewrites the last ones
+_TIME_MAGIC = b"EXPTIX02"
+_TIME_HEADER = struct.Struct("<8sqqqqqq")  # magic, ledger state (size, mtime_ns, checksum, removed), stride, blocks
+_NO_TIME = (2 ** 63 - 1, -2 ** 63)  # Bounds of a block without any timestamp
+
+
+def count_lines(path, chunk_size: int = CHUNK_SIZE) -> tuple:
+    """Count the lines of a file with a chunked binary newline count.
+
+    Returns (line count, size in bytes, whether the file ends with a newline),
+    counting a last line without newline like readlines() does.
+    """
+    count = 0
+    size = 0
+    last = b"\n"
+    with Path(path).open("rb") as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            count += chunk.count(b"\n")
+            size += len(chunk)
+            last = chunk[-1:]
+    terminated = last == b"\n"
+    return count + (0 if terminated else 1), size, terminated
+
+
+def ledger_state(path) -> list:
+    """Size, mtime and a checksum of the last bytes of a ledger, used to validate sidecars.
+
+    The size of its tombstone log is included too, since removing a line
+    in tombstone mode doesn't touch the ledger itself.
+    """
+    path = Path(path)
+    stat = path.stat()
+    with path.open("rb") as f:
+        f.seek(max(0, stat.st_size - TAIL_SIZE))
+        checksum = zlib.crc32(f.read(TAIL_SIZE))
+    tombstones = path.with_name(path.name + TOMBSTONE_SUFFIX)
+    removed = tombstones.stat().st_size if tombstones.exists() else 0
+    return [stat.st_size, stat.st_mtime_ns, checksum, removed]
+
+
+class LineIndex:
+    """Byte offset of the start of every line of a ledger, persisted in a sidecar file.
+
+    Opening only reads the sidecar header, so the line count is known in
+    constant time; the offsets themselves are read from the sidecar on
+    demand and only loaded into memory by operations that rewrite them.
+    """
+
+    def __init__(self, ledger_path, cache=None):
+        self._ledger_path = Path(ledger_path)
+        self._path = self._ledger_path.with_name(self._ledger_path.name + INDEX_SUFFIX)
+        self._cache = cache  # Optional BlockCache for reading offsets from the sidecar
+        self._offsets = None  # In-memory copy of the offsets, loaded on demand
+        self._count = 0
+        self._size = 0  # Size of the ledger the offsets describe
+        self._terminated = True  # Whether the ledger ends with a newline (or is empty)
+        self._fresh = self._read_header()  # Whether the sidecar matches the ledger
+        if not self._fresh:
+            # Stale or missing sidecar: count now, rebuild the offsets when first needed
+            self._count, self._size, self._terminated = count_lines(self._ledger_path)
+
+    def __len__(self):
+        return self._count
+
+    @property
+    def path(self) -> Path:
+        return self._path
+
+    @property
+    def fresh(self) -> bool:
+        """Whether the sidecar matched the ledger when it was opened, or has been rewritten since"""
+        return self._fresh
+
+    @property
+    def size(self) -> int:
+        """Size in bytes of the indexed ledger"""
+        return self._size
+
+    @property
+    def terminated(self) -> bool:
+        """True when the ledger is empty or its last line ends with a newline"""
+        return self._terminated
+
+    def span(self, line: int) -> tuple:
+        """Return the (start, end) byte range of a 0-indexed line, newline included"""
+        if self._offsets is None and not self._fresh:
+            self.rebuild()
+        if self._offsets is not None:
+            start = self._offsets[line]
+            end = self._offsets[line + 1] if line + 1 < self._count else self._size
+            return start, end
+        # Read just the two offsets needed from the sidecar
+        position = _HEADER.size + line * _OFFSET.size
+        if self._cache is not None:
+            data = self._cache.read(self._path, position, position + 2 * _OFFSET.size)
+        else:
+            with self._path.open("rb") as f:
+                f.seek(position)
+                data = f.read(2 * _OFFSET.size)
+        start = _OFFSET.unpack_from(data)[0]
+        end = _OFFSET.unpack_from(data, _OFFSET.size)[0] if line + 1 < self._count else self._size
+        return start, end
+
+    def rebuild(self):
+        """Scan the ledger in fixed-size chunks and rewrite the sidecar"""
+        offsets = array("q")
+        size = 0
+        last = b"\n"
+        with self._ledger_path.open("rb") as f:
+            while True:
+                chunk = f.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                if last == b"\n":
+                    offsets.append(size)
+                pos = chunk.find(b"\n")
+                while pos != -1 and pos + 1 < len(chunk):
+                    offsets.append(size + pos + 1)
+                    pos = chunk.find(b"\n", pos + 1)
+                size += len(chunk)
+                last = chunk[-1:]
+        self._offsets = offsets
+        self._count = len(offsets)
+        self._size = size
+        self._terminated = last == b"\n"
+        self._save(offsets)
+
+    def append(self, data: bytes):
+        """Record `data` as written at the current end of the ledger"""
+        if self._offsets is None and not self._fresh:
+            self.rebuild()  # The scan already covers the appended data
+            return
+        first = self._count
+        starts = array("q", self._line_starts(self._size, data, self._terminated))
+        if self._offsets is not None:
+            self._offsets.extend(starts)
+        self._count += len(starts)
+        self._size += len(data)
+        if data:
+            self._terminated = data.endswith(b"\n")
+        self._save(starts, first)
+
+    def replace(self, line: int, data: bytes):
+        """Record 0-indexed `line` as replaced by `data` (empty to remove it)"""
+        offsets = self._load_offsets()
+        start, end = self.span(line)
+        is_last = line == self._count - 1
+        delta = len(data) - (end - start)
+        tail = array("q", (offset + delta for offset in offsets[line + 1:]))
+        del offsets[line:]
+        offsets.extend(self._line_starts(start, data, True))
+        offsets.extend(tail)
+        self._count = len(offsets)
+        self._size += delta
+        if is_last:
+            self._terminated = data.endswith(b"\n") if data else True
+        self._save(offsets[line:], line)
+
+    def touch(self):
+        """Record that the ledger was rewritten in place without any line moving"""
+        self._save(array("q"), self._count)
+
+    def reset(self):
+        """Forget every line, for a ledger that was truncated to zero"""
+        self._offsets = array("q")
+        self._count = 0
+        self._size = 0
+        self._terminated = True
+        self._save(self._offsets)
+
+    @staticmethod
+    def _line_starts(at: int, data: bytes, terminated: bool) -> list:
+        """Offsets of the lines that begin inside `data` written at byte `at`"""
+        starts = [at] if data and terminated else []
+        pos = data.find(b"\n")
+        while pos != -1 and pos + 1 < len(data):
+            starts.append(at + pos + 1)
+            pos = data.find(b"\n", pos + 1)
+        return starts
+
+    def _stat(self):
+        stat = self._ledger_path.stat()
+        return stat.st_size, stat.st_mtime_ns
+
+    def _read_header(self) -> bool:
+        """Read the sidecar header if it still matches the ledger on disk"""
+        try:
+            with self._path.open("rb") as f:
+                magic, size, mtime_ns, count = _HEADER.unpack(f.read(_HEADER.size))
+        except (OSError, struct.error):
+            return False
+        if magic != _MAGIC or (size, mtime_ns) != self._stat():
+            return False
+        self._count = count
+        self._size = size
+        if size:
+            with self._ledger_path.open("rb") as f:
+                f.seek(size - 1)
+                self._terminated = f.read(1) == b"\n"
+        return True
+
+    def _load_offsets(self) -> array:
+        """Load every offset into memory, rebuilding them if the sidecar is unusable"""
+        if self._offsets is None and self._fresh:
+            offsets = array("q")
+            try:
+                with self._path.open("rb") as f:
+                    f.seek(_HEADER.size)
+                    offsets.fromfile(f, self._count)
+                self._offsets = offsets
+            except (OSError, EOFError):
+                self._fresh = False
+        if self._offsets is None:
+            self.rebuild()
+        return self._offsets
+
+    def _save(self, offsets: array, first: int = 0):
+        """Write the header, then `offsets` starting at line `first`, to the sidecar"""
+        size, mtime_ns = self._stat()
+        mode = "r+b" if first and self._path.exists() else "wb"
+        with self._path.open(mode) as f:
+            f.write(_HEADER.pack(_MAGIC, size, mtime_ns, self._count))
+            f.seek(_HEADER.size + first * _OFFSET.size)
+            offsets.tofile(f)
+            f.truncate()
+        self._fresh = True
+        if self._cache is not None:
+            # Every change to the ledger ends here, even in-place ones that keep its size and mtime
+            self._cache.invalidate(self._ledger_path)
+            self._cache.invalidate(self._path)
+
+
+class Tombstones:
+    """Physical line numbers (1-indexed) of removed lines that are still in the ledger.
+
+    Removing a line only appends its number to a sidecar log; reads skip the
+    dead lines until the ledger is compacted. Logical line numbers, as shown
+    to users, map to physical ones by binary search over the sorted numbers.
+
+    A line can also be moved: its new copy is appended to the ledger and
+    hidden there, while its original slot keeps its place in the numbering
+    and redirects reads to the copy. The log stores a move as `-slot, copy`.
+    """
+
+    def __init__(self, ledger_path):
+        self._ledger_path = Path(ledger_path)
+        self._path = self._ledger_path.with_name(self._ledger_path.name + TOMBSTONE_SUFFIX)
+        self._dead = array("q")  # Sorted physical line numbers
+        self._moved = {}  # Slot -> physical line holding its current copy
+        if self._path.exists():
+            entries = array("q")
+            with self._path.open("rb") as f:
+                entries.frombytes(f.read())
+            dead = set()
+            entries = iter(entries)
+            for line in entries:
+                if line < 0:
+                    copy = next(entries)
+                    self._moved[-line] = copy
+                    dead.add(copy)
+                else:
+                    dead.add(line)
+            self._dead = array("q", sorted(dead))
+
+    def __len__(self):
+        return len(self._dead)
+
+    def __contains__(self, line: int):
+        position = bisect_left(self._dead, line)
+        return position < len(self._dead) and self._dead[position] == line
+
+    @property
+    def path(self) -> Path:
+        return self._path
+
+    @property
+    def dead(self) -> array:
+        return self._dead
+
+    @property
+    def moved(self) -> dict:
+        return self._moved
+
+    def add(self, line: int):
+        """Mark a physical line as removed"""
+        insort(self._dead, line)
+        with self._path.open("ab") as f:
+            f.write(_OFFSET.pack(line))
+
+    def move(self, slot: int, copy: int):
+        """Redirect a live slot to the physical line `copy`, which is hidden from listings"""
+        insort(self._dead, copy)
+        self._moved[slot] = copy
+        with self._path.open("ab") as f:
+            f.write(_OFFSET.pack(-slot) + _OFFSET.pack(copy))
+
+    def restore(self, slot: int):
+        """Point a moved slot back at its own line, leaving its copy removed"""
+        if self._moved.pop(slot, None) is not None:
+            self._save()
+
+    def target(self, slot: int) -> int:
+        """Physical line holding the current contents of a slot"""
+        return self._moved.get(slot, slot)
+
+    def physical(self, line: int) -> int:
+        """Physical line number of the `line`-th live line"""
+        # Dead line i (0-indexed) sits before the answer iff dead[i] - i <= line
+        dead = self._dead
+        low, high = 0, len(dead)
+        while low < high:
+            middle = (low + high) // 2
+            if dead[middle] - middle <= line:
+                low = middle + 1
+            else:
+                high = middle
+        return line + low
+
+    def logical(self, line: int) -> int:
+        """Logical line number of a live physical line"""
+        return line - bisect_left(self._dead, line)
+
+    def shift(self, after: int, delta: int):
+        """Renumber the dead lines after physical line `after` by `delta`"""
+        start = bisect_right(self._dead, after)
+        self._dead[start:] = array("q", (line + delta for line in self._dead[start:]))
+        self._moved = {slot + delta if slot > after else slot: copy + delta if copy > after else copy
+                       for slot, copy in self._moved.items()}
+        self._save()
+
+    def truncate(self, count: int):
+        """Forget dead lines past the end of a ledger of `count` physical lines"""
+        end = bisect_right(self._dead, count)
+        if end < len(self._dead):
+            del self._dead[end:]
+            self._moved = {slot: copy for slot, copy in self._moved.items() if copy <= count}
+            self._save()
+
+    def reset(self):
+        self._dead = array("q")
+        self._moved = {}
+        self._path.unlink(missing_ok=True)
+
+    def _save(self):
+        if self._dead:
+            copies = set(self._moved.values())
+            entries = array("q", (line for line in self._dead if line not in copies))
+            for slot, copy in self._moved.items():
+                entries.extend((-slot, copy))
+            self._path.write_bytes(entries.tobytes())
+        else:
+            self._path.unlink(missing_ok=True)
+
+
+def line_timestamp(line: str):
+    """Timestamp of a ledger line in epoch seconds, or None if it doesn't start with one"""
+    if line[19:20] != "\t":
+        return None
+    try:
+        return parse_timestamp(line[:19])
+    except ValueError:
+        return None
+
+
+class TimeIndex:
+    """Smallest and largest timestamp of every block of `stride` physical lines, kept in a sidecar.
+
+    Lines are appended in time order, so the blocks hardly overlap and a
+    range query binary-searches straight to the few that can hold matches.
+    A block's bounds only ever widen, so a line rewritten with an earlier or
+    later timestamp just makes the query read a few more blocks; `in_order`
+    tells whether that happened. Like the summary cache, the sidecar records
+    the ledger state it matches and is rebuilt when that state is stale.
+    """
+
+    def __init__(self, ledger_path, stride: int = None):
+        self._ledger_path = Path(ledger_path)
+        self._path = self._ledger_path.with_name(self._ledger_path.name + TIME_INDEX_SUFFIX)
+        self._stride = stride or TIME_STRIDE
+        self._minimums = array("q")
+        self._maximums = array("q")
+        self._bounds = None  # Running maximums and trailing minimums, computed on demand
+        self._state = None  # Ledger state the bounds describe
+        self._changed = 0  # First block not yet written to the sidecar, None if it is up to date
+
+    def __len__(self):
+        return len(self._minimums)
+
+    @property
+    def path(self) -> Path:
+        return self._path
+
+    @property
+    def stride(self) -> int:
+        return self._stride
+
+    @property
+    def in_order(self) -> bool:
+        """False when some block holds a timestamp earlier than one in a block before it"""
+        running_maximums, _ = self._running_bounds()
+        return all(minimum >= maximum for minimum, maximum in zip(self._minimums[1:], running_maximums))
+
+    def is_current(self) -> bool:
+        """Whether the bounds still describe the ledger on disk"""
+        return self._state == ledger_state(self._ledger_path)
+
+    def load(self) -> bool:
+        """Read the sidecar if it matches the ledger on disk"""
+        try:
+            with self._path.open("rb") as f:
+                magic, *state, stride, blocks = _TIME_HEADER.unpack(f.read(_TIME_HEADER.size))
+                bounds = array("q")
+                bounds.fromfile(f, 2 * blocks)
+        except (OSError, EOFError, struct.error):
+            return False
+        if magic != _TIME_MAGIC or stride != self._stride or state != ledger_state(self._ledger_path):
+            return False
+        self._minimums, self._maximums = bounds[::2], bounds[1::2]
+        self._bounds = None
+        self._state = state
+        self._changed = None
+        return True
+
+    def save(self):
+        """Record the current ledger state and write the header and the blocks changed since the last save"""
+        self._state = ledger_state(self._ledger_path)
+        blocks = len(self._minimums)
+        first = blocks if self._changed is None else min(self._changed, blocks)
+        mode = "r+b" if first and self._path.exists() else "wb"
+        with self._path.open(mode) as f:
+            if f.seek(0, 2) < _TIME_HEADER.size + first * 2 * _OFFSET.size:
+                first = 0  # The sidecar is shorter than the blocks it should already hold
+            bounds = array("q", bytes(2 * (blocks - first) * _OFFSET.size))
+            bounds[::2], bounds[1::2] = self._minimums[first:], self._maximums[first:]
+            f.seek(0)
+            f.write(_TIME_HEADER.pack(_TIME_MAGIC, *self._state, self._stride, blocks))
+            f.seek(_TIME_HEADER.size + first * 2 * _OFFSET.size)
+            bounds.tofile(f)
+            f.truncate()
+        self._changed = None
+
+    def rebuild(self, lines):
+        """Recompute the bounds from (physical line number, line) pairs covering the whole ledger"""
+        self.reset()
+        for line_number, line in lines:
+            self.add(line_number, line)
+        self.save()
+
+    def reset(self):
+        self._minimums = array("q")
+        self._maximums = array("q")
+        self._bounds = None
+        self._changed = 0
+
+    def add(self, line_number: int, line: str):
+        """Widen the bounds of the block of physical `line_number` to cover the timestamp of `line`"""
+        self.add_timestamp(line_number, line_timestamp(line))
+
+    def add_timestamp(self, line_number: int, timestamp):
+        """Widen the bounds of the block of physical `line_number` to cover `timestamp`, unless it is None"""
+        if timestamp is None:
+            return
+        block = (line_number - 1) // self._stride
+        if block >= len(self._minimums):
+            missing = block + 1 - len(self._minimums)
+            self._mark(len(self._minimums))
+            self._minimums.extend([_NO_TIME[0]] * missing)
+            self._maximums.extend([_NO_TIME[1]] * missing)
+        if timestamp < self._minimums[block]:
+            self._minimums[block] = timestamp
+            self._bounds = None
+            self._mark(block)
+        if timestamp > self._maximums[block]:
+            self._maximums[block] = timestamp
+            self._bounds = None
+            self._mark(block)
+
+    def remove(self, line_number: int):
+        """Renumber the lines after physical `line_number`, which was removed, by widening bounds.
+
+        Each later line moves up by one, at most into the block before its
+        own, so every block takes in the bounds of the one after it.
+        """
+        first = (line_number - 1) // self._stride
+        minimums, maximums = self._minimums, self._maximums
+        for block in range(first, len(minimums) - 1):
+            minimums[block] = min(minimums[block], minimums[block + 1])
+            maximums[block] = max(maximums[block], maximums[block + 1])
+        self._bounds = None
+        self._mark(first)
+
+    def lines(self, start: int, end: int) -> tuple:
+        """(first, last) physical lines that can hold timestamps in [start, end); first > last if none"""
+        running_maximums, trailing_minimums = self._running_bounds()
+        # Every block before `first` ends below `start`; every block from `stop` on starts at `end` or later
+        first = bisect_left(running_maximums, start)
+        stop = bisect_left(trailing_minimums, end)
+        return first * self._stride + 1, stop * self._stride
+
+    def _mark(self, block: int):
+        """Note that `block` changed, for the next save"""
+        if self._changed is None or block < self._changed:
+            self._changed = block
+
+    def _running_bounds(self) -> tuple:
+        """Maximum timestamp up to each block and minimum from each block on, both non-decreasing"""
+        if self._bounds is None:
+            trailing = array("q", accumulate(reversed(self._minimums), min))
+            trailing.reverse()
+            self._bounds = array("q", accumulate(self._maximums, max)), trailing
+        return self._bounds
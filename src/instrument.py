@@ -0,0 +1,222 @@
+import atexit
+import os
+import time
+from bisect import bisect_left
+from functools import partial
+
+STATS_ENV = "EXPENSE_STATS"  # Set to 1 to instrument every ExpenseTracker
+PROFILE_ENV = "EXPENSE_PROFILE"  # File to dump cProfile stats of tracker operations to at exit
+TRACEMALLOC_ENV = "EXPENSE_TRACEMALLOC"  # File to write the top memory allocations to at exit
+TRACEMALLOC_TOP = 25  # Allocation sites written to the tracemalloc report
+
+# Upper bounds, in seconds, of the latency histogram buckets: 10µs, 20µs, 50µs ... 5s, 10s, then overflow
+LATENCY_BOUNDS = tuple(m * 10.0 ** e for e in range(-5, 1) for m in (1, 2, 5)) + (10.0,)
+
+_profiler = None  # Process-wide cProfile.Profile, created from PROFILE_ENV
+_profiling = 0  # Operations currently running under the profiler, across every tracker
+
+
+def enabled_from_env() -> bool:
+    """Whether the environment asks for instrumentation"""
+    return os.environ.get(STATS_ENV, "") not in ("", "0") or bool(os.environ.get(PROFILE_ENV)) \
+        or bool(os.environ.get(TRACEMALLOC_ENV))
+
+
+def _start_captures():
+    """Start the cProfile and tracemalloc captures asked for by the environment, once per process"""
+    global _profiler
+    profile_path = os.environ.get(PROFILE_ENV)
+    if profile_path and _profiler is None:
+        import cProfile
+        _profiler = cProfile.Profile()
+        atexit.register(_profiler.dump_stats, profile_path)
+    tracemalloc_path = os.environ.get(TRACEMALLOC_ENV)
+    import tracemalloc
+    if tracemalloc_path and not tracemalloc.is_tracing():
+        tracemalloc.start()
+        atexit.register(write_tracemalloc, tracemalloc_path)
+
+
+def write_tracemalloc(path, top: int = TRACEMALLOC_TOP):
+    """Write the allocation sites holding the most memory to a text file"""
+    import tracemalloc
+    if not tracemalloc.is_tracing():
+        return
+    current, peak = tracemalloc.get_traced_memory()
+    statistics = tracemalloc.take_snapshot().statistics("lineno")
+    with open(path, "w") as f:
+        f.write(f"current {current} B, peak {peak} B\n")
+        for statistic in statistics[:top]:
+            f.write(f"{statistic}\n")
+
+
+def format_latency(seconds: float) -> str:
+    if seconds < 1e-3:
+        return f"{seconds * 1e6:.0f}µs"
+    if seconds < 1:
+        return f"{seconds * 1e3:.1f}ms"
+    return f"{seconds:.2f}s"
+
+
+class OperationStats:
+    """Calls, latency histogram, bytes and rows of one tracker method"""
+    __slots__ = ("calls", "seconds", "max_seconds", "histogram", "bytes_read", "bytes_written", "rows",
+                 "peak_bytes")
+
+    def __init__(self):
+        self.calls = 0
+        self.seconds = 0.0
+        self.max_seconds = 0.0
+        self.histogram = [0] * (len(LATENCY_BOUNDS) + 1)
+        self.bytes_read = 0
+        self.bytes_written = 0
+        self.rows = 0
+        self.peak_bytes = 0  # Largest traced allocation peak of a call, while tracemalloc runs
+
+    def record(self, seconds: float, rows: int = 0):
+        self.calls += 1
+        self.seconds += seconds
+        self.max_seconds = max(self.max_seconds, seconds)
+        self.histogram[bisect_left(LATENCY_BOUNDS, seconds)] += 1
+        self.rows += rows
+
+    def percentile(self, fraction: float) -> float:
+        """Latency below which `fraction` of the calls fell, to the resolution of the histogram"""
+        if not self.calls:
+            return 0.0
+        rank = max(1, round(fraction * self.calls))
+        seen = 0
+        for bucket, count in enumerate(self.histogram):
+            seen += count
+            if seen >= rank:
+                return min(LATENCY_BOUNDS[bucket], self.max_seconds) if bucket < len(LATENCY_BOUNDS) \
+                    else self.max_seconds
+        return self.max_seconds
+
+    def to_dict(self) -> dict:
+        labels = [f"<={format_latency(bound)}" for bound in LATENCY_BOUNDS]
+        labels.append(f">{format_latency(LATENCY_BOUNDS[-1])}")
+        return {
+            "calls": self.calls,
+            "seconds": self.seconds,
+            "mean": self.seconds / self.calls if self.calls else 0.0,
+            "p50": self.percentile(0.5),
+            "p99": self.percentile(0.99),
+            "max": self.max_seconds,
+            "histogram": {label: count for label, count in zip(labels, self.histogram) if count},
+            "bytes_read": self.bytes_read,
+            "bytes_written": self.bytes_written,
+            "rows": self.rows,
+            "peak_bytes": self.peak_bytes,
+        }
+
+
+class Instrumentation:
+    """Per-method statistics of one ExpenseTracker.
+
+    Only the outermost instrumented call is recorded, so the bytes and rows
+    of the methods it calls are counted once, against it. Generators are
+    timed while they run, not while their consumer holds them.
+    """
+
+    def __init__(self):
+        self._operations = {}
+        self._active = None  # OperationStats of the call in progress, which I/O is counted against
+        _start_captures()
+
+    def stats(self) -> dict:
+        """Statistics of every method with a finished call, by name"""
+        return {name: operation.to_dict() for name, operation in sorted(self._operations.items()) if operation.calls}
+
+    def reset(self):
+        self._operations = {}
+
+    def read(self, size: int):
+        if self._active is not None:
+            self._active.bytes_read += size
+
+    def wrote(self, size: int, rows: int = 0):
+        if self._active is not None:
+            self._active.bytes_written += size
+            self._active.rows += rows
+
+    def wrap(self, name: str, method):
+        """`method` recording its calls under `name`"""
+        from inspect import isgeneratorfunction
+        return partial(self.call, name, method, isgeneratorfunction(method))
+
+    def call(self, name: str, method, generator: bool, *args, **kwargs):
+        """Run `method`, recording its latency and the rows it returned under `name`"""
+        if self._active is not None:
+            return method(*args, **kwargs)  # Part of an outer operation
+        operation = self._operations.get(name)
+        if operation is None:
+            operation = self._operations[name] = OperationStats()
+        if generator:
+            return self._iterate(operation, method(*args, **kwargs))
+        start = time.perf_counter()
+        try:
+            result = self._run(operation, method, *args, **kwargs)
+        finally:
+            operation.record(time.perf_counter() - start)
+        if isinstance(result, (list, dict)):
+            operation.rows += len(result)
+        elif isinstance(result, (bool, str)) and result:
+            operation.rows += 1  # One line found, removed or updated
+        return result
+
+    def _run(self, operation: OperationStats, function, *args, **kwargs):
+        """Call `function` with I/O counted against `operation`, under the profiler if there is one"""
+        global _profiling
+        if self._active is not None:
+            return function(*args, **kwargs)  # A generator step inside another operation
+        import tracemalloc
+        self._active = operation
+        tracing = tracemalloc.is_tracing()
+        if tracing:
+            tracemalloc.reset_peak()
+            before = tracemalloc.get_traced_memory()[0]
+        if _profiler is not None:
+            if not _profiling:
+                _profiler.enable()
+            _profiling += 1
+        try:
+            return function(*args, **kwargs)
+        finally:
+            if _profiler is not None:
+                _profiling -= 1
+                if not _profiling:
+                    _profiler.disable()
+            if tracing and tracemalloc.is_tracing():
+                operation.peak_bytes = max(operation.peak_bytes, tracemalloc.get_traced_memory()[1] - before)
+            self._active = None
+
+    def _iterate(self, operation: OperationStats, generator):
+        """Yield from a generator, timing each step and recording the call once it is done"""
+        seconds = 0.0
+        rows = 0
+        try:
+            while True:
+                start = time.perf_counter()
+                try:
+                    item = self._run(operation, next, generator)
+                except StopIteration:
+                    return
+                finally:
+                    seconds += time.perf_counter() - start
+                rows += 1
+                yield item
+        finally:
+            generator.close()
+            operation.record(seconds, rows)
+
+
+def format_stats(stats: dict) -> list:
+    """Lines describing the statistics returned by ExpenseTracker.stats()"""
+    lines = []
+    for name, operation in stats.items():
+        lines.append(f"{name}: {operation['calls']} calls, mean {format_latency(operation['mean'])}, "
+                     f"p50 {format_latency(operation['p50'])}, p99 {format_latency(operation['p99'])}, "
+                     f"max {format_latency(operation['max'])}, {operation['rows']} rows, "
+                     f"{operation['bytes_read']} B read, {operation['bytes_written']} B written")
+    return lines
@@ -0,0 +1,234 @@
+import argparse
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from .expense import DIRECTORY, ENCODING, ExpenseTracker, SUMMARY_ROWS
+from .index import TOMBSTONE_SUFFIX
+from .record import ExpenseTable
+from .search import expense_tokens, tokenize
+from .storage import BACKEND_SUFFIXES
+from .summary import BUCKETS, format_summary, merge_summaries, summarize
+
+TEXT_SUFFIX = ".txt"  # Text ledgers; the others are found by their storage backend's suffix
+CHUNK_BYTES = 64 << 20  # Larger ledgers are split into byte ranges of about this size
+TASK_BYTES = 8 << 20  # Small ledgers are grouped into tasks of at most about this many bytes
+TASKS_PER_WORKER = 4  # Smaller tasks keep every worker busy until the end
+
+
+def discover(directory=DIRECTORY) -> list:
+    """Every ledger under a directory, text or kept by a storage backend, in a stable order.
+
+    A segmented ledger is a directory, whose segments aren't ledgers of their own.
+    """
+    ledgers = []
+    for root, directories, files in os.walk(directory):
+        segmented = [name for name in directories if _backend(name) == "segments"]
+        directories[:] = [name for name in directories if name not in segmented]
+        files = [name for name in files if Path(name).suffix == TEXT_SUFFIX or _backend(name) not in (None, "segments")]
+        ledgers.extend(Path(root, name) for name in segmented + files)
+    return sorted(ledgers)
+
+
+def _backend(name: str):
+    """Storage backend of a ledger named `name`, or None for a text ledger or another file"""
+    return BACKEND_SUFFIXES.get(Path(name).suffix.lower())
+
+
+def _size(path: Path) -> int:
+    """Bytes of a ledger, or of every segment of a segmented one"""
+    if path.is_dir():
+        return sum(child.stat().st_size for child in path.iterdir() if child.is_file())
+    return path.stat().st_size
+
+
+def _units(path: Path, chunk_bytes: int) -> list:
+    """Split a ledger into (path, start, end) byte ranges; None for the end means the whole ledger.
+
+    Ledgers kept by a storage backend, and ledgers with tombstones, whose dead
+    and moved lines can only be told apart with their sidecars, are read
+    through ExpenseTracker as one unit.
+    """
+    if _backend(path.name) or path.with_name(path.name + TOMBSTONE_SUFFIX).exists():
+        return [(path, 0, None)]
+    size = _size(path)
+    return [(path, start, min(start + chunk_bytes, size)) for start in range(0, size, chunk_bytes)]
+
+
+def _tasks(paths, chunk_bytes: int, workers: int) -> list:
+    """Group units into tasks so that many small ledgers share one, with a few tasks per worker"""
+    total = sum(_size(path) for path in paths)
+    limit = max(1, min(TASK_BYTES, total // (workers * TASKS_PER_WORKER)))
+    tasks = []
+    task = []
+    task_bytes = 0
+    for path in paths:
+        for unit in _units(path, chunk_bytes):
+            _, start, end = unit
+            task.append(unit)
+            task_bytes += (_size(path) if end is None else end) - start
+            if task_bytes >= limit:
+                tasks.append(task)
+                task = []
+                task_bytes = 0
+    if task:
+        tasks.append(task)
+    return tasks
+
+
+def _read_unit(path: Path, start: int, end):
+    """Yield the lines of a unit: those whose first byte lies in [start, end)"""
+    if end is None:
+        tracker = ExpenseTracker(file_path=path.name, directory=path.parent)
+        yield from tracker.iter_expenses()
+        tracker.close()
+        return
+    with path.open("rb") as f:
+        if start:
+            f.seek(start - 1)
+            f.readline()  # Finish the line that began before the range
+        position = f.tell()
+        while position < end:
+            line = f.readline()
+            if not line:
+                break
+            position += len(line)
+            yield line.decode(ENCODING)
+
+
+def _summarize_task(task: list, by: str) -> dict:
+    result = {}
+    for path, start, end in task:
+        if end is None:
+            # Whole ledgers are summarised by their tracker, from its backend's indexes or caches
+            tracker = ExpenseTracker(file_path=path.name, directory=path.parent)
+            try:
+                merge_summaries(result, tracker.summary(by))
+            finally:
+                tracker.close()
+            continue
+        lines = []
+        for line in _read_unit(path, start, end):
+            lines.append(line)
+            if len(lines) >= SUMMARY_ROWS:
+                merge_summaries(result, summarize(ExpenseTable.from_lines(lines), by))
+                lines = []
+        if lines:
+            merge_summaries(result, summarize(ExpenseTable.from_lines(lines), by))
+    return result
+
+
+def _search_task(task: list, term: str, substring: bool) -> list:
+    """(path, start, lines in the unit, [(line number within the unit, line)]) per unit"""
+    tokens = tokenize(term)
+    results = []
+    for path, start, end in task:
+        matches = []
+        count = 0
+        for count, line in enumerate(_read_unit(path, start, end), 1):
+            if substring:
+                if term in line.lower():
+                    matches.append((count, line.strip()))
+            elif tokens and tokens <= expense_tokens(line):
+                matches.append((count, line.strip()))
+        results.append((path, start, count, matches))
+    return results
+
+
+class LedgerSet:
+    """Every ledger under a directory, queried together by a pool of worker processes.
+
+    Work is split into tasks, with big ledgers cut into newline-aligned byte
+    ranges and small ones grouped together. The tasks are spread over one
+    process per core and their partial results are merged at the end.
+    """
+
+    def __init__(self, directory=DIRECTORY, workers: int = None, chunk_bytes: int = CHUNK_BYTES):
+        self._directory = Path(directory)
+        self._workers = workers or os.cpu_count() or 1
+        self._chunk_bytes = chunk_bytes
+        self._ledgers = discover(self._directory)
+
+    def __len__(self):
+        return len(self._ledgers)
+
+    @property
+    def directory(self) -> Path:
+        return self._directory
+
+    @property
+    def ledgers(self) -> list:
+        return self._ledgers
+
+    def _map(self, function, tasks: list, *args) -> list:
+        """Run `function(task, *args)` for every task, in worker processes when there are several"""
+        if self._workers == 1 or len(tasks) <= 1:
+            return [function(task, *args) for task in tasks]
+        with ProcessPoolExecutor(max_workers=min(self._workers, len(tasks))) as pool:
+            return list(pool.map(function, tasks, *([arg] * len(tasks) for arg in args)))
+
+    def summary(self, by: str = "category") -> dict:
+        """Summaries of every ledger's expenses, grouped by category, day, week or month"""
+        if by not in BUCKETS:
+            raise ValueError(f"Unknown grouping {by!r}, expected one of {', '.join(BUCKETS)}")
+        result = {}
+        tasks = _tasks(self._ledgers, self._chunk_bytes, self._workers)
+        for partial in self._map(_summarize_task, tasks, by):
+            merge_summaries(result, partial)
+        return result
+
+    def search(self, term: str, substring: bool = False) -> list:
+        """(ledger path, line number, line) of the lines matching `term` in every ledger.
+
+        Matches every word of `term` in the category or description, like
+        ExpenseTracker.search, or any case-insensitive substring of the line.
+        """
+        term = term.lower() if substring else term
+        units = []
+        tasks = _tasks(self._ledgers, self._chunk_bytes, self._workers)
+        for partial in self._map(_search_task, tasks, term, substring):
+            units.extend(partial)
+        # Units were searched separately, so number their lines by what precedes them in the ledger
+        units.sort(key=lambda unit: (unit[0], unit[1]))
+        results = []
+        before = 0
+        previous = None
+        for path, _, count, matches in units:
+            if path != previous:
+                before = 0
+                previous = path
+            results.extend((path, before + line_number, line) for line_number, line in matches)
+            before += count
+        return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m src.ledgers",
+                                     description="Query every ledger under a directory at once.")
+    parser.add_argument("--directory", default=DIRECTORY, help="directory holding the ledgers")
+    parser.add_argument("--workers", type=int, help="worker processes (default: one per core)")
+    commands = parser.add_subparsers(dest="command", required=True)
+    summary = commands.add_parser("summary", help="summarise the expenses of every ledger")
+    summary.add_argument("--by", choices=BUCKETS, default="category")
+    search = commands.add_parser("search", help="search every ledger")
+    search.add_argument("term")
+    search.add_argument("--substring", action="store_true", help="match any part of a line")
+    args = parser.parse_args(argv)
+
+    ledgers = LedgerSet(args.directory, args.workers)
+    if args.command == "summary":
+        result = ledgers.summary(args.by)
+        for label in sorted(result):
+            print(format_summary(label, result[label]))
+        if not result:
+            print("No expenses found.")
+    else:
+        results = ledgers.search(args.term, args.substring)
+        for path, line_number, line in results:
+            print(f"{path.relative_to(ledgers.directory)}:{line_number}: {line}")
+        if not results:
+            print("No matching expenses found.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+import os
+from contextlib import contextmanager
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:  # Not available on Windows, where ledgers are then used unlocked
+    fcntl = None
+
+LOCK_SUFFIX = ".lock"
+WAL_SUFFIX = ".wal"
+
+
+class LedgerLock:
+    """Advisory lock on a ledger shared by several processes, held on a `.lock` sidecar.
+
+    Readers take it shared and rewrites take it exclusive. It is reentrant
+    within one tracker: nested holds are free, except that a shared hold
+    can't be upgraded, since two upgrading readers would deadlock.
+    """
+
+    def __init__(self, ledger_path):
+        ledger_path = Path(ledger_path)
+        self._path = ledger_path.with_name(ledger_path.name + LOCK_SUFFIX)
+        self._fd = None
+        self._depth = 0
+        self._exclusive = False
+
+    @property
+    def path(self) -> Path:
+        return self._path
+
+    @property
+    def held(self) -> bool:
+        return self._depth > 0
+
+    def shared(self):
+        return self._hold(exclusive=False)
+
+    def exclusive(self):
+        return self._hold(exclusive=True)
+
+    @contextmanager
+    def _hold(self, exclusive: bool):
+        """Hold the lock; yields True when this call acquired it rather than nesting"""
+        if self._depth:
+            if exclusive and not self._exclusive:
+                raise RuntimeError("A shared ledger lock can't be upgraded to an exclusive one")
+            self._depth += 1
+            try:
+                yield False
+            finally:
+                self._depth -= 1
+            return
+        if fcntl is not None:
+            if self._fd is None:
+                self._fd = os.open(self._path, os.O_RDWR | os.O_CREAT, 0o644)
+            fcntl.flock(self._fd, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+        self._depth = 1
+        self._exclusive = exclusive
+        try:
+            yield True
+        finally:
+            self._depth = 0
+            if fcntl is not None:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+    def close(self):
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+
+class WriteAheadLog:
+    """Append-only log of expense lines not yet written to the ledger.
+
+    Appending takes a short exclusive lock on the log alone, so writers
+    don't wait for each other or for readers of the ledger; the lines are
+    moved into the ledger by whoever next holds its exclusive lock.
+    """
+
+    def __init__(self, ledger_path):
+        ledger_path = Path(ledger_path)
+        self._path = ledger_path.with_name(ledger_path.name + WAL_SUFFIX)
+
+    @property
+    def path(self) -> Path:
+        return self._path
+
+    def __bool__(self):
+        """Whether the log holds lines, checked with a single stat"""
+        try:
+            return self._path.stat().st_size > 0
+        except FileNotFoundError:
+            return False
+
+    def append(self, text: str, fsync: bool = False):
+        """Log the lines of `text` with one write"""
+        fd = os.open(self._path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            if fcntl is not None:
+                fcntl.flock(fd, fcntl.LOCK_EX)
+            os.write(fd, (text + "\n").encode("utf-8"))
+            if fsync:
+                os.fsync(fd)
+        finally:
+            os.close(fd)  # Also releases the lock
+
+    def drain(self, apply):
+        """Pass the logged text to `apply`, then empty the log; call with the ledger locked"""
+        try:
+            fd = os.open(self._path, os.O_RDWR)
+        except FileNotFoundError:
+            return
+        try:
+            if fcntl is not None:
+                fcntl.flock(fd, fcntl.LOCK_EX)
+            chunks = []
+            while True:
+                chunk = os.read(fd, 1 << 20)
+                if not chunk:
+                    break
+                chunks.append(chunk)
+            data = b"".join(chunks)
+            if data:
+                apply(data.decode("utf-8")[:-1])
+                os.ftruncate(fd, 0)
+        finally:
+            os.close(fd)
@@ -1,11 +1,33 @@
 import os
-import datetime
 from .expense import ExpenseTracker
+from .record import Expense, parse_amount, parse_timestamp, format_amount, format_timestamp
+from .summary import BUCKETS, SECONDS_PER_DAY, format_summary
+from .instrument import format_stats
+
+PAGE_SIZE = 20  # Rows printed before asking to continue
 
 def clear_console():
     """Clear the console screen."""
     os.system('cls' if os.name == 'nt' else 'clear')
 
+def print_paged(rows, title, empty_message, page_size=PAGE_SIZE):
+    """Print numbered rows from an iterable one page at a time."""
+    rows = iter(rows)
+    row = next(rows, None)
+    if row is None:
+        print(empty_message)
+        return
+    print(f"\n{title}")
+    idx = 0
+    while row is not None:
+        idx += 1
+        print(f"{idx}. {row.strip()}")
+        row = next(rows, None)
+        # Only ask to continue when there is something left to show
+        if row is not None and idx % page_size == 0:
+            if input("Press Enter to see more, or 'q' to stop: ").strip().lower() == "q":
+                break
+
 def display_menu():
     print("Welcome to the Expense Tracker CLI!")
     
@@ -15,7 +37,8 @@ def display_menu():
         if not file_path:
             file_path = "expense.txt"
         try:
-            obj_expense = ExpenseTracker(file_path)
+            # Instrumented, so the session can show where its time went
+            obj_expense = ExpenseTracker(file_path, instrument=True)
             break  # If no error, break the loop
         except Exception as e:
             print(f"Error initializing Expense Tracker: {e}. Please try again.")
@@ -29,32 +52,29 @@ def display_menu():
         print("4. Update an expense")
         print("5. Clear all expenses")
         print("6. Search expenses")
-        print("7. Exit\n")
+        print("7. Exit")
+        print("8. Summarize expenses")
+        print("9. View expenses between two dates")
+        print("10. Show performance statistics\n")
         
         try:
-            action = input("Please select an option (1-7): ").strip()
+            action = input("Please select an option (1-10): ").strip()
             # clear_console()  # Clear console after user selection
             
             if action == "1":
                 # Add an expense with category and amount
                 category = input("Enter the expense category (e.g., 'Food', 'Transport'): ").strip()
-                amount = float(input("Enter the expense amount (e.g., 25.50): ").strip())
+                amount = parse_amount(input("Enter the expense amount (e.g., 25.50): "))
                 description = input("Enter a brief description of the expense: ").strip()
-                timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                expense = f"{timestamp}\t{category}\t${amount:.2f}\t{description}"
+                expense = Expense.now(category, amount, description)
                 obj_expense.add_expense(expense)
                 # Print confirmation after adding the expense
-                print(f"Expense added: {timestamp} - {category} - ${amount:.2f} - {description}")
+                timestamp = format_timestamp(expense.timestamp)
+                print(f"Expense added: {timestamp} - {category} - {format_amount(amount)} - {description}")
             
             elif action == "2":
-                # View all expenses
-                expenses = obj_expense.get_expenses()
-                if expenses:
-                    print("\nExpenses:")
-                    for idx, expense in enumerate(expenses, 1):
-                        print(f"{idx}. {expense.strip()}")
-                else:
-                    print("No expenses found.")
+                # View all expenses, streamed from disk a page at a time
+                print_paged(obj_expense.iter_expenses(), "Expenses:", "No expenses found.")
             
             elif action == "3":
                 # Remove an expense
@@ -71,10 +91,9 @@ def display_menu():
                     print(f"Current expense: {obj_expense.find_expense(line_number)}")
                     print("Enter new details for the expense:")
                     category = input("Enter the expense category (e.g., 'Food', 'Transport'): ").strip()
-                    amount = float(input("Enter the expense amount (e.g., 25.50): ").strip())
+                    amount = parse_amount(input("Enter the expense amount (e.g., 25.50): "))
                     description = input("Enter a brief description of the expense: ").strip()
-                    timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                    new_value = f"{timestamp}\t{category}\t${amount:.2f}\t{description}"
+                    new_value = Expense.now(category, amount, description).to_line()
                     if obj_expense.update_expense(line_number, new_value):
                         print(f"Expense at line {line_number} updated to: {new_value}")
                 else:
@@ -88,15 +107,47 @@ def display_menu():
             elif action == "6":
                 # Search expenses by category, amount or description
                 search_term = input("Enter a keyword to search for (category, description, or amount): ").strip().lower()
-                expenses = obj_expense.get_expenses()
-                results = [expense for expense in expenses if search_term in expense.lower()]
-                
-                if results:
-                    print("\nSearch Results:")
-                    for idx, result in enumerate(results, 1):
-                        print(f"{idx}. {result.strip()}")
+                matches = dict(obj_expense.search(search_term))
+                try:
+                    matches.update(obj_expense.search_amount(parse_amount(search_term)))
+                except ValueError:
+                    pass  # Not an amount
+                if not matches:
+                    # Nothing matched a whole word, fall back to scanning for the text anywhere
+                    matches = dict(obj_expense.search(search_term, substring=True))
+                results = (matches[line_number] for line_number in sorted(matches))
+                print_paged(results, "Search Results:", "No matching expenses found.")
+            
+            elif action == "8":
+                # Summarize expenses by category or time bucket
+                by = input(f"Group by ({', '.join(BUCKETS)}) [category]: ").strip().lower() or "category"
+                # Category and month summaries come from the cache; other groupings scan the file
+                summary = obj_expense.summary(by)
+                if summary:
+                    print(f"\nSummary by {by}:")
+                    for key in sorted(summary):
+                        print(format_summary(key, summary[key]))
+                else:
+                    print("No expenses found.")
+            
+            elif action == "9":
+                # View the expenses of a range of days, found through the time index
+                first = input("Enter the first day (YYYY-MM-DD): ").strip()
+                last = input("Enter the last day (YYYY-MM-DD), or leave blank for the same day: ").strip() or first
+                start = parse_timestamp(f"{first} 00:00:00")
+                end = parse_timestamp(f"{last} 00:00:00") + SECONDS_PER_DAY
+                results = (line for _, line in obj_expense.query_range(start, end))
+                print_paged(results, f"Expenses from {first} to {last}:", "No expenses found in that range.")
+            
+            elif action == "10":
+                # Latency, bytes and rows of every operation run in this session
+                lines = format_stats(obj_expense.stats())
+                if lines:
+                    print("\nPerformance statistics:")
+                    for line in lines:
+                        print(line)
                 else:
-                    print("No matching expenses found.")
+                    print("No operations recorded yet.")
             
             elif action == "7":
                 # Exit the program
@@ -104,7 +155,7 @@ def display_menu():
                 break  # Exit the loop and end the program
             
             else:
-                print("Invalid option, please select between 1 and 7.")
+                print("Invalid option, please select between 1 and 10.")
         
         except ValueError as e:
             print(f"Invalid input: {e}. Please try again.")
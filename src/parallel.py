@@ -0,0 +1,126 @@
+import os
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+from multiprocessing import resource_tracker, shared_memory
+from operator import add
+from pathlib import Path
+
+from .record import ExpenseTable
+
+RANGE_BYTES = 64 << 20  # Upper bound on the bytes one worker parses at a time
+
+# Int64 columns a worker hands back, followed by the uint32 category codes and the description bytes
+_COLUMNS = ("timestamps", "amounts", "line_numbers", "_description_ends")
+
+
+def split_ranges(path, parts: int) -> list:
+    """Cut a file into about `parts` (start, end) byte ranges that begin at the start of a line"""
+    path = Path(path)
+    size = path.stat().st_size
+    parts = max(1, min(parts, size))
+    starts = [0]
+    with path.open("rb") as f:
+        for part in range(1, parts):
+            f.seek(max(size * part // parts, starts[-1]))
+            if f.tell():
+                f.seek(f.tell() - 1)
+                f.readline()  # Move to the start of the next line
+            if f.tell() >= size:
+                break
+            if f.tell() > starts[-1]:
+                starts.append(f.tell())
+    return [(start, end) for start, end in zip(starts, starts[1:] + [size]) if end > start]
+
+
+def _parse_range(path: str, start: int, end: int) -> tuple:
+    """Parse the lines of one byte range into a shared memory block.
+
+    Returns the block's name, the row count, the description bytes, the
+    categories and how many lines the range holds; line numbers and
+    category codes in the block are local to the range.
+    """
+    with open(path, "rb") as f:
+        f.seek(start)
+        data = f.read(end - start)
+    lines = data.split(b"\n")
+    if lines[-1] == b"":
+        lines.pop()  # The range ends with a newline
+    table = ExpenseTable()
+    for line_number, line in enumerate(lines, 1):
+        table.append_line(line.decode("utf-8"), line_number)
+
+    rows = len(table)
+    descriptions = len(table._descriptions)
+    block = shared_memory.SharedMemory(create=True, size=max(1, rows * (8 * len(_COLUMNS) + 4) + descriptions))
+    # The parent unlinks the block, so it mustn't be reported as leaked when this worker exits
+    resource_tracker.unregister(block._name, "shared_memory")
+    position = 0
+    for column in [getattr(table, name) for name in _COLUMNS] + [table.category_codes, table._descriptions]:
+        raw = memoryview(column).cast("B")
+        block.buf[position:position + len(raw)] = raw
+        position += len(raw)
+        raw.release()
+    block.close()
+    return block.name, rows, descriptions, table.categories, len(lines)
+
+
+def _append_part(table: ExpenseTable, block, rows: int, descriptions: int, categories: list, first_line: int):
+    """Append the columns of one parsed range to `table`, renumbering its lines and categories"""
+    position = 0
+    columns = {}
+    for name in _COLUMNS:
+        columns[name] = array("q")
+        columns[name].frombytes(block.buf[position:position + 8 * rows])
+        position += 8 * rows
+    codes = array("I")
+    codes.frombytes(block.buf[position:position + 4 * rows])
+    position += 4 * rows
+
+    table.timestamps.extend(columns["timestamps"])
+    table.amounts.extend(columns["amounts"])
+    table.line_numbers.extend(map(add, columns["line_numbers"], repeat(first_line - 1)))
+    table._description_ends.extend(map(add, columns["_description_ends"], repeat(len(table._descriptions))))
+    table._descriptions += block.buf[position:position + descriptions]
+    mapping = [table.category_code(category) for category in categories]
+    if mapping == list(range(len(mapping))):
+        table.category_codes.extend(codes)
+    else:
+        table.category_codes.extend(mapping[code] for code in codes)
+
+
+def parse_ledger(path, workers: int = None, range_bytes: int = RANGE_BYTES) -> ExpenseTable:
+    """Parse a text ledger into one ExpenseTable using several processes.
+
+    The file is cut into newline-aligned byte ranges, parsed in parallel
+    into columns that come back through shared memory, and the parts are
+    concatenated in file order, so `line_numbers` are the ledger's lines.
+    """
+    path = Path(path)
+    workers = workers or os.cpu_count() or 1
+    size = path.stat().st_size
+    ranges = split_ranges(path, max(workers, -(-size // range_bytes)))
+    table = ExpenseTable()
+    if not ranges:
+        return table
+    with ProcessPoolExecutor(max_workers=min(workers, len(ranges))) as pool:
+        parts = list(pool.map(_parse_range, repeat(str(path)), *zip(*ranges)))
+    first_line = 1
+    try:
+        for name, rows, descriptions, categories, lines in parts:
+            block = shared_memory.SharedMemory(name=name)
+            try:
+                _append_part(table, block, rows, descriptions, categories, first_line)
+            finally:
+                block.close()
+                block.unlink()
+            first_line += lines
+    finally:
+        for name, *_ in parts:  # Blocks left over if a part failed
+            try:
+                block = shared_memory.SharedMemory(name=name)
+            except FileNotFoundError:
+                continue
+            block.close()
+            block.unlink()
+    return table
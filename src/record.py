@@ -0,0 +1,262 @@
+import datetime
+from array import array
+
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+CURRENCY = "$"
+_EPOCH_ORDINAL = datetime.date(1970, 1, 1).toordinal()
+_DAYS = {}  # Days since the epoch of every 'YYYY-MM-DD' parsed so far
+_SECONDS = {}  # Seconds since midnight of every 'HH:MM:SS' parsed so far
+_DATES = {}  # 'YYYY-MM-DD' of every day since the epoch formatted so far
+_CENTS = {}  # Cents of every ledger amount text parsed so far...
+_AMOUNTS = {}  # ...and ledger text of every amount formatted so far
+AMOUNT_CACHE = 1 << 16  # Amounts remembered by each
+
+
+def parse_timestamp(text: str) -> int:
+    """Parse a 'YYYY-MM-DD HH:MM:SS' timestamp into epoch seconds.
+
+    Timestamps are wall-clock times as written in the ledger, so they are
+    encoded as if they were UTC and round-trip without any timezone lookup.
+    """
+    if len(text) != 19 or text[10] != " " or text[13] != ":" or text[16] != ":":
+        raise ValueError(f"Invalid timestamp: {text!r}")
+    date = text[:10]
+    days = _DAYS.get(date)
+    if days is None:
+        # Dates and times repeat a lot, so each one is only converted once
+        if date[4] != "-" or date[7] != "-":
+            raise ValueError(f"Invalid timestamp: {text!r}")
+        days = datetime.date(int(date[0:4]), int(date[5:7]), int(date[8:10])).toordinal() - _EPOCH_ORDINAL
+        _DAYS[date] = days
+    time = text[11:]
+    seconds = _SECONDS.get(time)
+    if seconds is None:
+        seconds = int(time[0:2]) * 3600 + int(time[3:5]) * 60 + int(time[6:8])
+        if not (0 <= seconds < 86400 and time[:2].isdigit() and time[3:5].isdigit() and time[6:].isdigit()):
+            raise ValueError(f"Invalid timestamp: {text!r}")
+        _SECONDS[time] = seconds
+    return days * 86400 + seconds
+
+
+def format_timestamp(timestamp: int) -> str:
+    """Format epoch seconds from parse_timestamp back into ledger text"""
+    days, seconds = divmod(timestamp, 86400)
+    date = _DATES.get(days)
+    if date is None:
+        date = _DATES[days] = datetime.date.fromordinal(days + _EPOCH_ORDINAL).isoformat()
+    hours, seconds = divmod(seconds, 3600)
+    minutes, seconds = divmod(seconds, 60)
+    return f"{date} {hours:02d}:{minutes:02d}:{seconds:02d}"
+
+
+def parse_amount(text: str, currency: str = CURRENCY) -> int:
+    """Parse an amount such as '$12.50', '-3' or '$-0.5' into integer cents.
+
+    The currency sign is optional. Amounts are converted with integer
+    arithmetic only, never through float, and like dates they repeat a lot,
+    so ledger amounts are only converted once (up to AMOUNT_CACHE of them).
+    """
+    if currency == CURRENCY:
+        cents = _CENTS.get(text)
+        if cents is None:
+            cents = _parse_cents(text, currency)
+            if len(_CENTS) < AMOUNT_CACHE:
+                _CENTS[text] = cents
+        return cents
+    return _parse_cents(text, currency)
+
+
+def parse_amounts(texts, currency: str = CURRENCY) -> array:
+    """Parse a column of amounts into an int64 array of cents; ValueError if any is invalid.
+
+    Only the distinct texts not seen before are parsed, then the column is
+    filled by C-level dictionary lookups, with no Python code run per row.
+    """
+    texts = texts if isinstance(texts, list) else list(texts)
+    cents = _CENTS if currency == CURRENCY else {}
+    missing = set(texts).difference(cents)
+    if cents is _CENTS and len(cents) + len(missing) > AMOUNT_CACHE:
+        cents = {text: _CENTS.get(text) for text in set(texts)}  # Too many to remember
+    for text in missing:
+        cents[text] = _parse_cents(text, currency)
+    return array("q", list(map(cents.__getitem__, texts)))
+
+
+def _parse_cents(text: str, currency: str) -> int:
+    if text.startswith(currency) and text[-3:-2] == ".":
+        # The ledger's own '$12.50' form: a single int() of the digits around the point
+        digits = text[len(currency):-3] + text[-2:]
+        if digits.isdigit() and digits.isascii():
+            return int(digits)
+    text = text.strip()
+    if currency and text.startswith(currency):
+        text = text[len(currency):]
+    sign = 1
+    if text[:1] in ("-", "+"):
+        sign = -1 if text[0] == "-" else 1
+        text = text[1:]
+    whole, _, fraction = text.partition(".")
+    if not (whole or fraction) or not text.isascii() or (whole and not whole.isdigit()) or \
+            (fraction and not fraction.isdigit()):
+        raise ValueError(f"Invalid amount: {text!r}")
+    cents = int(whole or "0") * 100 + int((fraction + "00")[:2])
+    if len(fraction) > 2 and fraction[2] >= "5":
+        cents += 1  # Round half away from zero
+    return sign * cents
+
+
+def format_amount(cents: int, currency: str = CURRENCY) -> str:
+    """Format integer cents the way the ledger stores them, e.g. '$12.50'"""
+    if currency == CURRENCY:
+        text = _AMOUNTS.get(cents)
+        if text is not None:
+            return text
+    if cents < 0:
+        whole, fraction = divmod(-cents, 100)
+        text = f"{currency}-{whole}.{fraction:02d}"
+    else:
+        whole, fraction = divmod(cents, 100)
+        text = f"{currency}{whole}.{fraction:02d}"
+    if currency == CURRENCY and len(_AMOUNTS) < AMOUNT_CACHE:
+        _AMOUNTS[cents] = text
+    return text
+
+
+def divide_amount(cents: int, count: int) -> int:
+    """`cents / count` rounded half away from zero, like parse_amount, without float"""
+    if not count:
+        return 0
+    quotient, remainder = divmod(abs(cents), count)
+    if 2 * remainder >= count:
+        quotient += 1
+    return -quotient if cents < 0 else quotient
+
+
+class Expense:
+    """A single expense: when, in which category, how much (in cents) and what for"""
+    __slots__ = ("timestamp", "category", "amount", "description")
+
+    def __init__(self, timestamp: int, category: str, amount: int, description: str = ""):
+        self.timestamp = timestamp
+        self.category = category
+        self.amount = amount
+        self.description = description
+
+    @classmethod
+    def now(cls, category: str, amount: int, description: str = "") -> "Expense":
+        """Create an expense stamped with the current time"""
+        timestamp = parse_timestamp(datetime.datetime.now().strftime(TIMESTAMP_FORMAT))
+        return cls(timestamp, category, amount, description)
+
+    @classmethod
+    def parse(cls, line: str) -> "Expense":
+        """Parse a 'timestamp<TAB>category<TAB>$amount<TAB>description' ledger line"""
+        fields = line.rstrip("\r\n").split("\t", 3)
+        if len(fields) < 3:
+            raise ValueError(f"Not an expense line: {line!r}")
+        description = fields[3].rstrip() if len(fields) == 4 else ""
+        return cls(parse_timestamp(fields[0]), fields[1], parse_amount(fields[2]), description)
+
+    def to_line(self) -> str:
+        """Format the expense as a ledger line, without the trailing newline"""
+        return f"{format_timestamp(self.timestamp)}\t{self.category}\t{format_amount(self.amount)}\t{self.description}"
+
+    def __str__(self):
+        return self.to_line()
+
+    def __repr__(self):
+        return (f"Expense(timestamp={self.timestamp}, category={self.category!r}, "
+                f"amount={self.amount}, description={self.description!r})")
+
+    def __eq__(self, other):
+        if not isinstance(other, Expense):
+            return NotImplemented
+        return (self.timestamp, self.category, self.amount, self.description) == \
+            (other.timestamp, other.category, other.amount, other.description)
+
+
+class ExpenseTable:
+    """Expenses stored column by column in compact arrays.
+
+    Timestamps and amounts (in cents) are int64 arrays, categories are
+    dictionary-encoded into small integer codes and descriptions share one
+    UTF-8 pool, so millions of rows don't cost a Python object per field.
+    `line_numbers` keeps the ledger line each row was read from.
+    """
+
+    def __init__(self):
+        self.timestamps = array("q")
+        self.amounts = array("q")
+        self.category_codes = array("I")
+        self.categories = []  # Category name of each code
+        self.line_numbers = array("q")
+        self._category_codes = {}
+        self._descriptions = bytearray()
+        self._description_ends = array("q")
+
+    def __len__(self):
+        return len(self.timestamps)
+
+    def __getitem__(self, row: int) -> Expense:
+        if row < 0:
+            row += len(self)
+        return Expense(self.timestamps[row], self.categories[self.category_codes[row]],
+                       self.amounts[row], self.description(row))
+
+    def __iter__(self):
+        for row in range(len(self)):
+            yield self[row]
+
+    @classmethod
+    def from_lines(cls, lines, first_line: int = 1) -> "ExpenseTable":
+        """Build a table from ledger lines, skipping the ones that aren't expenses"""
+        table = cls()
+        for line_number, line in enumerate(lines, first_line):
+            table.append_line(line, line_number)
+        return table
+
+    def category_code(self, category: str) -> int:
+        """Return the code of a category, adding it to the dictionary if needed"""
+        code = self._category_codes.get(category)
+        if code is None:
+            code = len(self.categories)
+            self._category_codes[category] = code
+            self.categories.append(category)
+        return code
+
+    def description(self, row: int) -> str:
+        start = self._description_ends[row - 1] if row else 0
+        return self._descriptions[start:self._description_ends[row]].decode("utf-8")
+
+    def append(self, expense: Expense, line_number: int = 0):
+        """Append one expense, read from ledger line `line_number` if known"""
+        self.timestamps.append(expense.timestamp)
+        self.amounts.append(expense.amount)
+        self.category_codes.append(self.category_code(expense.category))
+        self._descriptions += expense.description.encode("utf-8")
+        self._description_ends.append(len(self._descriptions))
+        self.line_numbers.append(line_number)
+
+    def append_line(self, line: str, line_number: int = 0) -> bool:
+        """Parse a ledger line straight into the columns; return False if it isn't an expense"""
+        fields = line.rstrip("\r\n").split("\t", 3)
+        if len(fields) < 3:
+            return False
+        try:
+            timestamp = parse_timestamp(fields[0])
+            amount = parse_amount(fields[2])
+        except ValueError:
+            return False
+        self.timestamps.append(timestamp)
+        self.amounts.append(amount)
+        self.category_codes.append(self.category_code(fields[1]))
+        if len(fields) == 4:
+            self._descriptions += fields[3].rstrip().encode("utf-8")
+        self._description_ends.append(len(self._descriptions))
+        self.line_numbers.append(line_number)
+        return True
+
+    def to_lines(self):
+        """Yield every row as a ledger line, without the trailing newline"""
+        for row in range(len(self)):
+            yield self[row].to_line()
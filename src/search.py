@@ -0,0 +1,387 @@
+import json
+import marshal
+import re
+from array import array
+from bisect import bisect_left, bisect_right
+from pathlib import Path
+
+from .index import ledger_state
+from .record import Expense
+
+KEYWORD_SUFFIX = ".kw"
+LOG_SUFFIX = ".kw.log"
+LOG_LIMIT = 10_000  # Logged changes before the snapshot is rewritten
+LOG_TAIL = 4096  # Bytes read from the end of the log to find the state it ends at
+ATTACH_LOG_BYTES = 1 << 20  # Longer logs are folded into the snapshot by a full load instead of attached to
+AMOUNT_TAIL = 4096  # Indexed amounts kept unsorted before they are merged into the sorted arrays
+_TOKEN = re.compile(r"\w+")
+_UNPARSED = object()  # Stands for an expense the caller didn't parse
+
+
+def tokenize(text: str) -> set:
+    """Lowercase words of a piece of text"""
+    return set(_TOKEN.findall(text.lower()))
+
+
+def parse_expense(line: str):
+    """The expense on a ledger line, or None if it is free text"""
+    try:
+        return Expense.parse(line)
+    except ValueError:
+        return None
+
+
+def expense_tokens(line: str, expense=_UNPARSED) -> set:
+    """Words of an expense's category and description, or of the whole line if it is free text.
+
+    `expense` is the line already parsed with parse_expense, to save parsing it again.
+    """
+    if expense is _UNPARSED:
+        expense = parse_expense(line)
+    if expense is None:
+        return tokenize(line)
+    return tokenize(expense.category) | tokenize(expense.description)
+
+
+def expense_amount(line: str):
+    """Amount of an expense line in cents, or None if it is free text"""
+    expense = parse_expense(line)
+    return None if expense is None else expense.amount
+
+
+def _shift_down(lines: array, after: int) -> array:
+    """Renumber the sorted line numbers above `after` after that line was removed"""
+    start = bisect_right(lines, after)
+    lines[start:] = array("q", (line - 1 for line in lines[start:]))
+    return lines
+
+
+class KeywordIndex:
+    """Inverted index from words to ledger lines, plus a sorted index of amounts.
+
+    Every posting list holds physical line numbers in increasing order. The
+    index is persisted as a snapshot plus an append-only log of the changes
+    made since, so keeping it current costs one small log write per change.
+    """
+
+    def __init__(self, ledger_path):
+        self._ledger_path = Path(ledger_path)
+        self._path = self._ledger_path.with_name(self._ledger_path.name + KEYWORD_SUFFIX)
+        self._log_path = self._ledger_path.with_name(self._ledger_path.name + LOG_SUFFIX)
+        self._postings = {}  # token -> array of line numbers
+        self._amounts = array("q")  # Sorted amounts...
+        self._amount_lines = array("q")  # ...and the line of each, sorted within equal amounts
+        # (amount, line) indexed since the last merge: inserting into the arrays moves half of them each time
+        self._amount_tail = []
+        self._state = None  # Ledger state the index describes
+        self._pending = []  # Changes not yet written to the log, None once a checkpoint stopped logging
+        self._logged = 0  # Changes in the log since the last snapshot
+        self._snapshot_stat = None  # Snapshot file the index was loaded from or written to...
+        self._log_offset = 0  # ...and how far into the log it has been replayed
+        self._log_only = False  # Attached to the log without reading the snapshot: changes are only logged
+
+    @property
+    def path(self) -> Path:
+        return self._path
+
+    def is_current(self) -> bool:
+        """Whether the index still describes the ledger on disk"""
+        return self._state == ledger_state(self._ledger_path)
+
+    def lookup(self, term: str) -> list:
+        """Lines containing every word of `term`, in order"""
+        tokens = tokenize(term)
+        if not tokens:
+            return []
+        postings = sorted((self._postings.get(token, ()) for token in tokens), key=len)
+        lines = set(postings[0])
+        for posting in postings[1:]:
+            lines.intersection_update(posting)
+        return sorted(lines)
+
+    def amount_range(self, minimum: int, maximum: int) -> list:
+        """Lines whose amount, in cents, is between `minimum` and `maximum` inclusive"""
+        start = bisect_left(self._amounts, minimum)
+        end = bisect_right(self._amounts, maximum)
+        lines = self._amount_lines[start:end].tolist()
+        lines.extend(line_number for amount, line_number in self._amount_tail if minimum <= amount <= maximum)
+        return sorted(lines)
+
+    def add(self, line_number: int, line: str, expense=_UNPARSED):
+        """Index a line appended at (or inserted before) `line_number`, parsed into `expense` if given"""
+        if not self._log_only:
+            self._index(line_number, line, expense)
+        self._log(["+", line_number, line])
+
+    def remove(self, line_number: int, line: str, renumber: bool = True):
+        """Unindex a removed line, renumbering the lines after it unless it was only tombstoned"""
+        op = "-" if renumber else "x"
+        self._apply(op, line_number, line)
+        self._log([op, line_number, line])
+
+    def update(self, line_number: int, old: str, new: str):
+        """Reindex a line whose text changed"""
+        self._apply("=", line_number, old, new)
+        self._log(["=", line_number, old, new])
+
+    def reset(self):
+        self._postings = {}
+        self._amounts = array("q")
+        self._amount_lines = array("q")
+        self._amount_tail = []
+        self._pending = []
+        self._write_snapshot()
+
+    def rebuild(self, lines):
+        """Index every (line number, line) pair of the ledger and write a fresh snapshot"""
+        self._postings = {}
+        self._amounts = array("q")
+        self._amount_lines = array("q")
+        self._amount_tail = []
+        amounts = []
+        for line_number, line in lines:
+            expense = parse_expense(line)
+            for token in expense_tokens(line, expense):
+                posting = self._postings.get(token)
+                if posting is None:
+                    posting = self._postings[token] = array("q")
+                posting.append(line_number)
+            if expense is not None:
+                amounts.append((expense.amount, line_number))
+        amounts.sort()
+        self._amounts.extend(amount for amount, _ in amounts)
+        self._amount_lines.extend(line_number for _, line_number in amounts)
+        self._pending = []
+        self._write_snapshot()
+
+    def load(self) -> bool:
+        """Read the snapshot and replay the log, if they match the ledger on disk.
+
+        An index that was loaded before only replays the log entries written
+        since, e.g. by another process, as long as the snapshot is unchanged.
+        """
+        if self._catch_up():
+            return True
+        try:
+            snapshot_stat = self._stat(self._path)
+            data = marshal.loads(self._path.read_bytes())
+            postings = {}
+            for token, raw in data["postings"].items():
+                postings[token] = array("q")
+                postings[token].frombytes(raw)
+            self._amounts = array("q")
+            self._amounts.frombytes(data["amounts"])
+            self._amount_lines = array("q")
+            self._amount_lines.frombytes(data["amount_lines"])
+            self._amount_tail = []
+            self._postings = postings
+            state = data["state"]
+            self._logged = 0
+            log_offset = 0
+            if self._log_path.exists():
+                data = self._log_path.read_bytes()
+                state = self._replay(data, state)
+                log_offset = len(data)
+        except (OSError, ValueError, KeyError, TypeError, EOFError):
+            self._state = None
+            return False
+        if state != ledger_state(self._ledger_path):
+            self._state = None
+            return False
+        self._state = state
+        self._pending = []
+        self._log_only = False
+        self._snapshot_stat = snapshot_stat
+        self._log_offset = log_offset
+        return True
+
+    def attach(self) -> bool:
+        """Get ready to log appended lines without reading the snapshot.
+
+        This works if the log ends at the ledger's current state, and is much
+        cheaper than a load for a process that only appends a few lines. The
+        index can't be queried afterwards; load it again for that.
+        """
+        try:
+            with self._log_path.open("rb") as f:
+                size = f.seek(0, 2)
+                if size > ATTACH_LOG_BYTES:
+                    return False
+                f.seek(max(0, size - LOG_TAIL))
+                entries = f.read().splitlines()
+            op, state = json.loads(entries[-1])
+        except (OSError, ValueError, IndexError):
+            return False
+        if op != "state" or not self._path.exists() or state != ledger_state(self._ledger_path):
+            return False
+        self._state = state
+        self._pending = []
+        self._log_only = True
+        return True
+
+    def _catch_up(self) -> bool:
+        """Replay just the end of the log onto an index loaded from the same snapshot"""
+        if self._state is None or self._pending or self._snapshot_stat != self._stat(self._path):
+            return False
+        try:
+            with self._log_path.open("rb") as f:
+                f.seek(self._log_offset)
+                data = f.read()
+            state = self._replay(data, self._state)
+        except (OSError, ValueError, KeyError, TypeError):
+            self._state = None  # Partly replayed: only a full load can recover
+            return False
+        if state != ledger_state(self._ledger_path):
+            self._state = None
+            return False
+        self._state = state
+        self._log_offset += len(data)
+        return True
+
+    def _replay(self, data: bytes, state):
+        """Apply logged changes; returns the last ledger state they record"""
+        for entry in data.decode("utf-8").splitlines():
+            op, *args = json.loads(entry)
+            if op == "state":
+                state = args[0]
+            else:
+                self._apply(op, *args)
+                self._logged += 1
+        return state
+
+    @staticmethod
+    def _stat(path: Path):
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            return None
+        return stat.st_size, stat.st_mtime_ns
+
+    def checkpoint(self):
+        """Write out the changes so far during a long run of appends, keeping memory bounded.
+
+        Once the run logs more than LOG_LIMIT changes, the next save would fold
+        the log into a new snapshot anyway, so the rest of the run is only kept
+        in the index and written by that snapshot instead of being logged row
+        by row. An index attached for logging only has no snapshot to write; it
+        stops logging and is rebuilt by whoever loads it next.
+        """
+        if self._pending is None:
+            return
+        if self._logged + len(self._pending) <= LOG_LIMIT:
+            self.save()
+        else:
+            self._pending = None
+
+    def save(self):
+        """Log the pending changes against the current ledger state"""
+        if self._pending is None:
+            self._pending = []
+            if self._log_only:
+                self._state = None  # The log stops short of the ledger, so loading it fails and rebuilds
+            else:
+                self._write_snapshot()
+            return
+        self._state = ledger_state(self._ledger_path)
+        self._logged += len(self._pending)
+        if self._logged > LOG_LIMIT and not self._log_only:
+            self._write_snapshot()
+            return
+        self._pending.append(["state", self._state])
+        with self._log_path.open("a", encoding="utf-8") as f:
+            f.write("".join(json.dumps(entry) + "\n" for entry in self._pending))
+            self._log_offset = f.tell()
+        self._pending = []
+
+    def _write_snapshot(self):
+        self._merge_amounts()
+        self._state = ledger_state(self._ledger_path)
+        data = {
+            "state": self._state,
+            "postings": {token: lines.tobytes() for token, lines in self._postings.items()},
+            "amounts": self._amounts.tobytes(),
+            "amount_lines": self._amount_lines.tobytes(),
+        }
+        self._path.write_bytes(marshal.dumps(data))
+        # The log starts with the snapshot's state, so attach() can tell it is current
+        self._log_path.write_text(json.dumps(["state", self._state]) + "\n", encoding="utf-8")
+        self._pending = []
+        self._logged = 0
+        self._snapshot_stat = self._stat(self._path)
+        self._log_offset = self._stat(self._log_path)[0]
+
+    def _log(self, entry: list):
+        if self._pending is not None:
+            self._pending.append(entry)
+
+    def _apply(self, op: str, line_number: int, line: str, new: str = None):
+        if op == "=":
+            self._unindex(line_number, line)
+            self._index(line_number, new)
+        elif op == "+":
+            self._index(line_number, line)
+        elif op == "x":
+            self._unindex(line_number, line)
+        else:
+            self._unindex(line_number, line)
+            for token in list(self._postings):
+                _shift_down(self._postings[token], line_number)
+            self._amount_lines = array("q", (n - 1 if n > line_number else n for n in self._amount_lines))
+            self._amount_tail = [(amount, n - 1 if n > line_number else n) for amount, n in self._amount_tail]
+
+    def _index(self, line_number: int, line: str, expense=_UNPARSED):
+        if expense is _UNPARSED:
+            expense = parse_expense(line)
+        for token in expense_tokens(line, expense):
+            posting = self._postings.get(token)
+            if posting is None:
+                posting = self._postings[token] = array("q")
+            if not posting or posting[-1] < line_number:
+                posting.append(line_number)  # Appends land at the end
+            else:
+                posting.insert(bisect_left(posting, line_number), line_number)
+        if expense is not None:
+            self._amount_tail.append((expense.amount, line_number))
+            if len(self._amount_tail) > AMOUNT_TAIL:
+                self._merge_amounts()
+
+    def _unindex(self, line_number: int, line: str):
+        expense = parse_expense(line)
+        for token in expense_tokens(line, expense):
+            posting = self._postings.get(token)
+            if posting is None:
+                continue
+            position = bisect_left(posting, line_number)
+            if position < len(posting) and posting[position] == line_number:
+                del posting[position]
+            if not posting:
+                del self._postings[token]
+        if expense is not None:
+            amount = expense.amount
+            start = bisect_left(self._amounts, amount)
+            end = bisect_right(self._amounts, amount)
+            position = bisect_left(self._amount_lines, line_number, start, end)
+            if position < end and self._amount_lines[position] == line_number:
+                del self._amounts[position]
+                del self._amount_lines[position]
+            elif (amount, line_number) in self._amount_tail:
+                self._amount_tail.remove((amount, line_number))
+
+    def _merge_amounts(self):
+        """Merge the unsorted tail of amounts into the sorted arrays, splicing array slices between its entries"""
+        if not self._amount_tail:
+            return
+        amounts, lines = array("q"), array("q")
+        previous = 0
+        for amount, line_number in sorted(self._amount_tail):
+            start = bisect_left(self._amounts, amount, previous)
+            position = bisect_left(self._amount_lines, line_number, start, bisect_right(self._amounts, amount, start))
+            amounts += self._amounts[previous:position]
+            lines += self._amount_lines[previous:position]
+            amounts.append(amount)
+            lines.append(line_number)
+            previous = position
+        amounts += self._amounts[previous:]
+        lines += self._amount_lines[previous:]
+        self._amounts, self._amount_lines = amounts, lines
+        self._amount_tail = []
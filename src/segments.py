@@ -0,0 +1,421 @@
+import json
+import os
+import struct
+import zlib
+from pathlib import Path
+
+from .lock import LedgerLock
+from .record import Expense, ExpenseTable
+from .search import expense_amount, expense_tokens, tokenize
+from .storage import StorageBackend
+from .summary import BUCKETS, CACHED_BUCKETS, SECONDS_PER_DAY, Summary, bucket_label, merge_summaries, summarize
+
+SEGMENT_ROWS = 100_000  # Lines in the active segment before it is sealed
+ACTIVE_SUFFIX = ".txt"
+SEALED_SUFFIX = ".seg"
+CODECS = ("zlib", "lzma")
+CHUNK_SIZE = 1 << 20  # Compressed bytes read, or text bytes written, at a time
+WRITE_ROWS = 10_000  # Lines compressed per call while sealing
+
+# Sealed segment: the compressed lines, a JSON footer, then this trailer
+_TRAILER = struct.Struct("<qq8s")  # compressed size, footer size, magic
+_MAGIC = b"EXPSEG01"
+
+
+def _compressor(codec: str):
+    if codec == "lzma":
+        import lzma  # Slow to import, and only needed for segments that use it
+        return lzma.LZMACompressor()
+    return zlib.compressobj()
+
+
+def _decompressor(codec: str):
+    if codec == "lzma":
+        import lzma
+        return lzma.LZMADecompressor()
+    return zlib.decompressobj()
+
+
+def _count(groups: dict, key: str, amount: int):
+    """Add an amount to the [count, total, minimum, maximum] of a group"""
+    group = groups.get(key)
+    if group is None:
+        groups[key] = [1, amount, amount, amount]
+    else:
+        group[0] += 1
+        group[1] += amount
+        group[2] = min(group[2], amount)
+        group[3] = max(group[3], amount)
+
+
+class Segment:
+    """A sealed segment: compressed lines, and a footer with their count, timestamp and amount
+    bounds, per-category and per-day summaries, and the words of their categories and descriptions.
+    """
+    __slots__ = ("path", "size", "footer", "stamp", "_tokens")
+
+    def __init__(self, path: Path, size: int, footer: dict):
+        self.path = path
+        self.size = size  # Bytes of compressed lines
+        self.footer = footer
+        self.stamp = _stamp(path)  # Tells whether the file was rewritten since the footer was read
+        self._tokens = None
+
+    @property
+    def rows(self) -> int:
+        return self.footer["rows"]
+
+    @property
+    def tokens(self) -> frozenset:
+        if self._tokens is None:
+            self._tokens = frozenset(self.footer["tokens"])
+        return self._tokens
+
+    @classmethod
+    def open(cls, path: Path) -> "Segment":
+        """Read the footer of a sealed segment"""
+        with path.open("rb") as f:
+            f.seek(-_TRAILER.size, os.SEEK_END)
+            size, footer_size, magic = _TRAILER.unpack(f.read(_TRAILER.size))
+            if magic != _MAGIC:
+                raise ValueError(f"{path} is not a ledger segment")
+            f.seek(size)
+            return cls(path, size, json.loads(f.read(footer_size)))
+
+    @classmethod
+    def write(cls, path: Path, lines, codec: str = "zlib") -> "Segment":
+        """Compress lines (without newlines) into a sealed segment, replacing `path` atomically"""
+        compressor = _compressor(codec)
+        footer = {"codec": codec, "rows": 0, "min_time": None, "max_time": None, "min_amount": None,
+                  "max_amount": None, "categories": {}, "days": {}}
+        categories, days, tokens = footer["categories"], footer["days"], set()
+        temporary = path.with_name(path.name + ".tmp")
+        with temporary.open("wb") as f:
+            batch = []
+            for line in lines:
+                batch.append(line)
+                try:
+                    expense = Expense.parse(line)
+                except ValueError:
+                    tokens.update(tokenize(line))
+                    expense = None
+                if expense is not None:
+                    tokens.update(tokenize(expense.category))
+                    tokens.update(tokenize(expense.description))
+                    timestamp, amount = expense.timestamp, expense.amount
+                    if footer["min_time"] is None:
+                        footer["min_time"] = footer["max_time"] = timestamp
+                        footer["min_amount"] = footer["max_amount"] = amount
+                    else:
+                        footer["min_time"] = min(footer["min_time"], timestamp)
+                        footer["max_time"] = max(footer["max_time"], timestamp)
+                        footer["min_amount"] = min(footer["min_amount"], amount)
+                        footer["max_amount"] = max(footer["max_amount"], amount)
+                    _count(categories, expense.category, amount)
+                    _count(days, str(timestamp // SECONDS_PER_DAY), amount)
+                if len(batch) >= WRITE_ROWS:
+                    f.write(compressor.compress(("\n".join(batch) + "\n").encode("utf-8")))
+                    footer["rows"] += len(batch)
+                    batch = []
+            if batch:
+                f.write(compressor.compress(("\n".join(batch) + "\n").encode("utf-8")))
+                footer["rows"] += len(batch)
+            f.write(compressor.flush())
+            size = f.tell()
+            footer["tokens"] = sorted(tokens)
+            data = json.dumps(footer, separators=(",", ":")).encode("utf-8")
+            f.write(data + _TRAILER.pack(size, len(data), _MAGIC))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporary, path)
+        return cls(path, size, footer)
+
+    def lines(self):
+        """Yield the lines (without newlines), decompressing a chunk at a time"""
+        decompressor = _decompressor(self.footer["codec"])
+        carry = b""
+        with self.path.open("rb") as f:
+            remaining = self.size
+            while remaining:
+                chunk = f.read(min(CHUNK_SIZE, remaining))
+                if not chunk:
+                    raise ValueError(f"{self.path} is truncated")
+                remaining -= len(chunk)
+                *complete, carry = (carry + decompressor.decompress(chunk)).split(b"\n")
+                for line in complete:
+                    yield line.decode("utf-8")
+        if hasattr(decompressor, "flush"):
+            carry += decompressor.flush()
+        if carry:
+            yield carry.decode("utf-8")
+
+    def may_hold_time(self, start: int, end: int) -> bool:
+        return self.footer["min_time"] is not None and self.footer["max_time"] >= start \
+            and self.footer["min_time"] < end
+
+    def may_hold_amount(self, minimum: int, maximum: int) -> bool:
+        return self.footer["min_amount"] is not None and self.footer["max_amount"] >= minimum \
+            and self.footer["min_amount"] <= maximum
+
+    def summary(self, by: str) -> dict:
+        """Grouped summaries of the segment, from its footer alone"""
+        if by == "category":
+            return {category: Summary(*group) for category, group in self.footer["categories"].items()}
+        result = {}
+        for day, group in self.footer["days"].items():
+            merge_summaries(result, {bucket_label(int(day), by): Summary(*group)})
+        return result
+
+
+class SegmentedBackend(StorageBackend):
+    """Lines kept in a directory of segments, for long-lived ledgers that mostly grow.
+
+    Appends go to an active text segment. Once it holds `segment_rows` lines,
+    or with `by_month=True` once an expense of another month arrives, it is
+    sealed: compressed with zlib or lzma, behind a footer describing it.
+    Summaries of sealed segments come from their footers alone, and time,
+    amount and keyword queries skip the segments whose footer rules them
+    out, so old data costs almost nothing until it is actually read.
+    """
+
+    def __init__(self, path, segment_rows: int = SEGMENT_ROWS, by_month: bool = False, codec: str = "zlib"):
+        super().__init__(path)
+        if codec not in CODECS:
+            raise ValueError(f"Unknown codec {codec!r}, expected one of {', '.join(CODECS)}")
+        self._segment_rows = segment_rows
+        self._by_month = by_month
+        self._codec = codec
+        self._path.mkdir(parents=True, exist_ok=True)
+        self._lock = LedgerLock(self._path)
+        self._sealed = []  # Segments, oldest first
+        self._active = None  # Path of the active segment, which may not exist yet
+        self._active_rows = 0
+        self._active_size = 0  # Bytes of the active segment when its lines were counted
+        self._active_month = None  # Month of the active segment's first expense, once looked up
+        self._listed = None  # Directory mtime when the segments were listed
+        with self._lock.exclusive():
+            self._refresh(clean=True)
+
+    def _refresh(self, clean: bool = False):
+        """Catch up with segments sealed or lines appended by other processes; the caller holds the lock.
+
+        With `clean`, an active segment left behind by a process that stopped
+        right after sealing it is deleted.
+        """
+        listed = self._path.stat().st_mtime_ns
+        if listed != self._listed:
+            known = {(segment.path, segment.stamp): segment for segment in self._sealed}
+            sealed, active = {}, {}
+            for name in os.listdir(self._path):
+                stem, suffix = os.path.splitext(name)
+                if stem.isdigit() and suffix in (SEALED_SUFFIX, ACTIVE_SUFFIX):
+                    (sealed if suffix == SEALED_SUFFIX else active)[int(stem)] = self._path / name
+            for number in sorted(set(active) & set(sealed)):
+                if clean:
+                    active[number].unlink()
+                del active[number]
+            self._sealed = [known.get((sealed[number], _stamp(sealed[number]))) or Segment.open(sealed[number])
+                            for number in sorted(sealed)]
+            number = max(active) if active else max(sealed, default=0) + 1
+            if self._active != self._segment_path(number, ACTIVE_SUFFIX):
+                self._active = self._segment_path(number, ACTIVE_SUFFIX)
+                self._active_size = -1
+            self._listed = self._path.stat().st_mtime_ns
+        size = self._active.stat().st_size if self._active.exists() else 0
+        if size != self._active_size:
+            self._active_rows = sum(1 for _ in self._active_lines())
+            self._active_size = size
+            self._active_month = None
+
+    def _segment_path(self, number: int, suffix: str) -> Path:
+        return self._path / f"{number:06d}{suffix}"
+
+    def _active_lines(self):
+        """Yield the lines of the active segment, without newlines"""
+        if not self._active.exists():
+            return
+        with self._active.open(encoding="utf-8", newline="\n") as f:
+            for line in f:
+                yield line[:-1] if line.endswith("\n") else line
+
+    def _units(self):
+        """(first line number, rows, sealed segment or None for the active one) of every segment, in order"""
+        units = []
+        first = 1
+        for segment in self._sealed:
+            units.append((first, segment.rows, segment))
+            first += segment.rows
+        units.append((first, self._active_rows, None))
+        return units
+
+    def _numbered(self, skip=None, start: int = 1, stop: int = None):
+        """Yield (line number, line) from `start` to `stop`, leaving out sealed segments `skip` rules out"""
+        with self._lock.shared():
+            self._refresh()
+            units = self._units()
+        for first, rows, segment in units:
+            if first + rows <= start or not rows or (segment is not None and skip is not None and skip(segment)):
+                continue
+            if stop is not None and first > stop:
+                return
+            lines = self._active_lines() if segment is None else segment.lines()
+            for line_number, line in zip(range(first, first + rows), lines):
+                if line_number < start:
+                    continue
+                if stop is not None and line_number > stop:
+                    return
+                yield line_number, line
+
+    def __len__(self):
+        with self._lock.shared():
+            self._refresh()
+            return sum(segment.rows for segment in self._sealed) + self._active_rows
+
+    def iter_lines(self, start: int = None, stop: int = None):
+        for _, line in self._numbered(start=start if start and start > 1 else 1, stop=stop):
+            yield line + "\n"
+
+    def read(self, line_number: int) -> str:
+        for _, line in self._numbered(start=line_number, stop=line_number):
+            return line
+        raise ValueError("Number given is not in the range of values added")
+
+    def append(self, lines: list):
+        with self._lock.exclusive():
+            self._refresh()
+            position = 0
+            while position < len(lines):
+                batch = lines[position:position + self._segment_rows - self._active_rows]
+                if self._by_month:
+                    batch = self._same_month(batch)
+                if not batch:
+                    self._seal()
+                    continue
+                with self._active.open("a", encoding="utf-8", newline="\n") as f:
+                    f.write("\n".join(batch) + "\n")
+                    self._active_size = f.tell()
+                self._active_rows += len(batch)
+                position += len(batch)
+            self._listed = self._path.stat().st_mtime_ns
+
+    def _same_month(self, lines: list) -> list:
+        """The leading lines that belong in the active segment's month"""
+        if self._active_month is None:
+            self._active_month = next(filter(None, map(_month, self._active_lines())), "")
+        for count, line in enumerate(lines):
+            month = _month(line)
+            if month and month != self._active_month:
+                if self._active_month:
+                    return lines[:count]
+                self._active_month = month
+        return lines
+
+    def _seal(self):
+        """Compress the active segment and start a new one"""
+        number = int(self._active.stem)
+        self._sealed.append(Segment.write(self._segment_path(number, SEALED_SUFFIX), self._active_lines(),
+                                          self._codec))
+        self._active.unlink()
+        self._active = self._segment_path(number + 1, ACTIVE_SUFFIX)
+        self._active_rows = self._active_size = 0
+        self._active_month = None
+
+    def remove(self, line_number: int):
+        self._rewrite(line_number, None)
+
+    def update(self, line_number: int, line: str):
+        if "\n" in line:
+            raise ValueError("A segmented ledger line can't be updated to several lines")
+        self._rewrite(line_number, line)
+
+    def _rewrite(self, line_number: int, line):
+        """Replace (or with None, remove) a line by rewriting the one segment holding it"""
+        with self._lock.exclusive():
+            self._refresh()
+            for first, rows, segment in self._units():
+                if first <= line_number < first + rows:
+                    break
+            else:
+                raise ValueError("Number given is not in the range of values added")
+            lines = list(self._active_lines() if segment is None else segment.lines())
+            if line is None:
+                del lines[line_number - first]
+            else:
+                lines[line_number - first] = line
+            if segment is None:
+                temporary = self._active.with_name(self._active.name + ".tmp")
+                temporary.write_text("".join(line + "\n" for line in lines), encoding="utf-8")
+                os.replace(temporary, self._active)
+                self._active_size = -1  # Recounted below
+            elif lines:
+                index = self._sealed.index(segment)
+                self._sealed[index] = Segment.write(segment.path, lines, segment.footer["codec"])
+            else:
+                segment.path.unlink()
+                self._sealed.remove(segment)
+            self._listed = None
+            self._refresh()
+
+    def clear(self):
+        with self._lock.exclusive():
+            for segment in self._sealed:
+                segment.path.unlink()
+            self._active.unlink(missing_ok=True)
+            self._sealed = []
+            self._listed = None
+            self._refresh()
+
+    def lookup(self, term: str):
+        tokens = tokenize(term)
+        if not tokens:
+            return
+        for line_number, line in self._numbered(lambda segment: not tokens <= segment.tokens):
+            if tokens <= expense_tokens(line):
+                yield line_number, line.strip()
+
+    def amount_range(self, minimum: int, maximum: int):
+        for line_number, line in self._numbered(lambda segment: not segment.may_hold_amount(minimum, maximum)):
+            amount = expense_amount(line)
+            if amount is not None and minimum <= amount <= maximum:
+                yield line_number, line.strip()
+
+    def time_range(self, start: int, end: int):
+        for line_number, line in self._numbered(lambda segment: not segment.may_hold_time(start, end)):
+            try:
+                timestamp = Expense.parse(line).timestamp
+            except ValueError:
+                continue
+            if start <= timestamp < end:
+                yield line_number, line.strip()
+
+    def summary(self, by: str = "category") -> dict:
+        """Grouped summaries: from the footers of sealed segments, and by parsing the active one"""
+        if by not in BUCKETS:
+            raise ValueError(f"Unknown grouping {by!r}, expected one of {', '.join(BUCKETS)}")
+        with self._lock.shared():
+            self._refresh()
+            result = {}
+            for segment in self._sealed:
+                merge_summaries(result, segment.summary(by))
+            return merge_summaries(result, summarize(ExpenseTable.from_lines(self._active_lines()), by))
+
+    def totals(self, by: str = "category") -> dict:
+        if by not in CACHED_BUCKETS:
+            raise ValueError(f"Totals are only cached by {', '.join(CACHED_BUCKETS)}, not {by!r}")
+        return {label: Summary(summary.count, summary.total) for label, summary in self.summary(by).items()}
+
+    def close(self):
+        self._lock.close()
+
+
+def _stamp(path: Path) -> tuple:
+    stat = path.stat()
+    return stat.st_size, stat.st_mtime_ns
+
+
+def _month(line: str):
+    """Month label of an expense line, or None for free text"""
+    try:
+        return bucket_label(Expense.parse(line).timestamp // SECONDS_PER_DAY, "month")
+    except ValueError:
+        return None
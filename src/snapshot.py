@@ -0,0 +1,117 @@
+import mmap
+import struct
+import zlib
+from array import array
+from pathlib import Path
+
+from .record import ExpenseTable
+
+SNAPSHOT_SUFFIX = ".snap"
+
+# Layout: header, then timestamps, amounts and description ends (native int64),
+# category codes (native uint32), category names ("\n"-joined UTF-8) and descriptions
+_MAGIC = b"EXPSNP02"
+_HEADER = struct.Struct("<8sqqqII")  # magic, rows, category bytes, description bytes, crc32 of the body, categories
+
+
+def write_snapshot(table: ExpenseTable, path):
+    """Write the columns of a table to a binary snapshot file"""
+    categories = "\n".join(table.categories).encode("utf-8")
+    descriptions = bytes(table._descriptions)
+    sections = (
+        array("q", table.timestamps).tobytes(),
+        array("q", table.amounts).tobytes(),
+        array("q", table._description_ends).tobytes(),
+        array("I", table.category_codes).tobytes(),
+        categories,
+        descriptions,
+    )
+    checksum = 0
+    for section in sections:
+        checksum = zlib.crc32(section, checksum)
+    with Path(path).open("wb") as f:
+        f.write(_HEADER.pack(_MAGIC, len(table), len(categories), len(descriptions), checksum,
+                             len(table.categories)))
+        for section in sections:
+            f.write(section)
+
+
+class Snapshot(ExpenseTable):
+    """A read-only ExpenseTable whose columns are views over a memory-mapped snapshot file.
+
+    Opening reads the header and the category names only; the columns are
+    memoryviews into the mapping, so nothing is copied or parsed whatever
+    the number of rows. Pass `verify=True` to check the body's checksum.
+    """
+
+    def __init__(self, path, verify: bool = False):
+        super().__init__()
+        self._path = Path(path)
+        with self._path.open("rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            self._open(verify)
+        except Exception:
+            self.close()
+            raise
+
+    def _open(self, verify: bool):
+        if len(self._mmap) < _HEADER.size:
+            raise ValueError(f"Not an expense snapshot: {self._path}")
+        magic, rows, category_bytes, description_bytes, checksum, categories = _HEADER.unpack_from(self._mmap)
+        if magic != _MAGIC:
+            raise ValueError(f"Not an expense snapshot: {self._path}")
+        body_size = 3 * 8 * rows + 4 * rows + category_bytes + description_bytes
+        if len(self._mmap) != _HEADER.size + body_size:
+            raise ValueError(f"Truncated expense snapshot: {self._path}")
+        self._view = memoryview(self._mmap)
+        if verify and zlib.crc32(self._view[_HEADER.size:]) != checksum:
+            raise ValueError(f"Corrupt expense snapshot: {self._path}")
+        position = _HEADER.size
+
+        def section(size: int, typecode: str = None):
+            nonlocal position
+            view = self._view[position:position + size]
+            position += size
+            return view.cast(typecode) if typecode else view
+
+        self.timestamps = section(8 * rows, "q")
+        self.amounts = section(8 * rows, "q")
+        self._description_ends = section(8 * rows, "q")
+        self.category_codes = section(4 * rows, "I")
+        names = bytes(section(category_bytes)).decode("utf-8")
+        # A single empty category name joins to no bytes at all, so the count tells it from none
+        self.categories = names.split("\n") if categories else []
+        if len(self.categories) != categories:
+            raise ValueError(f"Corrupt expense snapshot: {self._path}")
+        self._category_codes = {category: code for code, category in enumerate(self.categories)}
+        self._descriptions = section(description_bytes)
+        self.line_numbers = range(1, rows + 1)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    @property
+    def path(self) -> Path:
+        return self._path
+
+    def description(self, row: int) -> str:
+        start = self._description_ends[row - 1] if row else 0
+        return str(self._descriptions[start:self._description_ends[row]], "utf-8")
+
+    def append(self, expense, line_number: int = 0):
+        raise TypeError("Snapshots are read-only")
+
+    def append_line(self, line: str, line_number: int = 0) -> bool:
+        raise TypeError("Snapshots are read-only")
+
+    def close(self):
+        """Release the column views and unmap the file"""
+        for name in ("timestamps", "amounts", "_description_ends", "category_codes", "_descriptions", "_view"):
+            view = getattr(self, name, None)
+            if isinstance(view, memoryview):
+                view.release()
+        self._mmap.close()
@@ -0,0 +1,237 @@
+from abc import ABC, abstractmethod
+from pathlib import Path
+
+from .search import expense_tokens, parse_expense, tokenize
+from .summary import BUCKETS, CACHED_BUCKETS, SECONDS_PER_DAY, Summary, bucket_label
+
+BACKEND_SUFFIXES = {".db": "sqlite", ".sqlite": "sqlite", ".sqlite3": "sqlite", ".seg": "segments"}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS expenses (
+    id INTEGER PRIMARY KEY,
+    number INTEGER NOT NULL,
+    line TEXT NOT NULL,
+    timestamp INTEGER,
+    category TEXT,
+    amount INTEGER
+);
+CREATE INDEX IF NOT EXISTS expenses_number ON expenses (number);
+CREATE INDEX IF NOT EXISTS expenses_timestamp ON expenses (timestamp);
+CREATE INDEX IF NOT EXISTS expenses_category ON expenses (category);
+CREATE INDEX IF NOT EXISTS expenses_amount ON expenses (amount);
+CREATE TABLE IF NOT EXISTS words (
+    token TEXT NOT NULL,
+    id INTEGER NOT NULL,
+    PRIMARY KEY (token, id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS words_id ON words (id);
+"""
+_ROW = "expenses (id, number, line, timestamp, category, amount) VALUES (?, ?, ?, ?, ?, ?)"
+# Days since the epoch, rounded down like Python's // for timestamps before 1970
+_DAY = f"(CASE WHEN timestamp >= 0 THEN timestamp / {SECONDS_PER_DAY} " \
+       f"ELSE (timestamp - {SECONDS_PER_DAY - 1}) / {SECONDS_PER_DAY} END)"
+
+
+class StorageBackend(ABC):
+    """Where an ExpenseTracker keeps its lines, for engines other than the built-in text file.
+
+    Lines are numbered from 1 in the order they were added, like the lines
+    of the text ledger, and are returned with a trailing newline.
+    """
+
+    def __init__(self, path):
+        self._path = Path(path)
+
+    @property
+    def path(self) -> Path:
+        return self._path
+
+    @abstractmethod
+    def __len__(self):
+        """Number of lines"""
+
+    @abstractmethod
+    def iter_lines(self, start: int = None, stop: int = None):
+        """Yield the lines from `start` to `stop` (1-indexed, inclusive)"""
+
+    @abstractmethod
+    def read(self, line_number: int) -> str:
+        """The `line_number`-th line, without its newline"""
+
+    @abstractmethod
+    def append(self, lines: list):
+        """Add `lines` after the last one"""
+
+    @abstractmethod
+    def remove(self, line_number: int):
+        """Drop a line, renumbering the ones after it"""
+
+    @abstractmethod
+    def update(self, line_number: int, line: str):
+        """Replace a line in place"""
+
+    @abstractmethod
+    def clear(self):
+        """Drop every line"""
+
+    @abstractmethod
+    def lookup(self, term: str):
+        """Yield (line number, line) for lines holding every word of `term`"""
+
+    @abstractmethod
+    def amount_range(self, minimum: int, maximum: int):
+        """Yield (line number, line) for expenses of `minimum` to `maximum` cents"""
+
+    @abstractmethod
+    def time_range(self, start: int, end: int):
+        """Yield (line number, line) for expenses timestamped from `start` up to, but not including, `end`"""
+
+    @abstractmethod
+    def summary(self, by: str = "category") -> dict:
+        """Summaries of the expenses grouped `by` a bucket, like ExpenseTracker.summary"""
+
+    @abstractmethod
+    def totals(self, by: str = "category") -> dict:
+        """Counts and totals, without extremes, grouped by category or month"""
+
+    def close(self):
+        pass
+
+
+class SQLiteBackend(StorageBackend):
+    """Lines kept in an SQLite database in WAL mode.
+
+    Every line is stored verbatim, next to its parsed timestamp, category
+    and amount (NULL for free text) which are indexed, and to the words of
+    its category and description, so lookups, searches and summaries are
+    answered from indexes instead of scanning the ledger. Each row also
+    keeps its line number, so reading, updating or removing a line finds it
+    through an index, at the cost of renumbering the rows after a removed one.
+    """
+
+    def __init__(self, path):
+        import sqlite3  # Only needed by SQLite ledgers, so text ledgers start faster
+        super().__init__(path)
+        # Callers such as AsyncExpenseTracker serialize their calls but may make them from any thread
+        self._connection = sqlite3.connect(self._path, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        self._connection.executescript(_SCHEMA)
+
+    def __len__(self):
+        # Line numbers are dense, so the last one is the count, read from the end of its index
+        return self._connection.execute("SELECT COALESCE(MAX(number), 0) FROM expenses").fetchone()[0]
+
+    def iter_lines(self, start: int = None, stop: int = None):
+        start = start if start and start > 1 else 1
+        stop = -1 if stop is None else stop
+        rows = self._connection.execute(
+            "SELECT line FROM expenses WHERE number >= ? AND (? < 0 OR number <= ?) ORDER BY number",
+            (start, stop, stop))
+        for (line,) in rows:
+            yield line + "\n"
+
+    def read(self, line_number: int) -> str:
+        return self._row(line_number)[1]
+
+    def append(self, lines: list):
+        rows = []
+        words = []
+        next_id = self._connection.execute("SELECT COALESCE(MAX(id), 0) + 1 FROM expenses").fetchone()[0]
+        number = len(self) + 1 - next_id
+        for row_id, line in enumerate(lines, next_id):
+            expense = parse_expense(line)
+            rows.append(self._columns(row_id, row_id + number, line, expense))
+            words.extend((token, row_id) for token in expense_tokens(line, expense))
+        with self._connection:
+            self._connection.executemany(f"INSERT INTO {_ROW}", rows)
+            self._connection.executemany("INSERT INTO words VALUES (?, ?)", words)
+
+    def remove(self, line_number: int):
+        """Drop a line; every line after it is renumbered, so this writes a row per following line"""
+        row_id = self._row(line_number)[0]
+        with self._connection:
+            self._connection.execute("DELETE FROM expenses WHERE id = ?", (row_id,))
+            self._connection.execute("DELETE FROM words WHERE id = ?", (row_id,))
+            self._connection.execute("UPDATE expenses SET number = number - 1 WHERE number > ?", (line_number,))
+
+    def update(self, line_number: int, line: str):
+        if "\n" in line:
+            raise ValueError("An SQLite ledger line can't be updated to several lines")
+        row_id = self._row(line_number)[0]
+        expense = parse_expense(line)
+        with self._connection:
+            self._connection.execute(f"REPLACE INTO {_ROW}", self._columns(row_id, line_number, line, expense))
+            self._connection.execute("DELETE FROM words WHERE id = ?", (row_id,))
+            self._connection.executemany("INSERT INTO words VALUES (?, ?)",
+                                         ((token, row_id) for token in expense_tokens(line, expense)))
+
+    def clear(self):
+        with self._connection:
+            self._connection.execute("DELETE FROM expenses")
+            self._connection.execute("DELETE FROM words")
+
+    def lookup(self, term: str):
+        tokens = sorted(tokenize(term))
+        if not tokens:
+            return
+        query = " INTERSECT ".join(["SELECT id FROM words WHERE token = ?"] * len(tokens))
+        ids = [row_id for (row_id,) in self._connection.execute(query + " ORDER BY id", tokens)]
+        yield from self._numbered(ids)
+
+    def amount_range(self, minimum: int, maximum: int):
+        ids = [row_id for (row_id,) in self._connection.execute(
+            "SELECT id FROM expenses WHERE amount BETWEEN ? AND ? ORDER BY id", (minimum, maximum))]
+        yield from self._numbered(ids)
+
+    def time_range(self, start: int, end: int):
+        ids = [row_id for (row_id,) in self._connection.execute(
+            "SELECT id FROM expenses WHERE timestamp >= ? AND timestamp < ? ORDER BY id", (start, end))]
+        yield from self._numbered(ids)
+
+    def summary(self, by: str = "category") -> dict:
+        """Grouped summaries computed by SQLite, with days rolled up into weeks or months"""
+        if by not in BUCKETS:
+            raise ValueError(f"Unknown grouping {by!r}, expected one of {', '.join(BUCKETS)}")
+        key = "category" if by == "category" else _DAY
+        rows = self._connection.execute(
+            f"SELECT {key}, COUNT(*), SUM(amount), MIN(amount), MAX(amount) FROM expenses "
+            f"WHERE amount IS NOT NULL GROUP BY {key}")
+        result = {}
+        for key, count, total, minimum, maximum in rows:
+            label = key if by == "category" else bucket_label(key, by)
+            summary = Summary(count, total, minimum, maximum)
+            if label in result:
+                result[label].merge(summary)
+            else:
+                result[label] = summary
+        return result
+
+    def totals(self, by: str = "category") -> dict:
+        if by not in CACHED_BUCKETS:
+            raise ValueError(f"Totals are only cached by {', '.join(CACHED_BUCKETS)}, not {by!r}")
+        return {label: Summary(summary.count, summary.total) for label, summary in self.summary(by).items()}
+
+    def close(self):
+        self._connection.close()
+
+    def _row(self, line_number: int) -> tuple:
+        """(id, line) of the `line_number`-th row"""
+        row = self._connection.execute("SELECT id, line FROM expenses WHERE number = ?",
+                                       (line_number,)).fetchone()
+        if row is None:
+            raise ValueError("Number given is not in the range of values added")
+        return row
+
+    def _numbered(self, ids: list):
+        """Yield (line number, line) for sorted row ids"""
+        for row_id in ids:
+            line_number, line = self._connection.execute(
+                "SELECT number, line FROM expenses WHERE id = ?", (row_id,)).fetchone()
+            yield line_number, line.strip()
+
+    @staticmethod
+    def _columns(row_id: int, line_number: int, line: str, expense) -> tuple:
+        if expense is None:
+            return row_id, line_number, line, None, None, None
+        return row_id, line_number, line, expense.timestamp, expense.category, expense.amount
@@ -0,0 +1,260 @@
+import datetime
+import json
+from array import array
+from collections import defaultdict
+from functools import partial
+from operator import floordiv
+from itertools import repeat
+from pathlib import Path
+
+from .index import ledger_state
+from .record import Expense, ExpenseTable, divide_amount, format_amount
+
+BUCKETS = ("category", "day", "week", "month")
+CACHED_BUCKETS = ("category", "month")  # Groupings of the totals kept up to date by SummaryCache
+SUMMARY_SUFFIX = ".sum"
+SUMMARY_LOG_LIMIT = 1000  # Saves appended to the summary sidecar before it is rewritten whole
+SECONDS_PER_DAY = 86400
+_EPOCH = datetime.date(1970, 1, 1)
+_CACHE_GROUPS = ("category", "day")  # Groupings SummaryCache keeps counters for; weeks and months roll up days
+
+
+class Summary:
+    """Count, total, minimum and maximum of a group of amounts, in cents"""
+    __slots__ = ("count", "total", "minimum", "maximum")
+
+    def __init__(self, count: int = 0, total: int = 0, minimum: int = None, maximum: int = None):
+        self.count = count
+        self.total = total
+        self.minimum = minimum
+        self.maximum = maximum
+
+    @classmethod
+    def of(cls, amounts) -> "Summary":
+        """Summarise a non-empty sequence of amounts with builtin reductions"""
+        return cls(len(amounts), sum(amounts), min(amounts), max(amounts))
+
+    @property
+    def mean(self) -> int:
+        """Mean amount in cents, rounded half away from zero"""
+        return divide_amount(self.total, self.count)
+
+    def merge(self, other: "Summary") -> "Summary":
+        """Fold another summary into this one"""
+        if other.count:
+            self.minimum = other.minimum if self.minimum is None else min(self.minimum, other.minimum)
+            self.maximum = other.maximum if self.maximum is None else max(self.maximum, other.maximum)
+            self.count += other.count
+            self.total += other.total
+        return self
+
+    def __eq__(self, other):
+        if not isinstance(other, Summary):
+            return NotImplemented
+        return (self.count, self.total, self.minimum, self.maximum) == \
+            (other.count, other.total, other.minimum, other.maximum)
+
+    def __repr__(self):
+        return f"Summary(count={self.count}, total={self.total}, minimum={self.minimum}, maximum={self.maximum})"
+
+
+def bucket_label(day: int, by: str) -> str:
+    """Label of the time bucket holding a day (days since the epoch)"""
+    date = _EPOCH + datetime.timedelta(days=day)
+    if by == "day":
+        return date.isoformat()
+    if by == "week":
+        year, week, _ = date.isocalendar()
+        return f"{year}-W{week:02d}"
+    return f"{date.year}-{date.month:02d}"
+
+
+def summarize(table: ExpenseTable, by: str = "category") -> dict:
+    """Group the amounts of a table by category or time bucket in one pass.
+
+    Amounts are first split into one array per category code or per day,
+    then each group is reduced with builtin sum/min/max; days are rolled
+    up into weeks or months afterwards, so per-row work stays minimal.
+    """
+    if by not in BUCKETS:
+        raise ValueError(f"Unknown grouping {by!r}, expected one of {', '.join(BUCKETS)}")
+    if by == "category":
+        keys = table.category_codes
+    else:
+        keys = map(floordiv, table.timestamps, repeat(SECONDS_PER_DAY))
+    groups = defaultdict(partial(array, "q"))
+    for key, amount in zip(keys, table.amounts):
+        groups[key].append(amount)
+
+    result = {}
+    for key, amounts in groups.items():
+        label = table.categories[key] if by == "category" else bucket_label(key, by)
+        summary = Summary.of(amounts)
+        if label in result:
+            result[label].merge(summary)
+        else:
+            result[label] = summary
+    return result
+
+
+def format_summary(label: str, summary: Summary) -> str:
+    """One line describing a group, with its minimum and maximum when they are known"""
+    line = (f"{label}: total {format_amount(summary.total)}, count {summary.count}, "
+            f"mean {format_amount(summary.mean)}")
+    if summary.minimum is not None:
+        line += f", min {format_amount(summary.minimum)}, max {format_amount(summary.maximum)}"
+    return line
+
+
+def merge_summaries(into: dict, other: dict) -> dict:
+    """Merge grouped summaries, e.g. computed over separate chunks of a ledger"""
+    for label, summary in other.items():
+        if label in into:
+            into[label].merge(summary)
+        else:
+            into[label] = Summary().merge(summary)
+    return into
+
+
+class SummaryCache:
+    """Running count, total, minimum and maximum per category and per day, persisted next to the ledger.
+
+    Every add, remove or update adjusts a couple of counters, and weeks and
+    months are rolled up from the days, so summaries take time in the number
+    of groups rather than of expenses. The sidecar records the ledger state
+    it matches and is only rebuilt with a full pass when that state is stale.
+    Removing a group's minimum or maximum leaves that extreme unknown until
+    the next rebuild, which only summaries needing extremes ask for.
+
+    The sidecar holds JSON lines: every group, then one line per save with
+    just the groups that changed, so a save doesn't rewrite every day.
+    """
+
+    def __init__(self, ledger_path):
+        self._ledger_path = Path(ledger_path)
+        self._path = self._ledger_path.with_name(self._ledger_path.name + SUMMARY_SUFFIX)
+        self._groups = {by: {} for by in _CACHE_GROUPS}  # label -> [count, total, minimum, maximum]
+        self._state = None  # Ledger state the totals describe
+        self._changes = None  # Counters changed since the last save per grouping (None if removed), or None for all
+        self._saves = 0  # Lines of changes in the sidecar
+
+    @property
+    def path(self) -> Path:
+        return self._path
+
+    def is_current(self) -> bool:
+        """Whether the totals still describe the ledger on disk"""
+        return self._state == ledger_state(self._ledger_path)
+
+    def load(self) -> bool:
+        """Read the sidecar if it matches the ledger on disk"""
+        try:
+            lines = self._path.read_text().splitlines()
+            data = json.loads(lines[0])
+            groups = {by: data["groups"][by] for by in _CACHE_GROUPS}
+            state = data["state"]
+            for line in lines[1:]:
+                data = json.loads(line)
+                for by, changes in data["changes"].items():
+                    for label, counters in changes.items():
+                        if counters is None:
+                            groups[by].pop(label, None)
+                        else:
+                            groups[by][label] = counters
+                state = data["state"]
+        except (OSError, ValueError, KeyError, TypeError, AttributeError, IndexError):
+            return False
+        if state != ledger_state(self._ledger_path):
+            return False
+        self._groups = groups
+        self._state = state
+        self._changes = {by: {} for by in _CACHE_GROUPS}
+        self._saves = len(lines) - 1
+        return True
+
+    def save(self):
+        """Record the current ledger state and write the changed groups, or every group now and then"""
+        self._state = ledger_state(self._ledger_path)
+        if self._changes is None or self._saves >= SUMMARY_LOG_LIMIT:
+            self._path.write_text(json.dumps({"state": self._state, "groups": self._groups}) + "\n")
+            self._saves = 0
+        else:
+            with self._path.open("a") as f:
+                f.write(json.dumps({"state": self._state, "changes": self._changes}) + "\n")
+            self._saves += 1
+        self._changes = {by: {} for by in _CACHE_GROUPS}
+
+    def rebuild(self, tables):
+        """Recompute the totals from ExpenseTable chunks covering the whole ledger"""
+        self._groups = {by: {} for by in _CACHE_GROUPS}
+        self._changes = None
+        for table in tables:
+            for by in _CACHE_GROUPS:
+                groups = self._groups[by]
+                for label, summary in summarize(table, by).items():
+                    counters = groups.get(label)
+                    if counters is None:
+                        groups[label] = [summary.count, summary.total, summary.minimum, summary.maximum]
+                        continue
+                    counters[0] += summary.count
+                    counters[1] += summary.total
+                    counters[2] = min(counters[2], summary.minimum)
+                    counters[3] = max(counters[3], summary.maximum)
+        self.save()
+
+    def reset(self):
+        self._groups = {by: {} for by in _CACHE_GROUPS}
+        self._changes = None
+
+    def add(self, expense: Expense, sign: int = 1):
+        """Count an expense in its category and day (`sign=-1` to take it out)"""
+        labels = (expense.category, bucket_label(expense.timestamp // SECONDS_PER_DAY, "day"))
+        amount = expense.amount
+        for by, label in zip(_CACHE_GROUPS, labels):
+            groups = self._groups[by]
+            counters = groups.get(label)
+            if counters is None:
+                counters = groups[label] = [0, 0, amount, amount]
+            counters[0] += sign
+            counters[1] += sign * amount
+            if not counters[0]:
+                del groups[label]
+            elif sign > 0:
+                if counters[2] is not None:
+                    counters[2] = min(counters[2], amount)
+                    counters[3] = max(counters[3], amount)
+            elif amount in (counters[2], counters[3]):
+                counters[2] = counters[3] = None  # The next extreme is only known after a rebuild
+            if self._changes is not None:
+                self._changes[by][label] = groups.get(label)
+
+    def remove(self, expense: Expense):
+        self.add(expense, sign=-1)
+
+    def totals(self, by: str = "category") -> dict:
+        """Count and total per label"""
+        if by not in CACHED_BUCKETS:
+            raise ValueError(f"Totals are only cached by {', '.join(CACHED_BUCKETS)}, not {by!r}")
+        return self._rolled_up(by, lambda count, total, minimum, maximum: Summary(count, total))
+
+    def summaries(self, by: str = "category"):
+        """Full summaries per label, or None while a removed extreme leaves one unknown"""
+        if by not in BUCKETS:
+            raise ValueError(f"Unknown grouping {by!r}, expected one of {', '.join(BUCKETS)}")
+        if any(counters[2] is None for counters in self._groups["category" if by == "category" else "day"].values()):
+            return None
+        return self._rolled_up(by, Summary)
+
+    def _rolled_up(self, by: str, make) -> dict:
+        """Summaries made from the counters of each category or day, with days rolled up into weeks or months"""
+        groups = self._groups["category" if by == "category" else "day"]
+        if by in _CACHE_GROUPS:
+            return {label: make(*counters) for label, counters in groups.items()}
+        result = {}
+        for day, counters in groups.items():
+            label = bucket_label((datetime.date.fromisoformat(day) - _EPOCH).days, by)
+            if label in result:
+                result[label].merge(make(*counters))
+            else:
+                result[label] = make(*counters)
+        return result
@@ -0,0 +1,222 @@
+import csv
+import json
+import struct
+import time
+import zlib
+from array import array
+from pathlib import Path
+
+from .record import ExpenseTable, format_amount, parse_amount, parse_timestamp
+
+FORMATS = ("csv", "jsonl", "columnar")
+SUFFIXES = {".csv": "csv", ".jsonl": "jsonl", ".cols": "columnar"}
+FIELDS = ("timestamp", "category", "amount", "description")
+ROW_GROUP = 100_000  # Rows per compressed group of a columnar dump
+ERRORS = ("raise", "skip")
+
+# Columnar dump: magic, then per row group a header and six zlib-compressed sections:
+# timestamps, amounts, description ends (int64), category codes (uint32), category names, descriptions
+_MAGIC = b"EXPCOL02"
+_GROUP = struct.Struct("<q6qq")  # rows, compressed size of each section, categories
+
+
+class TransferReport:
+    """How many rows an import or export moved or skipped, and how fast"""
+    __slots__ = ("rows", "skipped", "seconds")
+
+    def __init__(self, rows: int = 0, skipped: int = 0, seconds: float = 0.0):
+        self.rows = rows
+        self.skipped = skipped
+        self.seconds = seconds
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.rows / self.seconds if self.seconds else 0.0
+
+    def __repr__(self):
+        return (f"TransferReport(rows={self.rows}, skipped={self.skipped}, seconds={self.seconds:.3f}, "
+                f"rows_per_second={self.rows_per_second:.0f})")
+
+
+def transfer_format(path, format: str = None) -> str:
+    """The format named, or else the one matching the file extension"""
+    format = format or SUFFIXES.get(Path(path).suffix.lower())
+    if format not in FORMATS:
+        raise ValueError(f"Unknown format {format!r}, expected one of {', '.join(FORMATS)}")
+    return format
+
+
+def ledger_line(timestamp: str, category: str, amount, description: str = "") -> str:
+    """Validate the fields of an imported row and join them into a ledger line"""
+    if isinstance(amount, (int, float)) and not isinstance(amount, bool):
+        amount = repr(amount)
+    if not all(isinstance(field, str) for field in (timestamp, category, amount, description)):
+        raise ValueError("Timestamp, category, amount and description must be text")
+    parse_timestamp(timestamp)
+    for text in (category, description):
+        if "\t" in text or "\n" in text or "\r" in text:
+            raise ValueError(f"Tabs and line breaks aren't allowed in {text!r}")
+    if not category:
+        raise ValueError("Missing category")
+    return f"{timestamp}\t{category}\t{format_amount(parse_amount(amount))}\t{description.rstrip()}"
+
+
+def _json_fields(text: str) -> list:
+    record = json.loads(text)
+    if not isinstance(record, dict):
+        raise ValueError("Expected a JSON object")
+    return [record.get(field, "") for field in FIELDS]
+
+
+def _split_line(line: str) -> tuple:
+    """(timestamp, category, amount without currency, description) of a ledger line"""
+    fields = line.rstrip("\r\n").split("\t", 3)
+    if len(fields) < 3:
+        raise ValueError(f"Not an expense line: {line.rstrip()!r}")
+    parse_timestamp(fields[0])
+    amount = format_amount(parse_amount(fields[2]), currency="")
+    return fields[0], fields[1], amount, fields[3].rstrip() if len(fields) == 4 else ""
+
+
+def read_rows(path, format: str, errors: str, report: TransferReport):
+    """Yield ledger lines for the valid rows of a file, counting them in `report`"""
+    if errors not in ERRORS:
+        raise ValueError(f"Unknown error policy {errors!r}, expected one of {', '.join(ERRORS)}")
+    if format == "columnar":
+        for table in read_columnar(path):
+            for line in table.to_lines():
+                report.rows += 1
+                yield line
+        return
+    with Path(path).open(newline="" if format == "csv" else None, encoding="utf-8") as f:
+        if format == "csv":
+            rows = csv.reader(f)
+            header = next(rows, None)
+            if header is None:
+                return
+            columns = [header.index(field) if field in header else None for field in FIELDS]
+            if None in columns[:3]:
+                raise ValueError(f"CSV header must have {', '.join(FIELDS[:3])} columns, got {header}")
+
+            def fields(row):
+                return [row[column] if column is not None and column < len(row) else "" for column in columns]
+            records = enumerate(rows, 2)
+        else:
+            fields = _json_fields
+            records = ((number, text) for number, text in enumerate(f, 1) if text.strip())
+        for number, record in records:
+            try:
+                line = ledger_line(*fields(record))
+            except ValueError as error:
+                if errors == "raise":
+                    raise ValueError(f"Row {number} of {path}: {error}") from None
+                report.skipped += 1
+                continue
+            report.rows += 1
+            yield line
+
+
+def write_rows(lines, path, format: str, errors: str, report: TransferReport):
+    """Write ledger lines to a file, counting them in `report`"""
+    if errors not in ERRORS:
+        raise ValueError(f"Unknown error policy {errors!r}, expected one of {', '.join(ERRORS)}")
+    if format == "columnar":
+        write_columnar(_checked_tables(lines, errors, report), path)
+        return
+    with Path(path).open("w", newline="" if format == "csv" else None, encoding="utf-8") as f:
+        if format == "csv":
+            writer = csv.writer(f)
+            writer.writerow(FIELDS)
+            write = writer.writerow
+        else:
+            def write(fields):
+                f.write(json.dumps(dict(zip(FIELDS, fields)), ensure_ascii=False) + "\n")
+        for number, line in enumerate(lines, 1):
+            try:
+                fields = _split_line(line)
+            except ValueError as error:
+                if errors == "raise":
+                    raise ValueError(f"Line {number}: {error}") from None
+                report.skipped += 1
+                continue
+            write(fields)
+            report.rows += 1
+
+
+def _checked_tables(lines, errors: str, report: TransferReport):
+    """ExpenseTable chunks of ROW_GROUP rows, applying the error policy to free text"""
+    table = ExpenseTable()
+    for number, line in enumerate(lines, 1):
+        if not table.append_line(line, number):
+            if errors == "raise":
+                raise ValueError(f"Line {number} is not an expense: {line.rstrip()!r}")
+            report.skipped += 1
+            continue
+        report.rows += 1
+        if len(table) >= ROW_GROUP:
+            yield table
+            table = ExpenseTable()
+    if len(table):
+        yield table
+
+
+def write_columnar(tables, path):
+    """Write ExpenseTable chunks as zlib-compressed column groups, one group per table"""
+    with Path(path).open("wb") as f:
+        f.write(_MAGIC)
+        for table in tables:
+            sections = [zlib.compress(section, 6) for section in (
+                array("q", table.timestamps).tobytes(),
+                array("q", table.amounts).tobytes(),
+                array("q", table._description_ends).tobytes(),
+                array("I", table.category_codes).tobytes(),
+                "\n".join(table.categories).encode("utf-8"),
+                bytes(table._descriptions),
+            )]
+            f.write(_GROUP.pack(len(table), *map(len, sections), len(table.categories)))
+            for section in sections:
+                f.write(section)
+
+
+def read_columnar(path):
+    """Yield one ExpenseTable per group of a columnar dump, decompressing a group at a time"""
+    with Path(path).open("rb") as f:
+        magic = f.read(len(_MAGIC))
+        if magic != _MAGIC:
+            raise ValueError(f"Not a columnar expense dump: {path}")
+        while True:
+            header = f.read(_GROUP.size)
+            if not header:
+                return
+            if len(header) < _GROUP.size:
+                raise ValueError(f"Truncated columnar expense dump: {path}")
+            rows, *sizes, categories = _GROUP.unpack(header)
+            try:
+                sections = [zlib.decompress(f.read(size)) for size in sizes]
+            except zlib.error as error:
+                raise ValueError(f"Corrupt columnar expense dump: {path}: {error}") from None
+            table = ExpenseTable()
+            for column, typecode, section in zip(("timestamps", "amounts", "_description_ends", "category_codes"),
+                                                 "qqqI", sections):
+                values = array(typecode)
+                values.frombytes(section)
+                if len(values) != rows:
+                    raise ValueError(f"Corrupt columnar expense dump: {path}")
+                setattr(table, column, values)
+            # A single empty category name joins to no bytes at all, so the count tells it from none
+            table.categories = sections[4].decode("utf-8").split("\n") if categories else []
+            if len(table.categories) != categories:
+                raise ValueError(f"Corrupt columnar expense dump: {path}")
+            table._category_codes = {category: code for code, category in enumerate(table.categories)}
+            table._descriptions = bytearray(sections[5])
+            table.line_numbers = array("q", bytes(8 * rows))
+            yield table
+
+
+def timed(function, *args) -> TransferReport:
+    """Run `function(*args, report)` and return the report with the time it took"""
+    report = TransferReport()
+    start = time.perf_counter()
+    function(*args, report)
+    report.seconds = time.perf_counter() - start
+    return report
@@ -0,0 +1,105 @@
+import asyncio
+
+import pytest
+
+from src.aio import AsyncExpenseTracker
+from src.expense import ExpenseTracker
+from src.record import Expense
+
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+
+class TestAsyncExpenseTracker:
+    """Test the asyncio wrapper around ExpenseTracker"""
+
+    def test_add_and_read(self, tmp_path):
+        """Test that the mirrored methods behave like the blocking ones"""
+        async def scenario():
+            async with await AsyncExpenseTracker.open("ledger.txt", tmp_path) as tracker:
+                assert await tracker.add_expense("Coffee") == 1
+                assert await tracker.add_expense(Expense(0, "Food", 250, "Lunch")) == 2
+                assert await tracker.find_expense(1) == "Coffee"
+                assert await tracker.update_expense(1, "Tea")
+                found = [match async for match in tracker.search("lunch")]
+                assert found == [(2, Expense(0, "Food", 250, "Lunch").to_line())]
+                assert await tracker.remove_expense(1)
+                return await tracker.get_expenses()
+        assert run(scenario()) == [Expense(0, "Food", 250, "Lunch").to_line() + "\n"]
+
+    def test_sqlite_ledger(self, tmp_path):
+        """Test that an SQLite ledger can be used from whichever pool thread runs each call"""
+        async def scenario():
+            async with await AsyncExpenseTracker.open("ledger.db", tmp_path) as tracker:
+                for row in range(20):
+                    await tracker.add_expense(Expense(86400 * row, "Food", 100, f"Row {row}"))
+                await tracker.remove_expense(1)
+                return await tracker.get_total_lines(), await tracker.find_expense(1), await tracker.totals()
+        count, first, totals = run(scenario())
+        assert count == 19
+        assert first == Expense(86400, "Food", 100, "Row 1").to_line()
+        assert totals["Food"].total == 1900
+
+    def test_concurrent_adds_are_batched(self, tmp_path, mocker):
+        """Test that adds issued together share an append and get their own line numbers"""
+        async def scenario():
+            tracker = await AsyncExpenseTracker.open("ledger.txt", tmp_path)
+            spy = mocker.spy(tracker.tracker, "add_expenses")
+            numbers = await asyncio.gather(*(tracker.add_expense(f"Row {row}") for row in range(50)))
+            await tracker.close()
+            return numbers, spy.call_count
+        numbers, calls = run(scenario())
+        assert numbers == list(range(1, 51))
+        assert calls < 50
+        assert ExpenseTracker("ledger.txt", tmp_path).get_expenses() == [f"Row {row}\n" for row in range(50)]
+
+    def test_add_expenses_and_queries(self, tmp_path, mocker):
+        """Test that several expenses share one flushed append, and the query methods"""
+        async def scenario():
+            async with await AsyncExpenseTracker.open("ledger.txt", tmp_path, fsync=True) as tracker:
+                spy = mocker.spy(tracker.tracker, "add_expenses")
+                lines = [Expense(86400 * day, "Food", 100 * day, f"Day {day}").to_line() for day in range(1, 4)]
+                assert await tracker.add_expenses(lines) == 3
+                assert spy.call_args.args[2] is True  # fsync
+                assert await tracker.add_expenses([]) == 3
+                days = [line async for line in tracker.query_range(2 * 86400, 4 * 86400)]
+                amounts = [line async for line in tracker.search_amount(100, 200)]
+                return days, amounts, await tracker.totals(), (await tracker.summary("day"))["1970-01-02"]
+        days, amounts, totals, first_day = run(scenario())
+        assert [number for number, _ in days] == [2, 3]
+        assert [number for number, _ in amounts] == [1, 2]
+        assert totals["Food"].total == 600 and first_day.total == 100
+
+    def test_iter_expenses_pages(self, tmp_path):
+        """Test that streaming reads every line once, across page boundaries"""
+        ExpenseTracker("ledger.txt", tmp_path).add_expenses([f"Row {row}" for row in range(25)])
+
+        async def scenario():
+            async with await AsyncExpenseTracker.open("ledger.txt", tmp_path) as tracker:
+                every = [line async for line in tracker.iter_expenses(page_size=10)]
+                some = [line async for line in tracker.iter_expenses(5, 12, page_size=3)]
+                return every, some
+        every, some = run(scenario())
+        assert every == [f"Row {row}\n" for row in range(25)]
+        assert some == [f"Row {row}\n" for row in range(4, 12)]
+
+    def test_errors_reach_the_caller(self, tmp_path):
+        """Test that an exception raised on the pool is raised by the awaited call"""
+        async def scenario():
+            async with await AsyncExpenseTracker.open("ledger.txt", tmp_path) as tracker:
+                await tracker.find_expense(1)
+        with pytest.raises(ValueError):
+            run(scenario())
+
+    def test_many_ledgers(self, tmp_path):
+        """Test serving several ledgers from one event loop"""
+        async def scenario():
+            trackers = [await AsyncExpenseTracker.open(f"user{user}.txt", tmp_path) for user in range(5)]
+            await asyncio.gather(*(tracker.add_expense(f"Expense {row}")
+                                   for tracker in trackers for row in range(10)))
+            totals = [await tracker.get_total_lines() for tracker in trackers]
+            for tracker in trackers:
+                await tracker.close()
+            return totals
+        assert run(scenario()) == [10] * 5
@@ -0,0 +1,91 @@
+import os
+
+import pytest
+
+from src.cache import BlockCache
+from src.expense import ExpenseTracker
+
+
+@pytest.fixture
+def data_file(tmp_path):
+    path = tmp_path / "data.bin"
+    path.write_bytes(bytes(range(256)) * 4)
+    return path
+
+
+class TestBlockCache:
+    """Test the LRU block cache"""
+
+    def test_reads_across_blocks(self, data_file):
+        """Test that reads spanning blocks return the right bytes"""
+        cache = BlockCache(max_bytes=1024, block_size=100)
+        data = data_file.read_bytes()
+        assert cache.read(data_file, 95, 310) == data[95:310]
+        assert cache.read(data_file, 1000, 2000) == data[1000:]
+        assert cache.read(data_file, 2000, 2100) == b""
+        assert cache.misses == 5 and cache.hits == 0
+
+    def test_hits_and_eviction(self, data_file):
+        """Test that repeated reads hit and the least recently used block goes first"""
+        cache = BlockCache(max_bytes=200, block_size=100)
+        cache.read(data_file, 0, 10)
+        cache.read(data_file, 100, 110)
+        cache.read(data_file, 0, 10)
+        assert cache.stats()["hits"] == 1
+        cache.read(data_file, 200, 210)  # Evicts block 1, used less recently than block 0
+        assert len(cache) == 2 and cache.stats()["bytes"] == 200
+        cache.read(data_file, 0, 10)
+        assert cache.hits == 2
+        cache.read(data_file, 100, 110)
+        assert cache.misses == 4
+
+    def test_stale_blocks_dropped(self, data_file):
+        """Test that a file whose size or mtime changed is read again"""
+        cache = BlockCache(block_size=100)
+        cache.read(data_file, 0, 10)
+        data_file.write_bytes(b"x" * 50)
+        assert cache.read(data_file, 0, 10) == b"x" * 10
+        stat = data_file.stat()
+        cache.invalidate(data_file)
+        data_file.write_bytes(b"y" * 50)
+        os.utime(data_file, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+        assert cache.read(data_file, 0, 10) == b"y" * 10
+        assert cache.misses == 3
+
+
+class TestTrackerCache:
+    """Test the block cache inside ExpenseTracker"""
+
+    def test_repeated_find_hits(self, tmp_path):
+        """Test that looking up the same or a nearby line is served from memory"""
+        tracker = ExpenseTracker("ledger.txt", tmp_path)
+        tracker.add_expenses([f"Row {row}" for row in range(100)])
+        tracker.find_expense(50)
+        misses = tracker.cache_stats()["misses"]
+        assert tracker.find_expense(50) == "Row 49"
+        assert tracker.find_expense(51) == "Row 50"
+        assert list(tracker.iter_expenses(40, 42)) == ["Row 39\n", "Row 40\n", "Row 41\n"]
+        assert tracker.cache_stats()["misses"] == misses
+        assert tracker.cache_stats()["hits"] > 0
+
+    def test_writes_invalidate(self, tmp_path):
+        """Test that in-place updates, splices and removals are seen by the next read"""
+        tracker = ExpenseTracker("ledger.txt", tmp_path, record_width=16)
+        tracker.add_expenses(["Coffee", "Lunch", "Dinner"])
+        assert tracker.find_expense(2) == "Lunch"
+        tracker.update_expense(2, "Brunch")
+        assert tracker.find_expense(2) == "Brunch"
+        tracker.remove_expense(1)
+        assert tracker.find_expense(1) == "Brunch"
+        plain = ExpenseTracker("plain.txt", tmp_path)
+        plain.add_expenses(["Tea", "Cake"])
+        assert plain.find_expense(1) == "Tea"
+        plain.update_expense(1, "Pie")  # Same length: size is unchanged
+        assert plain.find_expense(1) == "Pie"
+        assert plain.find_expense(2) == "Cake"
+
+    def test_disabled(self, tmp_path):
+        tracker = ExpenseTracker("ledger.txt", tmp_path, cache_bytes=0)
+        tracker.add_expenses(["Coffee"])
+        assert tracker.find_expense(1) == "Coffee"
+        assert tracker.cache_stats() == {}
@@ -0,0 +1,85 @@
+import io
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+from src.cli import main
+
+ROOT = Path(__file__).resolve().parent.parent
+LINES = [
+    "2024-01-02 12:00:00\tFood\t$12.50\tLunch",
+    "2024-01-03 09:00:00\tTransport\t$2.50\tBus",
+    "2024-01-05 09:00:00\tFood\t$3.00\tCoffee",
+]
+
+
+@pytest.fixture
+def run(tmp_path, capsys):
+    """Run a command against a ledger in tmp_path; returns its status and stdout lines, or stderr ones if it failed"""
+    def run(*argv, stdin=""):
+        with pytest.MonkeyPatch.context() as patch:
+            patch.setattr(sys, "stdin", io.StringIO(stdin))
+            status = main(["--directory", str(tmp_path), *argv])
+        output = capsys.readouterr()
+        return status, (output.err if status else output.out).splitlines()
+    return run
+
+
+@pytest.fixture
+def ledger(run):
+    assert run("bulk-add", stdin="\n".join(LINES) + "\n") == (0, ["Added 3 expenses, skipped 0."])
+    return run
+
+
+class TestCommands:
+    """Test the non-interactive commands"""
+
+    def test_add(self, run):
+        assert run("add", "Food", "12.50", "Lunch", "--timestamp", "2024-01-02 12:00:00") == (0, [f"1: {LINES[0]}"])
+        status, lines = run("add", "Tea", "1")
+        assert status == 0 and lines[0].startswith("2: ") and lines[0].endswith("\tTea\t$1.00\t")
+
+    def test_bulk_add_errors(self, run):
+        """Test that invalid lines stop the import, or are skipped and counted"""
+        status, lines = run("bulk-add", stdin=f"{LINES[0]}\nnot an expense\n")
+        assert status == 1 and lines[-1].startswith("error: line 2: ")
+        assert run("bulk-add", "--errors", "skip", stdin=f"not an expense\n\n{LINES[1]}\n") == \
+            (0, ["Added 1 expenses, skipped 1."])
+
+    def test_list(self, ledger):
+        assert ledger("list") == (0, [f"{number}: {line}" for number, line in enumerate(LINES, 1)])
+        # A bare day as the end of the range includes all of it
+        assert ledger("list", "--range", "2024-01-02", "2024-01-03") == (0, [f"1: {LINES[0]}", f"2: {LINES[1]}"])
+        assert ledger("list", "--range", "2024-01-02 12:00:01", "2024-01-05 09:00:00") == (0, [f"2: {LINES[1]}"])
+
+    def test_search(self, ledger):
+        """Test word, amount and substring searches"""
+        assert ledger("search", "food") == (0, [f"1: {LINES[0]}", f"3: {LINES[2]}"])
+        assert ledger("search", "2.50") == (0, [f"2: {LINES[1]}"])
+        assert ledger("search", "offe", "--substring") == (0, [f"3: {LINES[2]}"])
+
+    def test_summary(self, ledger):
+        status, lines = ledger("summary")
+        assert status == 0 and [line.split(":")[0] for line in lines] == ["Food", "Transport"]
+        assert lines[0] == "Food: total $15.50, count 2, mean $7.75, min $3.00, max $12.50"
+        assert ledger("summary", "--by", "day")[1][0].startswith("2024-01-02: total $12.50")
+        ledger("remove", "1")
+        # Removing the largest expense leaves the cached maximum unknown until it is recomputed
+        assert ledger("summary", "--by", "month")[1] == \
+            ["2024-01: total $5.50, count 2, mean $2.75, min $2.50, max $3.00"]
+
+    def test_remove_and_update(self, ledger):
+        assert ledger("remove", "2") == (0, ["Removed line 2."])
+        updated = "2024-01-06 10:00:00\tFood\t$4.00\tTea"
+        assert ledger("update", "2", "Food", "4", "Tea", "--timestamp", "2024-01-06 10:00:00") == \
+            (0, [f"2: {updated}"])
+        assert ledger("list")[1] == [f"1: {LINES[0]}", f"2: {updated}"]
+        assert ledger("remove", "5") == (1, ["error: No expense at line 5"])
+
+    def test_main_dispatch(self, tmp_path):
+        """Test that main.py runs a command when given arguments, keeping notices off stdout"""
+        result = subprocess.run([sys.executable, "main.py", "--directory", str(tmp_path), "list"], cwd=ROOT,
+                                capture_output=True, text=True, check=True)
+        assert result.stdout == "" and "created" in result.stderr
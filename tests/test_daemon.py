@@ -0,0 +1,126 @@
+import asyncio
+import signal
+import subprocess
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import pytest
+
+from src.client import FRAME, LedgerClient, encode
+from src.daemon import LedgerServer
+from src.expense import ExpenseTracker
+from src.summary import Summary
+
+ROOT = Path(__file__).resolve().parent.parent
+LINES = [
+    "2024-01-02 12:00:00\tFood\t$12.50\tLunch",
+    "2024-01-03 09:00:00\tTransport\t$2.50\tBus",
+    "2024-01-05 09:00:00\tFood\t$3.00\tCoffee",
+]
+
+
+@pytest.fixture
+def daemon(tmp_path):
+    """Socket of a daemon serving the ledgers of tmp_path, stopped with SIGTERM afterwards"""
+    socket_path = tmp_path / "tracker.sock"
+    process = subprocess.Popen([sys.executable, "-m", "src.daemon", "--directory", str(tmp_path),
+                                "--socket", str(socket_path)], cwd=ROOT, stdout=subprocess.PIPE, text=True)
+    assert process.stdout.readline().startswith("Serving ledgers")
+    yield socket_path
+    process.send_signal(signal.SIGTERM)
+    assert process.wait(timeout=10) == 0
+    assert not socket_path.exists()
+
+
+class TestLedgerDaemon:
+    """Test serving ledgers over a Unix domain socket"""
+
+    def test_requests(self, daemon):
+        """Test that the client answers like a tracker"""
+        with LedgerClient(daemon) as client:
+            assert client.add_expenses(LINES) == 3
+            assert client.add_expense("Coffee $5") == 4
+            assert client.get_total_lines() == 4
+            assert client.find_expense(2) == LINES[1]
+            assert list(client.iter_expenses(page_size=3)) == [line + "\n" for line in LINES + ["Coffee $5"]]
+            assert list(client.search("food")) == [(1, LINES[0]), (3, LINES[2])]
+            assert list(client.search_amount(250)) == [(2, LINES[1])]
+            assert list(client.query_range("2024-01-03 00:00:00", "2024-01-06 00:00:00")) == \
+                [(2, LINES[1]), (3, LINES[2])]
+            assert client.totals() == {"Food": Summary(2, 1550), "Transport": Summary(1, 250)}
+            assert client.summary("month") == {"2024-01": Summary(3, 1800, 250, 1250)}
+            assert client.update_expense(4, "Tea $2")
+            assert client.remove_expense(1)
+            with pytest.raises(ValueError):
+                client.find_expense(10)
+
+    def test_ledgers_and_errors(self, daemon, tmp_path):
+        """Test that each client names its ledger, outside paths are refused and errors keep the connection"""
+        with LedgerClient(daemon, "a.txt") as first, LedgerClient(daemon, "b.txt") as second:
+            first.add_expense("One")
+            second.add_expenses(["Two", "Three"])
+            with pytest.raises(ValueError, match="Unknown operation"):
+                first.request("drop")
+            assert first.get_total_lines() == 1 and second.get_total_lines() == 2
+        with LedgerClient(daemon, "../escape.txt") as client, pytest.raises(ValueError, match="Invalid ledger"):
+            client.add_expense("Nope")
+        assert not (tmp_path.parent / "escape.txt").exists()
+
+    def test_concurrent_clients(self, daemon, tmp_path):
+        """Test that adds from many clients at once all land, each at its own line"""
+        def add(client_number):
+            with LedgerClient(daemon) as client:
+                return [client.add_expense(f"Client {client_number} row {row}") for row in range(20)]
+        with ThreadPoolExecutor(8) as pool:
+            numbers = [number for numbers in pool.map(add, range(8)) for number in numbers]
+        assert sorted(numbers) == list(range(1, 161))
+        with LedgerClient(daemon) as client:
+            assert client.find_expense(numbers[0]) == "Client 0 row 0"
+
+    def test_adds_reach_disk(self, daemon, tmp_path):
+        """Test that an add is written before it is acknowledged, for other processes to read"""
+        with LedgerClient(daemon) as client:
+            client.add_expenses(LINES)
+        assert ExpenseTracker("expense.txt", tmp_path).get_expenses() == [line + "\n" for line in LINES]
+
+    def test_cli_over_socket(self, daemon):
+        """Test that main.py sends its commands to the daemon when given --socket"""
+        def cli(*argv, stdin=None):
+            return subprocess.run([sys.executable, "main.py", "--socket", str(daemon), *argv], cwd=ROOT, input=stdin,
+                                  capture_output=True, text=True, check=True).stdout.splitlines()
+        assert cli("bulk-add", stdin="\n".join(LINES) + "\n") == ["Added 3 expenses, skipped 0."]
+        assert cli("search", "food") == [f"1: {LINES[0]}", f"3: {LINES[2]}"]
+        assert cli("list", "--range", "2024-01-03", "2024-01-03") == [f"2: {LINES[1]}"]
+
+    def test_no_daemon(self, tmp_path):
+        with pytest.raises(ConnectionError):
+            LedgerClient(tmp_path / "missing.sock")
+
+
+class TestHandle:
+    """Test replies to malformed requests without a socket"""
+
+    def test_bad_requests(self, tmp_path):
+        async def scenario():
+            server = LedgerServer(tmp_path / "tracker.sock", tmp_path)
+            replies = [await server.handle(encode(request)[FRAME.size:]) for request in
+                       (["find", None], ["add", None, [1]], ["count", ".hidden"], ["count", None])]
+            await server.close()
+            return replies
+        missing, not_text, hidden, count = asyncio.run(scenario())
+        assert not missing[0] and "argument" in missing[1]
+        assert not_text == [False, "Expenses must be sent as lines of text"]
+        assert not hidden[0]
+        assert count == [True, 0]
+
+    def test_unexpected_errors_are_replies(self, tmp_path, mocker):
+        """Test that any error raised by a ledger is sent back rather than ending the connection"""
+        async def scenario():
+            server = LedgerServer(tmp_path / "tracker.sock", tmp_path)
+            tracker = await server._tracker(None)
+            mocker.patch.object(tracker.tracker, "get_total_lines", side_effect=RuntimeError("Lock lost"))
+            reply = await server.handle(encode(["count", None])[FRAME.size:])
+            await server.close()
+            return reply
+        assert asyncio.run(scenario()) == [False, "Lock lost"]
@@ -3,6 +3,8 @@ from pathlib import Path
 import tempfile
 import shutil
 from src.expense import ExpenseTracker, DIRECTORY
+from src.record import Expense
+from src.summary import Summary
 from factories.product import ProductFactory
 
 
@@ -123,6 +125,42 @@ class TestExpenseUpdate:
             tracker_with_files.update_expense(-15, "test")
 
 
+class TestLineIndexUsage:
+    """Test that lookups and rewrites go through the line-offset index"""
+
+    def test_update_keeps_trailing_newline(self, tracker_with_files: ExpenseTracker):
+        """Test that updating the last line does not glue the next add onto it"""
+        tracker_with_files.update_expense(10, "Updated")
+        tracker_with_files.add_expense("Next")
+        assert tracker_with_files.find_expense(10) == "Updated"
+        assert tracker_with_files.find_expense(11) == "Next"
+        assert tracker_with_files.get_total_lines() == 11
+
+    def test_update_with_longer_and_shorter_values(self, tracker):
+        """Test that following lines stay reachable after the line changes size"""
+        for item in ["Coffee", "Lunch", "Dinner"]:
+            tracker.add_expense(item)
+        tracker.update_expense(1, "A much longer coffee description")
+        assert tracker.find_expense(2) == "Lunch"
+        tracker.update_expense(1, "C")
+        assert tracker.find_expense(3) == "Dinner"
+        assert tracker.get_expenses() == ["C\n", "Lunch\n", "Dinner\n"]
+
+    def test_find_after_external_change(self, tracker, temp_dir):
+        """Test that the index is rebuilt when the file was edited elsewhere"""
+        tracker.add_expense("Coffee")
+        Path(tracker._file_path).write_text("Tea\nCake\n")
+        reopened = ExpenseTracker(file_path="test_expense.txt", directory=temp_dir)
+        assert reopened.find_expense(2) == "Cake"
+
+    def test_add_to_unterminated_file(self, temp_dir):
+        """Test adding to a file whose last line has no newline"""
+        (Path(temp_dir) / "raw.txt").write_text("Coffee")
+        tracker = ExpenseTracker(file_path="raw.txt", directory=temp_dir)
+        assert tracker.add_expense("Lunch") == 2
+        assert tracker.get_expenses() == ["Coffee\n", "Lunch\n"]
+
+
 class TestGetExpenses:
     """Test getting expenses"""
 
@@ -144,6 +182,224 @@ class TestGetExpenses:
         assert "Gas\n" in expenses
 
 
+class TestIterExpenses:
+    """Test streaming expenses from the file"""
+
+    def test_iter_matches_get_expenses(self, tracker_with_files):
+        """Test that streaming yields the same lines as reading them all"""
+        assert list(tracker_with_files.iter_expenses()) == tracker_with_files.get_expenses()
+
+    def test_iter_with_small_chunks(self, tracker):
+        """Test that lines longer than the read buffer come back whole"""
+        tracker.add_expense("Coffee at the station")
+        tracker.add_expense("Lunch")
+        assert list(tracker.iter_expenses(chunk_size=3)) == ["Coffee at the station\n", "Lunch\n"]
+
+    def test_iter_range(self, tracker):
+        """Test streaming a range of lines"""
+        for item in ["First", "Second", "Third", "Fourth"]:
+            tracker.add_expense(item)
+        assert list(tracker.iter_expenses(start=2, stop=3)) == ["Second\n", "Third\n"]
+        assert list(tracker.iter_expenses(start=4, chunk_size=2)) == ["Fourth\n"]
+        assert list(tracker.iter_expenses(stop=1)) == ["First\n"]
+        assert list(tracker.iter_expenses(start=5)) == []
+
+    def test_iter_unterminated_last_line(self, temp_dir):
+        """Test that a last line without newline is still yielded"""
+        (Path(temp_dir) / "raw.txt").write_text("Coffee\nLunch")
+        tracker = ExpenseTracker(file_path="raw.txt", directory=temp_dir)
+        assert list(tracker.iter_expenses()) == ["Coffee\n", "Lunch"]
+
+
+class TestExpenseTable:
+    """Test loading the file into and writing it from an ExpenseTable"""
+
+    def test_add_expense_record(self, tracker):
+        """Test adding a structured expense"""
+        expense = Expense(0, "Food", 1250, "Lunch")
+        tracker.add_expense(expense)
+        assert tracker.find_expense(1) == "1970-01-01 00:00:00\tFood\t$12.50\tLunch"
+
+    def test_load_and_write_table(self, tracker):
+        """Test that a table round-trips through the file"""
+        tracker.add_expense(Expense(0, "Food", 1250, "Lunch"))
+        tracker.add_expense("Free text")
+        tracker.add_expense(Expense(60, "Transport", 300, "Bus"))
+        table = tracker.load_table()
+        assert len(table) == 2
+        assert list(table.line_numbers) == [1, 3]
+        table.append(Expense(120, "Food", 99, "Snack"))
+        tracker.write_table(table)
+        assert tracker.get_total_lines() == 3
+        assert Expense.parse(tracker.find_expense(3)) == Expense(120, "Food", 99, "Snack")
+
+
+class TestSummary:
+    """Test summarising the expenses of the file"""
+
+    def test_summary_by_category(self, tracker):
+        """Test grouping totals by category, ignoring free-text lines"""
+        tracker.add_expense(Expense(0, "Food", 1250, "Lunch"))
+        tracker.add_expense("Free text")
+        tracker.add_expense(Expense(86400, "Food", 750, "Dinner"))
+        assert tracker.summary() == {"Food": Summary(2, 2000, 750, 1250)}
+        assert set(tracker.summary("day")) == {"1970-01-01", "1970-01-02"}
+
+    def test_summary_in_chunks(self, tracker, monkeypatch):
+        """Test that chunked parsing gives the same totals"""
+        monkeypatch.setattr("src.expense.SUMMARY_ROWS", 2)
+        for amount in range(1, 6):
+            tracker.add_expense(Expense(0, "Food", amount))
+        assert tracker.summary() == {"Food": Summary(5, 15, 1, 5)}
+
+    def test_summary_empty(self, tracker):
+        """Test summarising an empty file"""
+        assert tracker.summary("month") == {}
+
+    def test_totals_follow_changes(self, tracker):
+        """Test that cached totals follow adds, updates, removes and clears"""
+        tracker.add_expense(Expense(0, "Food", 1250, "Lunch"))
+        tracker.add_expense(Expense(0, "Transport", 300, "Bus"))
+        tracker.update_expense(2, Expense(0, "Food", 100, "Tea").to_line())
+        assert tracker.totals() == {"Food": Summary(2, 1350)}
+        tracker.remove_expense(1)
+        assert tracker.totals("month") == {"1970-01": Summary(1, 100)}
+        tracker.clear_expenses()
+        assert tracker.totals() == {}
+
+    def test_totals_match_summary(self, tracker_with_files):
+        """Test that totals rebuilt from scratch agree with a full summary"""
+        tracker_with_files.add_expense(Expense(0, "Food", 1250, "Lunch"))
+        tracker_with_files.add_expense(Expense(86400 * 40, "Food", 50, "Tea"))
+        summary = tracker_with_files.summary("month")
+        totals = tracker_with_files.totals("month")
+        assert {key: (s.count, s.total) for key, s in summary.items()} == \
+            {key: (s.count, s.total) for key, s in totals.items()}
+
+    def test_totals_are_incremental(self, tracker, monkeypatch):
+        """Test that keeping totals current doesn't rescan the file"""
+        tracker.totals()
+
+        def no_scan(*args, **kwargs):
+            raise AssertionError("file was rescanned")
+
+        monkeypatch.setattr(ExpenseTracker, "iter_tables", no_scan)
+        tracker.add_expense(Expense(0, "Food", 1250, "Lunch"))
+        tracker.update_expense(1, Expense(0, "Food", 250, "Tea").to_line())
+        tracker.add_expense("Free text")
+        tracker.remove_expense(2)
+        assert tracker.totals() == {"Food": Summary(1, 250)}
+        reopened = ExpenseTracker(file_path="test_expense.txt", directory=tracker._file_path.parent)
+        assert reopened.totals() == {"Food": Summary(1, 250)}
+
+    def test_time_summaries_are_cached(self, tracker, monkeypatch):
+        """Test that day, week and month summaries come from the cache instead of rereading the file"""
+        tracker.add_expense(Expense(0, "Food", 1250, "Lunch"))
+        tracker.totals()
+        monkeypatch.setattr(ExpenseTracker, "iter_tables", lambda self: pytest.fail("file was rescanned"))
+        tracker.add_expense(Expense(86400 * 7, "Food", 300, "Tea"))
+        assert tracker.summary("day") == {"1970-01-01": Summary(1, 1250, 1250, 1250),
+                                          "1970-01-08": Summary(1, 300, 300, 300)}
+        assert tracker.summary("week") == {"1970-W01": Summary(1, 1250, 1250, 1250),
+                                           "1970-W02": Summary(1, 300, 300, 300)}
+        assert tracker.summary("month") == {"1970-01": Summary(2, 1550, 300, 1250)}
+
+
+class TestSearch:
+    """Test keyword and amount search"""
+
+    @pytest.fixture
+    def searchable(self, tracker):
+        tracker.add_expense(Expense(0, "Food", 2000, "Lunch"))
+        tracker.add_expense(Expense(0, "Transport", 250, "Bus fare"))
+        tracker.add_expense("Coffee $5")
+        return tracker
+
+    def test_search_keywords(self, searchable):
+        """Test finding lines by category or description words"""
+        assert [line for line, _ in searchable.search("bus")] == [2]
+        assert list(searchable.search("coffee")) == [(3, "Coffee $5")]
+        assert list(searchable.search("lun")) == []
+
+    def test_search_substring(self, searchable):
+        """Test the explicit substring scan"""
+        assert [line for line, _ in searchable.search("lun", substring=True)] == [1]
+
+    def test_search_amount(self, searchable):
+        """Test finding expenses by amount"""
+        assert [line for line, _ in searchable.search_amount(250)] == [2]
+        assert [line for line, _ in searchable.search_amount(0, 10000)] == [1, 2]
+
+    def test_search_follows_changes(self, searchable):
+        """Test that the index follows updates and removals"""
+        searchable.search("food")  # Build the index
+        searchable.update_expense(2, Expense(0, "Food", 100, "Tea").to_line())
+        searchable.remove_expense(1)
+        searchable.add_expense("Lunch again")
+        assert [line for line, _ in searchable.search("food")] == [1]
+        assert [line for line, _ in searchable.search("lunch")] == [3]
+        assert [line for line, _ in searchable.search_amount(100)] == [1]
+
+    def test_search_after_multiline_update(self, searchable):
+        """Test that an update spanning several lines leaves a correct index"""
+        list(searchable.search("food"))
+        searchable.update_expense(1, "Tea\nCake")
+        assert [line for line, _ in searchable.search("coffee")] == [4]
+
+
+class TestQueryRange:
+    """Test time-range queries through the time index"""
+
+    DAY = 86400
+
+    @pytest.fixture
+    def dated(self, temp_dir, monkeypatch):
+        """Ten days of expenses, one per day, indexed in blocks of two lines"""
+        monkeypatch.setattr("src.index.TIME_STRIDE", 2)
+        tracker = ExpenseTracker(file_path="test_expense.txt", directory=temp_dir)
+        tracker.add_expenses(Expense(day * self.DAY, "Food", 100 + day, f"Day {day}") for day in range(10))
+        return tracker
+
+    def test_query_range(self, dated, mocker):
+        """Test that only the blocks that can match are read"""
+        spy = mocker.spy(dated, "_iter_lines")
+        assert [line for line, _ in dated.query_range(4 * self.DAY, 6 * self.DAY)] == [5, 6]
+        assert spy.call_args.args == (5,)
+        assert list(dated.query_range("1970-01-03 00:00:00", "1970-01-03 00:00:01")) == [
+            (3, "1970-01-03 00:00:00\tFood\t$1.02\tDay 2")]
+        assert list(dated.query_range(20 * self.DAY, 30 * self.DAY)) == []
+
+    def test_out_of_order_updates(self, dated):
+        """Test that rows whose timestamp was rewritten are found at their new time only"""
+        dated.update_expense(2, Expense(8 * self.DAY + 1, "Food", 1, "Moved").to_line())
+        assert [line for line, _ in dated.query_range(8 * self.DAY, 9 * self.DAY)] == [2, 9]
+        assert [line for line, _ in dated.query_range(self.DAY, 2 * self.DAY)] == []
+        assert not dated._time_index().in_order
+
+    def test_follows_changes(self, dated):
+        """Test that removals, compaction, free text and other writers keep results right"""
+        dated.remove_expense(1)
+        assert [line for line, _ in dated.query_range(2 * self.DAY, 4 * self.DAY)] == [2, 3]
+        dated.add_expense("A note")
+        dated.update_expense(3, "Tea\nCake")  # Renumbers the rest: the index is rebuilt
+        assert [line for line, _ in dated.query_range(4 * self.DAY, 5 * self.DAY)] == [5]
+        other = ExpenseTracker(file_path="test_expense.txt", directory=dated._file_path.parent)
+        other.add_expense(Expense(4 * self.DAY + 5, "Food", 1, "Late"))
+        assert [line for line, _ in dated.query_range(4 * self.DAY, 5 * self.DAY)] == [5, 12]
+
+    def test_tombstones(self, temp_dir, monkeypatch):
+        """Test queries over tombstoned, moved and compacted lines"""
+        monkeypatch.setattr("src.index.TIME_STRIDE", 2)
+        tracker = ExpenseTracker("dated.txt", temp_dir, tombstones=True, record_width=48)
+        tracker.add_expenses(Expense(day * self.DAY, "Food", 100, f"Day {day}") for day in range(6))
+        tracker.remove_expense(1)
+        tracker.update_expense(1, Expense(5 * self.DAY, "Food", 100, "A much longer description").to_line())
+        assert [line for line, _ in tracker.query_range(5 * self.DAY, 6 * self.DAY)] == [1, 5]
+        tracker.compact()
+        assert [line for line, _ in tracker.query_range(0, 6 * self.DAY)] == [1, 2, 3, 4, 5]
+        assert [line for line, _ in tracker.query_range(5 * self.DAY, 6 * self.DAY)] == [1, 5]
+
+
 class TestAddExpense:
     """Test adding expenses"""
 
@@ -185,6 +441,36 @@ class TestAddExpense:
         assert expenses[0] == special_expense + "\n"
 
 
+class TestAddExpenses:
+    """Test adding expenses in bulk"""
+
+    def test_add_expenses(self, tracker, capsys):
+        """Test adding a batch without printing each expense"""
+        result = tracker.add_expenses(["Coffee", Expense(0, "Food", 1250, "Lunch"), "Dinner"])
+        assert result == 3
+        assert tracker.get_total_lines() == 3
+        assert tracker.find_expense(2) == "1970-01-01 00:00:00\tFood\t$12.50\tLunch"
+        assert capsys.readouterr().out == ""
+
+    def test_add_expenses_in_batches(self, tracker):
+        """Test that batch boundaries don't change what is written"""
+        tracker.add_expenses((f"Item {idx}" for idx in range(10)), batch_size=3, fsync=True)
+        assert tracker.get_expenses() == [f"Item {idx}\n" for idx in range(10)]
+        assert tracker.find_expense(10) == "Item 9"
+
+    def test_add_expenses_empty(self, tracker_with_files):
+        """Test adding nothing"""
+        assert tracker_with_files.add_expenses([]) == 10
+
+    def test_add_expenses_updates_caches(self, tracker):
+        """Test that totals and the keyword index follow bulk adds"""
+        tracker.totals()
+        tracker.search("food")
+        tracker.add_expenses([Expense(0, "Food", 100, "Tea"), Expense(0, "Food", 200, "Cake")], batch_size=1)
+        assert tracker.totals() == {"Food": Summary(2, 300)}
+        assert [line for line, _ in tracker.search("cake")] == [2]
+
+
 class TestClearExpenses:
     """Test clearing expenses"""
 
@@ -294,6 +580,159 @@ class TestRemoveExpense:
         assert tracker.get_total_lines() == 0
 
 
+class TestTombstones:
+    """Test removing expenses with tombstones and compacting the file"""
+
+    @pytest.fixture
+    def tombstone_tracker(self, temp_dir):
+        tracker = ExpenseTracker(file_path="tombs.txt", directory=temp_dir, tombstones=True, compact_ratio=1)
+        tracker.add_expenses(["Coffee", "Lunch", "Dinner", "Snack"])
+        return tracker
+
+    def test_remove_keeps_line_in_file(self, tombstone_tracker):
+        """Test that removed lines are skipped without rewriting the file"""
+        assert tombstone_tracker.remove_expense(2)
+        assert tombstone_tracker.get_total_lines() == 3
+        assert tombstone_tracker.get_expenses() == ["Coffee\n", "Dinner\n", "Snack\n"]
+        assert "Lunch" in tombstone_tracker._file_path.read_text()
+
+    def test_numbering_matches_listing(self, tombstone_tracker):
+        """Test that line numbers keep following what is listed"""
+        tombstone_tracker.remove_expense(1)
+        tombstone_tracker.remove_expense(2)
+        assert tombstone_tracker.find_expense(1) == "Lunch"
+        assert tombstone_tracker.find_expense(2) == "Snack"
+        assert list(tombstone_tracker.iter_expenses(start=2)) == ["Snack\n"]
+        tombstone_tracker.update_expense(2, "Cake")
+        assert tombstone_tracker.get_expenses() == ["Lunch\n", "Cake\n"]
+        assert not tombstone_tracker.remove_expense(3)
+
+    def test_search_maps_to_logical_lines(self, tombstone_tracker):
+        """Test that search results use the numbering shown to users"""
+        tombstone_tracker.search("snack")
+        tombstone_tracker.remove_expense(1)
+        assert list(tombstone_tracker.search("snack")) == [(3, "Snack")]
+        assert list(tombstone_tracker.search("snack", substring=True)) == [(3, "Snack\n")]
+
+    def test_compact(self, tombstone_tracker):
+        """Test that compaction drops removed lines from the file"""
+        tombstone_tracker.remove_expense(3)
+        tombstone_tracker.remove_expense(1)
+        assert tombstone_tracker.compact() == 2
+        assert tombstone_tracker._file_path.read_text() == "Lunch\nSnack\n"
+        assert tombstone_tracker.compact() == 0
+        assert tombstone_tracker.find_expense(2) == "Snack"
+        assert list(tombstone_tracker.search("snack")) == [(2, "Snack")]
+
+    def test_automatic_compaction(self, temp_dir):
+        """Test that reaching the dead-line ratio compacts the file"""
+        tracker = ExpenseTracker(file_path="auto.txt", directory=temp_dir, tombstones=True, compact_ratio=0.5)
+        tracker.add_expenses(["A", "B", "C", "D"])
+        tracker.remove_expense(1)
+        tracker.remove_expense(1)
+        assert tracker._file_path.read_text() == "A\nB\nC\nD\n"
+        tracker.remove_expense(1)
+        assert tracker._file_path.read_text() == "D\n"
+
+    def test_reopen_honours_tombstones(self, tombstone_tracker, temp_dir):
+        """Test that removed lines stay hidden for a tracker opened without tombstone mode"""
+        tombstone_tracker.remove_expense(1)
+        reopened = ExpenseTracker(file_path="tombs.txt", directory=temp_dir)
+        assert reopened.get_total_lines() == 3
+        reopened.remove_expense(1)
+        assert reopened.get_expenses() == ["Dinner\n", "Snack\n"]
+
+    def test_external_rewrite_drops_tombstones(self, temp_dir):
+        """Test that dead line numbers don't hide lines of a ledger rewritten outside the tracker"""
+        tracker = ExpenseTracker(file_path="rewritten.txt", directory=temp_dir, tombstones=True, compact_ratio=1)
+        tracker.add_expenses(["A", "B", "C", "D", "E"])
+        tracker.remove_expense(2)
+        tracker.close()
+        tracker._file_path.write_text("one\ntwo\nthree\n")
+        reopened = ExpenseTracker(file_path="rewritten.txt", directory=temp_dir)
+        assert reopened.get_expenses() == ["one\n", "two\n", "three\n"]
+        assert reopened.get_total_lines() == 3
+
+    def test_totals_follow_tombstones(self, temp_dir):
+        """Test that cached totals follow tombstoned removals and compaction"""
+        tracker = ExpenseTracker(file_path="sums.txt", directory=temp_dir, tombstones=True, compact_ratio=1)
+        tracker.add_expenses([Expense(0, "Food", 100, "Tea"), Expense(0, "Food", 200, "Cake")])
+        tracker.remove_expense(1)
+        assert tracker.totals() == {"Food": Summary(1, 200)}
+        tracker.compact()
+        assert tracker.totals() == {"Food": Summary(1, 200)}
+        assert tracker.summary() == {"Food": Summary(1, 200, 200, 200)}
+
+    def test_multiline_update_keeps_tombstones(self, tombstone_tracker):
+        """Test that an update spanning lines renumbers later tombstones"""
+        tombstone_tracker.remove_expense(4)
+        tombstone_tracker.update_expense(1, "Tea\nCake")
+        assert tombstone_tracker.get_expenses() == ["Tea\n", "Cake\n", "Lunch\n", "Dinner\n"]
+
+
+class TestFixedWidthRecords:
+    """Test in-place updates of fixed-width records"""
+
+    @pytest.fixture
+    def fixed_tracker(self, temp_dir):
+        tracker = ExpenseTracker(file_path="fixed.txt", directory=temp_dir, record_width=16, compact_ratio=1)
+        tracker.add_expenses(["Coffee", "Lunch", "Dinner"])
+        return tracker
+
+    def test_records_are_padded(self, fixed_tracker):
+        """Test that every line takes the record width but reads back without padding"""
+        assert fixed_tracker._file_path.stat().st_size == 3 * 16
+        assert fixed_tracker.get_expenses() == ["Coffee\n", "Lunch\n", "Dinner\n"]
+        assert fixed_tracker.find_expense(2) == "Lunch"
+
+    def test_update_in_place(self, fixed_tracker):
+        """Test that an update that fits overwrites its record without moving the rest"""
+        fixed_tracker.update_expense(2, "Big lunch")
+        assert fixed_tracker._file_path.stat().st_size == 3 * 16
+        assert fixed_tracker.get_expenses() == ["Coffee\n", "Big lunch\n", "Dinner\n"]
+        assert list(fixed_tracker.search("big")) == [(2, "Big lunch")]
+
+    def test_update_relocates_when_too_long(self, fixed_tracker, temp_dir):
+        """Test that a longer value is appended while the line keeps its number"""
+        fixed_tracker.update_expense(1, "A very long coffee order")
+        assert fixed_tracker.get_total_lines() == 3
+        assert fixed_tracker.find_expense(1) == "A very long coffee order"
+        assert fixed_tracker.get_expenses() == ["A very long coffee order\n", "Lunch\n", "Dinner\n"]
+        assert list(fixed_tracker.search("order")) == [(1, "A very long coffee order")]
+        reopened = ExpenseTracker(file_path="fixed.txt", directory=temp_dir, record_width=16)
+        assert reopened.find_expense(1) == "A very long coffee order"
+
+    def test_multiline_update_of_moved_line(self, temp_dir):
+        """Test that several lines replacing a moved line take its place, padded to the record width"""
+        tracker = ExpenseTracker(file_path="moved.txt", directory=temp_dir, record_width=16)
+        tracker.add_expenses(["A", "B", "C"])
+        tracker.update_expense(1, "A much longer value")
+        tracker.update_expense(1, "X\nY")
+        assert tracker.get_expenses() == ["X\n", "Y\n", "B\n", "C\n"]
+        assert tracker._file_path.read_bytes().startswith(b"".join(
+            line.ljust(15) + b"\n" for line in (b"X", b"Y", b"B", b"C")))
+        reopened = ExpenseTracker(file_path="moved.txt", directory=temp_dir, record_width=16)
+        assert reopened.get_expenses() == ["X\n", "Y\n", "B\n", "C\n"]
+
+    def test_compact_resolves_moves(self, fixed_tracker):
+        """Test that compaction writes moved lines back in their place"""
+        fixed_tracker.update_expense(2, "A very long lunch break")
+        fixed_tracker.remove_expense(3)
+        assert fixed_tracker.compact() == 2
+        assert fixed_tracker.get_expenses() == ["Coffee\n", "A very long lunch break\n"]
+        assert fixed_tracker._file_path.read_bytes().startswith(b"Coffee" + b" " * 9 + b"\n")
+
+    def test_totals_follow_updates(self, temp_dir):
+        """Test that cached totals follow in-place and relocated updates"""
+        tracker = ExpenseTracker(file_path="sums.txt", directory=temp_dir, record_width=64)
+        tracker.add_expenses([Expense(0, "Food", 100, "Tea")])
+        tracker.update_expense(1, Expense(0, "Food", 250, "Cake").to_line())
+        assert tracker.totals() == {"Food": Summary(1, 250)}
+        tracker.update_expense(1, Expense(0, "Food", 300, "Cake" * 20).to_line())
+        assert tracker.totals() == {"Food": Summary(1, 300)}
+        assert tracker.summary() == {"Food": Summary(1, 300, 300, 300)}
+
+
 class TestGetTotalLines:
     """Test getting total lines"""
 
@@ -0,0 +1,251 @@
+import pytest
+from pathlib import Path
+import tempfile
+import shutil
+from src.index import (LineIndex, TimeIndex, Tombstones, INDEX_SUFFIX, TIME_INDEX_SUFFIX, TOMBSTONE_SUFFIX,
+                       count_lines, ledger_state, line_timestamp)
+
+
+@pytest.fixture
+def ledger():
+    """Create a ledger file inside a temporary directory"""
+    temp_directory = tempfile.mkdtemp()
+    path = Path(temp_directory) / "ledger.txt"
+    path.write_bytes(b"first\nsecond\nthird\n")
+    yield path
+    shutil.rmtree(temp_directory)
+
+
+def read_line(path: Path, index: LineIndex, line: int) -> bytes:
+    start, end = index.span(line)
+    with path.open("rb") as f:
+        f.seek(start)
+        return f.read(end - start)
+
+
+class TestLineIndexBuild:
+    """Test building and loading the index"""
+
+    def test_build_creates_sidecar(self, ledger):
+        """Test that the offsets of every line are written next to the ledger"""
+        index = LineIndex(ledger)
+        assert len(index) == 3
+        assert read_line(ledger, index, 1) == b"second\n"
+        assert index.path == ledger.with_name(ledger.name + INDEX_SUFFIX)
+        assert index.path.exists()
+
+    def test_load_reuses_sidecar(self, ledger, monkeypatch):
+        """Test that a matching sidecar is loaded instead of rescanning"""
+        LineIndex(ledger).rebuild()
+
+        def no_scan(*args, **kwargs):
+            raise AssertionError("ledger was rescanned")
+
+        monkeypatch.setattr("src.index.count_lines", no_scan)
+        monkeypatch.setattr(LineIndex, "rebuild", no_scan)
+        index = LineIndex(ledger)
+        assert len(index) == 3
+        assert index.span(2) == (13, 19)
+
+    def test_rebuild_on_external_change(self, ledger):
+        """Test that a sidecar is discarded when the ledger changed on disk"""
+        LineIndex(ledger).rebuild()
+        ledger.write_bytes(b"only\n")
+        index = LineIndex(ledger)
+        assert len(index) == 1
+        assert read_line(ledger, index, 0) == b"only\n"
+
+    def test_unterminated_last_line(self, ledger):
+        """Test a ledger whose last line has no newline"""
+        ledger.write_bytes(b"a\nb")
+        index = LineIndex(ledger)
+        assert len(index) == 2
+        assert not index.terminated
+        assert index.span(1) == (2, 3)
+
+    def test_chunk_boundaries(self, ledger, monkeypatch):
+        """Test that lines spanning several read chunks are indexed once"""
+        monkeypatch.setattr("src.index.CHUNK_SIZE", 4)
+        index = LineIndex(ledger)
+        assert len(index) == 3
+        assert read_line(ledger, index, 2) == b"third\n"
+
+
+class TestCountLines:
+    """Test the chunked newline count"""
+
+    def test_count_lines(self, ledger):
+        """Test counting a newline-terminated file across chunks"""
+        assert count_lines(ledger, chunk_size=4) == (3, 19, True)
+
+    def test_count_lines_unterminated(self, ledger):
+        """Test that a last line without newline is counted like readlines()"""
+        ledger.write_bytes(b"a\nb")
+        assert count_lines(ledger) == (2, 3, False)
+
+    def test_count_lines_empty(self, ledger):
+        """Test counting an empty file"""
+        ledger.write_bytes(b"")
+        assert count_lines(ledger) == (0, 0, True)
+
+
+class TestLineIndexUpdates:
+    """Test keeping the index in step with writes"""
+
+    def test_append(self, ledger):
+        """Test that appended lines are added and persisted"""
+        index = LineIndex(ledger)
+        index.rebuild()
+        with ledger.open("ab") as f:
+            f.write(b"fourth\nfifth\n")
+        index.append(b"fourth\nfifth\n")
+        assert len(index) == 5
+        assert read_line(ledger, index, 4) == b"fifth\n"
+        assert len(LineIndex(ledger)) == 5
+
+    def test_replace_and_remove(self, ledger):
+        """Test that offsets after a replaced or removed line are shifted"""
+        index = LineIndex(ledger)
+        ledger.write_bytes(b"first\n2\nthird\n")
+        index.replace(1, b"2\n")
+        assert read_line(ledger, index, 2) == b"third\n"
+        ledger.write_bytes(b"2\nthird\n")
+        index.replace(0, b"")
+        assert len(index) == 2
+        assert index.size == 8
+        assert read_line(ledger, index, 1) == b"third\n"
+        assert len(LineIndex(ledger)) == 2
+
+
+class TestTombstones:
+    """Test mapping between logical and physical line numbers"""
+
+    def test_physical_and_logical(self, ledger):
+        """Test that live lines are numbered consecutively around dead ones"""
+        tombstones = Tombstones(ledger)
+        for line in (2, 3, 7):
+            tombstones.add(line)
+        live = [line for line in range(1, 12) if line not in (2, 3, 7)]
+        assert [tombstones.physical(k) for k in range(1, len(live) + 1)] == live
+        assert [tombstones.logical(line) for line in live] == list(range(1, len(live) + 1))
+        assert 3 in tombstones and 4 not in tombstones
+
+    def test_persisted(self, ledger):
+        """Test that tombstones are logged next to the ledger and reloaded"""
+        tombstones = Tombstones(ledger)
+        tombstones.add(3)
+        tombstones.add(1)
+        assert tombstones.path == ledger.with_name(ledger.name + TOMBSTONE_SUFFIX)
+        assert list(Tombstones(ledger).dead) == [1, 3]
+
+    def test_shift_truncate_reset(self, ledger):
+        """Test renumbering, dropping out-of-range lines and clearing"""
+        tombstones = Tombstones(ledger)
+        for line in (1, 4, 6):
+            tombstones.add(line)
+        tombstones.shift(2, 1)
+        assert list(Tombstones(ledger).dead) == [1, 5, 7]
+        tombstones.truncate(5)
+        assert list(Tombstones(ledger).dead) == [1, 5]
+        tombstones.reset()
+        assert len(Tombstones(ledger)) == 0
+        assert not tombstones.path.exists()
+
+    def test_move(self, ledger):
+        """Test that a moved slot stays live, its copy is hidden and both survive reloading"""
+        tombstones = Tombstones(ledger)
+        tombstones.add(1)
+        tombstones.move(2, 5)
+        assert list(tombstones.dead) == [1, 5]
+        assert tombstones.target(2) == 5 and tombstones.target(3) == 3
+        reloaded = Tombstones(ledger)
+        assert list(reloaded.dead) == [1, 5]
+        assert reloaded.moved == {2: 5}
+        reloaded.shift(1, 1)
+        assert Tombstones(ledger).moved == {3: 6}
+
+    def test_ledger_state_includes_tombstones(self, ledger):
+        """Test that tombstoning a line changes the ledger state seen by caches"""
+        before = ledger_state(ledger)
+        Tombstones(ledger).add(1)
+        assert ledger_state(ledger) != before
+
+
+class TestTimeIndex:
+    """Test the sparse index of timestamps per block of lines"""
+
+    @staticmethod
+    def line(timestamp: str) -> str:
+        return f"{timestamp}\tFood\t$1.00\t"
+
+    def test_lines(self, ledger):
+        """Test that a range maps to the blocks of lines that can hold it"""
+        times = TimeIndex(ledger, stride=2)
+        for line_number, day in enumerate(["01", "01", "02", "03", "03", "04"], 1):
+            times.add(line_number, self.line(f"2024-01-{day} 00:00:00"))
+        day = 86400
+        start = line_timestamp(self.line("2024-01-02 00:00:00"))
+        assert times.lines(start, start + day) == (3, 4)
+        assert times.lines(start, start + 2 * day) == (3, 6)
+        assert times.lines(start - day, start - day + 1) == (1, 2)
+        first, last = times.lines(start + 10 * day, start + 11 * day)
+        assert first > last
+        assert times.in_order
+
+    def test_out_of_order(self, ledger):
+        """Test that a line rewritten with a later timestamp widens its block"""
+        times = TimeIndex(ledger, stride=2)
+        for line_number, day in enumerate(["01", "02", "03", "04"], 1):
+            times.add(line_number, self.line(f"2024-01-{day} 00:00:00"))
+        times.add(1, self.line("2024-01-05 00:00:00"))
+        assert not times.in_order
+        start = line_timestamp(self.line("2024-01-05 00:00:00"))
+        assert times.lines(start, start + 1) == (1, 4)
+
+    def test_remove(self, ledger):
+        """Test that removing a line merges the bounds of the blocks after it"""
+        times = TimeIndex(ledger, stride=2)
+        for line_number, day in enumerate(["01", "02", "03", "04"], 1):
+            times.add(line_number, self.line(f"2024-01-{day} 00:00:00"))
+        times.remove(2)  # Line 3 becomes line 2, in the first block
+        start = line_timestamp(self.line("2024-01-03 00:00:00"))
+        assert times.lines(start, start + 1)[0] == 1
+
+    def test_persisted(self, ledger):
+        """Test that the sidecar is reused until the ledger changes"""
+        times = TimeIndex(ledger, stride=2)
+        times.rebuild(enumerate(["free text", self.line("2024-01-01 00:00:00")], 1))
+        assert times.path == ledger.with_name(ledger.name + TIME_INDEX_SUFFIX)
+        reloaded = TimeIndex(ledger, stride=2)
+        assert reloaded.load() and len(reloaded) == 1
+        assert not TimeIndex(ledger, stride=4).load()
+        with ledger.open("a") as f:
+            f.write("fourth\n")
+        assert not times.is_current()
+        assert not TimeIndex(ledger, stride=2).load()
+
+    def test_save_writes_changed_blocks(self, ledger):
+        """Test that a save after adding lines leaves the blocks before them untouched on disk"""
+        times = TimeIndex(ledger, stride=2)
+        times.rebuild(enumerate([self.line(f"2024-01-0{day} 00:00:00") for day in range(1, 6)], 1))
+        header = 8 + 6 * 8
+        with times.path.open("r+b") as f:
+            f.seek(header)
+            f.write((0).to_bytes(8, "little", signed=True))  # Marks the first block's minimum
+        times.add(6, self.line("2024-01-06 00:00:00"))
+        times.add(9, self.line("2024-01-09 00:00:00"))
+        times.save()
+        with times.path.open("rb") as f:
+            f.seek(header)
+            assert f.read(8) == (0).to_bytes(8, "little", signed=True)
+        reloaded = TimeIndex(ledger, stride=2)
+        assert reloaded.load() and len(reloaded) == 5
+        start = line_timestamp(self.line("2024-01-09 00:00:00"))
+        assert reloaded.lines(start, start + 1) == (9, 10)
+        first, last = reloaded.lines(start - 86400, start)  # The block of lines 7 and 8 is empty
+        assert first > last
+
+    def test_line_timestamp(self):
+        assert line_timestamp(self.line("1970-01-02 00:00:00")) == 86400
+        assert line_timestamp("1970-01-02 00:00:00") is None
+        assert line_timestamp("Coffee $5") is None
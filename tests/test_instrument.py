@@ -0,0 +1,95 @@
+import os
+import pstats
+import subprocess
+import sys
+from pathlib import Path
+
+from src.expense import ExpenseTracker
+from src.instrument import LATENCY_BOUNDS, OperationStats, PROFILE_ENV, STATS_ENV, TRACEMALLOC_ENV, format_stats
+from src.record import Expense
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+class TestOperationStats:
+    """Test the latency histogram of one method"""
+
+    def test_percentiles(self):
+        """Test that percentiles come from the histogram, capped by the slowest call"""
+        operation = OperationStats()
+        for seconds in [0.000005] * 98 + [0.003, 20.0]:
+            operation.record(seconds)
+        assert operation.percentile(0.5) == LATENCY_BOUNDS[0]
+        assert operation.percentile(0.99) == 0.005
+        assert operation.percentile(1.0) == 20.0
+        stats = operation.to_dict()
+        assert stats["calls"] == 100 and stats["max"] == 20.0
+        assert stats["histogram"] == {"<=10µs": 98, "<=5.0ms": 1, ">10.00s": 1}
+
+
+class TestTrackerStats:
+    """Test the instrumentation of ExpenseTracker"""
+
+    def test_disabled_by_default(self, tmp_path, monkeypatch):
+        """Test that an uninstrumented tracker has no wrapped methods and no stats"""
+        for name in (STATS_ENV, PROFILE_ENV, TRACEMALLOC_ENV):
+            monkeypatch.delenv(name, raising=False)
+        tracker = ExpenseTracker("ledger.txt", tmp_path)
+        tracker.add_expenses(["Coffee"])
+        assert tracker.stats() == {}
+        assert "add_expenses" not in vars(tracker)
+
+    def test_counts(self, tmp_path):
+        """Test calls, rows and bytes of reads, writes and searches"""
+        tracker = ExpenseTracker("ledger.txt", tmp_path, instrument=True)
+        tracker.add_expense(Expense(0, "Food", 250, "Coffee"))
+        tracker.add_expenses(["Lunch", "Dinner"])
+        assert tracker.get_expenses()[0].startswith("1970")
+        assert tracker.find_expense(2) == "Lunch"
+        tracker.update_expense(2, "Brunch")
+        tracker.remove_expense(3)
+        assert list(tracker.search("brunch")) == [(2, "Brunch")]
+        stats = tracker.stats()
+        # add_expense goes through add_expenses, but only the outer call is recorded
+        assert stats["add_expense"]["calls"] == 1 and stats["add_expense"]["rows"] == 1
+        assert stats["add_expenses"]["calls"] == 1
+        assert stats["add_expenses"]["rows"] == 2 and stats["add_expenses"]["bytes_written"] == len("Lunch\nDinner\n")
+        assert stats["get_expenses"]["rows"] == 3 and stats["get_expenses"]["bytes_read"] > 0
+        assert "iter_expenses" not in stats
+        assert stats["find_expense"]["rows"] == 1 and stats["find_expense"]["bytes_read"] == len("Lunch\n")
+        assert stats["update_expense"]["bytes_written"] == len("Brunch\nDinner\n")
+        assert stats["remove_expense"]["rows"] == 1
+        assert stats["search"]["calls"] == 1 and stats["search"]["rows"] == 1
+        assert all(stats[name]["p99"] >= stats[name]["p50"] > 0 for name in stats)
+        assert len(format_stats(stats)) == len(stats)
+
+    def test_abandoned_generator(self, tmp_path):
+        """Test that a generator is recorded when closed before it's exhausted"""
+        tracker = ExpenseTracker("ledger.txt", tmp_path, instrument=True)
+        tracker.add_expenses([f"Row {row}" for row in range(10)])
+        rows = tracker.iter_expenses()
+        next(rows)
+        assert "iter_expenses" not in tracker.stats()
+        rows.close()
+        assert tracker.stats()["iter_expenses"]["rows"] == 1
+
+    def test_enabled_from_env(self, tmp_path, monkeypatch):
+        monkeypatch.setenv(STATS_ENV, "1")
+        tracker = ExpenseTracker("ledger.txt", tmp_path)
+        tracker.add_expenses(["Tea"])
+        assert tracker.stats()["add_expenses"]["calls"] == 1
+        assert ExpenseTracker("ledger.txt", tmp_path, instrument=False).stats() == {}
+
+    def test_profile_and_tracemalloc_capture(self, tmp_path):
+        """Test that the environment variables make a process write both captures at exit"""
+        profile, allocations = tmp_path / "tracker.prof", tmp_path / "tracker.mem"
+        script = ("from src.expense import ExpenseTracker\n"
+                  f"tracker = ExpenseTracker('ledger.txt', {str(tmp_path)!r})\n"
+                  "tracker.add_expenses(['Coffee'] * 100)\n"
+                  "tracker.get_expenses()\n")
+        environment = dict(os.environ, **{PROFILE_ENV: str(profile), TRACEMALLOC_ENV: str(allocations)})
+        subprocess.run([sys.executable, "-c", script], cwd=ROOT, env=environment, check=True,
+                       stdout=subprocess.DEVNULL)
+        functions = {function for _, _, function in pstats.Stats(str(profile)).stats}
+        assert "_append" in functions and "_iter_lines" in functions
+        assert allocations.read_text().startswith("current ")
@@ -0,0 +1,82 @@
+import pytest
+
+from src.expense import ExpenseTracker
+from src.ledgers import LedgerSet, discover, main
+from src.record import Expense
+from src.segments import SegmentedBackend
+from src.summary import merge_summaries
+
+
+def expenses(prefix: str, rows: int) -> list:
+    return [Expense(86400 * row, f"Cat {row % 3}", 100 * row + 1, f"{prefix} item {row}") for row in range(rows)]
+
+
+@pytest.fixture
+def directory(tmp_path):
+    """Four ledgers, one in a subdirectory, one with tombstones and one in SQLite"""
+    ExpenseTracker("alice.txt", tmp_path).add_expenses(expenses("alice", 40))
+    ExpenseTracker("bob.txt", tmp_path / "team").add_expenses(expenses("bob", 25))
+    carol = ExpenseTracker("carol.txt", tmp_path, tombstones=True, compact_ratio=1)
+    carol.add_expenses(expenses("carol", 10))
+    carol.remove_expense(1)
+    ExpenseTracker("dave.db", tmp_path / "team").add_expenses(expenses("dave", 5))
+    return tmp_path
+
+
+def trackers(directory) -> list:
+    return [ExpenseTracker(path.name, path.parent) for path in discover(directory)]
+
+
+class TestLedgerSet:
+    """Test querying every ledger under a directory"""
+
+    def test_discover(self, directory):
+        """Test that ledgers are found recursively and sidecars are ignored"""
+        assert [path.name for path in discover(directory)] == ["alice.txt", "carol.txt", "bob.txt", "dave.db"]
+        assert len(LedgerSet(directory)) == 4
+
+    @pytest.mark.parametrize("workers", [1, 2])
+    def test_summary_matches_trackers(self, directory, workers):
+        """Test that split and merged summaries equal those of each ledger combined"""
+        expected = {}
+        for tracker in trackers(directory):
+            merge_summaries(expected, tracker.summary("month"))
+        ledgers = LedgerSet(directory, workers=workers, chunk_bytes=200)
+        assert ledgers.summary("month") == expected
+        assert sum(summary.count for summary in ledgers.summary().values()) == 40 + 25 + 9 + 5
+
+    @pytest.mark.parametrize("workers", [1, 2])
+    def test_search_numbers_lines(self, directory, workers):
+        """Test that matches found in byte ranges carry their line number in the ledger"""
+        ledgers = LedgerSet(directory, workers=workers, chunk_bytes=200)
+        results = ledgers.search("item 7")
+        expected = [(tracker._file_path, number, line)
+                    for tracker in trackers(directory) for number, line in tracker.search("item 7")]
+        assert sorted(results) == sorted(expected)
+        found = ledgers.search("BOB ITEM 2", substring=True)
+        assert [(path.name, number) for path, number, _ in found] == [("bob.txt", 3)] + \
+            [("bob.txt", number) for number in range(21, 26)]
+
+    def test_segmented_ledger(self, directory):
+        """Test that a segmented ledger counts once, with its sealed segments, and its files aren't ledgers"""
+        segmented = ExpenseTracker(backend=SegmentedBackend(directory / "erin.seg", segment_rows=4))
+        segmented.add_expenses(expenses("erin", 10))
+        segmented.close()
+        assert [path.name for path in discover(directory)] == \
+            ["alice.txt", "carol.txt", "erin.seg", "bob.txt", "dave.db"]
+        ledgers = LedgerSet(directory, workers=1)
+        assert sum(summary.count for summary in ledgers.summary().values()) == 40 + 25 + 9 + 5 + 10
+        assert [(path.name, number) for path, number, _ in ledgers.search("erin item 9")] == [("erin.seg", 10)]
+
+    def test_unknown_grouping(self, directory):
+        with pytest.raises(ValueError):
+            LedgerSet(directory).summary("year")
+
+    def test_cli(self, directory, capsys):
+        """Test the summary and search commands"""
+        main(["--directory", str(directory), "--workers", "1", "summary"])
+        assert "Cat 0: total" in capsys.readouterr().out
+        main(["--directory", str(directory), "search", "carol item 9"])
+        assert capsys.readouterr().out == f"carol.txt:9: {expenses('carol', 10)[9].to_line()}\n"
+        main(["--directory", str(directory), "search", "nothing"])
+        assert capsys.readouterr().out == "No matching expenses found.\n"
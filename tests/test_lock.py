@@ -0,0 +1,112 @@
+import multiprocessing
+
+import pytest
+
+from src.expense import ExpenseTracker
+from src.lock import LedgerLock, WriteAheadLog, fcntl
+
+WRITERS = 4
+ROWS_PER_WRITER = 100
+
+
+def write_rows(directory: str, writer: int, wal: bool):
+    tracker = ExpenseTracker(file_path="shared.txt", directory=directory, wal=wal)
+    for row in range(ROWS_PER_WRITER):
+        tracker.add_expenses([f"writer {writer} row {row}"])
+    tracker.close()
+
+
+def rewrite_first_line(directory: str):
+    tracker = ExpenseTracker(file_path="shared.txt", directory=directory)
+    for attempt in range(ROWS_PER_WRITER // 2):
+        tracker.update_expense(1, "seed " + "x" * (attempt % 7))
+    tracker.close()
+
+
+class TestLedgerLock:
+    """Test the reentrant ledger lock"""
+
+    def test_nested_holds(self, tmp_path):
+        """Test that only the outermost hold acquires the lock"""
+        lock = LedgerLock(tmp_path / "ledger.txt")
+        with lock.exclusive() as acquired:
+            assert acquired and lock.held
+            with lock.shared() as nested:
+                assert not nested
+        assert not lock.held
+        assert lock.path == tmp_path / "ledger.txt.lock"
+        lock.close()
+
+    def test_no_upgrade(self, tmp_path):
+        """Test that a shared hold can't become exclusive"""
+        lock = LedgerLock(tmp_path / "ledger.txt")
+        with lock.shared():
+            with pytest.raises(RuntimeError):
+                with lock.exclusive():
+                    pass
+        lock.close()
+
+
+class TestWriteAheadLog:
+    """Test logging appends before they reach the ledger"""
+
+    def test_append_and_drain(self, tmp_path):
+        """Test that logged lines are handed over once, then the log is empty"""
+        wal = WriteAheadLog(tmp_path / "ledger.txt")
+        assert not wal
+        wal.append("a\nb")
+        wal.append("c")
+        assert wal
+        drained = []
+        wal.drain(drained.append)
+        assert drained == ["a\nb\nc"]
+        assert not wal
+        wal.drain(drained.append)
+        assert drained == ["a\nb\nc"]
+
+    def test_tracker_replays_log(self, tmp_path):
+        """Test that the ledger only receives logged lines at the next locked call"""
+        tracker = ExpenseTracker(file_path="ledger.txt", directory=tmp_path, wal=True)
+        tracker.add_expenses(["Coffee", "Lunch"])
+        assert tracker._file_path.read_text() == ""
+        assert tracker.find_expense(2) == "Lunch"
+        assert tracker._file_path.read_text() == "Coffee\nLunch\n"
+        assert list(tracker.search("coffee")) == [(1, "Coffee")]
+
+
+class TestSharedLedger:
+    """Test several trackers and processes using the same ledger"""
+
+    def test_count_follows_other_tracker(self, tmp_path):
+        """Test that a tracker picks up lines added through another one"""
+        first = ExpenseTracker(file_path="ledger.txt", directory=tmp_path)
+        second = ExpenseTracker(file_path="ledger.txt", directory=tmp_path)
+        first.add_expenses(["Coffee", "Lunch"])
+        assert second.get_total_lines() == 2
+        second.remove_expense(1)
+        assert first.get_total_lines() == 1
+        assert first.find_expense(1) == "Lunch"
+        assert list(first.search("lunch")) == [(1, "Lunch")]
+
+    @pytest.mark.skipif(fcntl is None, reason="needs fcntl locks")
+    def test_no_lost_writes(self, tmp_path):
+        """Test that concurrent appends and rewrites from several processes all land"""
+        tracker = ExpenseTracker(file_path="shared.txt", directory=tmp_path)
+        tracker.add_expenses(["seed"])
+        context = multiprocessing.get_context("fork")
+        processes = [context.Process(target=write_rows, args=(str(tmp_path), writer, writer % 2 == 1))
+                     for writer in range(WRITERS)]
+        processes.append(context.Process(target=rewrite_first_line, args=(str(tmp_path),)))
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join(60)
+            assert process.exitcode == 0
+        lines = tracker.get_expenses()
+        assert tracker.get_total_lines() == 1 + WRITERS * ROWS_PER_WRITER
+        assert lines[0].startswith("seed")
+        assert sorted(lines[1:]) == sorted(f"writer {writer} row {row}\n"
+                                           for writer in range(WRITERS) for row in range(ROWS_PER_WRITER))
+        for writer in range(WRITERS):
+            rows = [line for line in lines if line.startswith(f"writer {writer} ")]
+            assert rows == [f"writer {writer} row {row}\n" for row in range(ROWS_PER_WRITER)]
@@ -3,6 +3,7 @@ from unittest import mock
 import io
 from src.expense import ExpenseTracker
 from src.menu import display_menu  # Assuming your display_menu is in cli.py
+import glob
 import os
 
 @pytest.fixture
@@ -15,8 +16,11 @@ def clear_expenses(expense_tracker: ExpenseTracker):
     # Clear expenses before each test
     expense_tracker.clear_expenses()
     yield
-    # Clear expenses after each test
+    # Clear expenses after each test, with the sidecar files the tracker keeps next to them
+    expense_tracker.close()
     os.remove(expense_tracker._file_path)
+    for sidecar in glob.glob(glob.escape(str(expense_tracker._file_path)) + ".*"):
+        os.remove(sidecar)
 
 
 def test_add_expense_cli(clear_expenses):
@@ -70,3 +74,141 @@ def test_view_expense_cli(clear_expenses):
             assert "Food\t$20.00\tLunch" in output  # Ensure first product
             assert "Transport\t$15.00\tBus fare" in output  # Ensure second product
 
+
+def test_view_expense_cli_pages(clear_expenses, expense_tracker: ExpenseTracker):
+    """Test that viewing stops after the first page when asked to"""
+    for idx in range(25):
+        expense_tracker.add_expense(f"Expense {idx + 1}")
+    inputs = [
+        "test_expenses.txt",  # Load default file name
+        "2",  # View all expenses
+        "q",  # Stop after the first page
+        "7"  # Exit the menu
+    ]
+
+    with mock.patch("builtins.input", side_effect=inputs):
+        with mock.patch("sys.stdout", new_callable=io.StringIO) as mock_stdout:
+            display_menu()
+            output = mock_stdout.getvalue()
+
+            assert "20. Expense 20" in output  # Last row of the first page
+            assert "Expense 21" not in output  # Second page was skipped
+
+def test_search_expense_cli(clear_expenses, expense_tracker: ExpenseTracker):
+    """Test searching expenses via the CLI menu"""
+    expense_tracker.add_expense("2024-01-01 12:00:00\tFood\t$20.00\tLunch")
+    expense_tracker.add_expense("2024-01-01 13:00:00\tTransport\t$15.00\tBus fare")
+    inputs = [
+        "test_expenses.txt",  # Load default file name
+        "6",  # Search expenses
+        "bus",  # Search term
+        "7"  # Exit the menu
+    ]
+
+    with mock.patch("builtins.input", side_effect=inputs):
+        with mock.patch("sys.stdout", new_callable=io.StringIO) as mock_stdout:
+            display_menu()
+            output = mock_stdout.getvalue()
+
+            assert "Search Results:" in output
+            assert "1. 2024-01-01 13:00:00\tTransport\t$15.00\tBus fare" in output
+            assert "Lunch" not in output
+
+def test_summary_cli(clear_expenses):
+    """Test summarising expenses via the CLI menu"""
+    inputs = [
+        "test_expenses.txt",  # Load default file name
+        "1", "Food", "20.00", "Lunch",  # Add an expense
+        "1", "Food", "10.00", "Dinner",  # Add another expense
+        "8",  # Summarize expenses
+        "",  # Group by category
+        "7"  # Exit the menu
+    ]
+
+    with mock.patch("builtins.input", side_effect=inputs):
+        with mock.patch("sys.stdout", new_callable=io.StringIO) as mock_stdout:
+            display_menu()
+            output = mock_stdout.getvalue()
+
+            assert "Summary by category:" in output
+            assert "Food: total $30.00, count 2, mean $15.00" in output
+
+def test_summary_by_day_cli(clear_expenses, expense_tracker: ExpenseTracker):
+    """Test summarising expenses per day via the CLI menu"""
+    expense_tracker.add_expense("2024-01-01 12:00:00\tFood\t$20.00\tLunch")
+    expense_tracker.add_expense("2024-01-01 18:00:00\tFood\t$10.00\tDinner")
+    inputs = [
+        "test_expenses.txt",  # Load default file name
+        "8",  # Summarize expenses
+        "day",  # Group by day
+        "7"  # Exit the menu
+    ]
+
+    with mock.patch("builtins.input", side_effect=inputs):
+        with mock.patch("sys.stdout", new_callable=io.StringIO) as mock_stdout:
+            display_menu()
+            output = mock_stdout.getvalue()
+
+            assert "2024-01-01: total $30.00, count 2, mean $15.00, min $10.00, max $20.00" in output
+
+def test_search_amount_and_fallback_cli(clear_expenses, expense_tracker: ExpenseTracker):
+    """Test searching by amount and by partial words via the CLI menu"""
+    expense_tracker.add_expense("2024-01-01 12:00:00\tFood\t$20.00\tLunch")
+    expense_tracker.add_expense("2024-01-01 13:00:00\tTransport\t$15.00\tBus fare")
+    inputs = [
+        "test_expenses.txt",  # Load default file name
+        "6", "15",  # Search by amount
+        "6", "lun",  # Search by part of a word
+        "7"  # Exit the menu
+    ]
+
+    with mock.patch("builtins.input", side_effect=inputs):
+        with mock.patch("sys.stdout", new_callable=io.StringIO) as mock_stdout:
+            display_menu()
+            output = mock_stdout.getvalue()
+
+            assert "1. 2024-01-01 13:00:00\tTransport\t$15.00\tBus fare" in output
+            assert "1. 2024-01-01 12:00:00\tFood\t$20.00\tLunch" in output
+
+def test_date_range_cli(clear_expenses, expense_tracker: ExpenseTracker):
+    """Test viewing the expenses of a range of days via the CLI menu"""
+    expense_tracker.add_expense("2024-01-01 12:00:00\tFood\t$20.00\tLunch")
+    expense_tracker.add_expense("2024-01-02 09:00:00\tTransport\t$15.00\tBus fare")
+    expense_tracker.add_expense("2024-01-03 23:59:59\tFood\t$8.00\tSnack")
+    inputs = [
+        "test_expenses.txt",  # Load default file name
+        "9", "2024-01-02", "2024-01-03",  # Two days
+        "9", "2024-01-01", "",  # One day
+        "9", "2024-02-01", "",  # No expenses
+        "7"  # Exit the menu
+    ]
+
+    with mock.patch("builtins.input", side_effect=inputs):
+        with mock.patch("sys.stdout", new_callable=io.StringIO) as mock_stdout:
+            display_menu()
+            output = mock_stdout.getvalue()
+
+            assert "Expenses from 2024-01-02 to 2024-01-03:\n1. 2024-01-02 09:00:00\tTransport\t$15.00\tBus fare\n" \
+                   "2. 2024-01-03 23:59:59\tFood\t$8.00\tSnack" in output
+            assert "Expenses from 2024-01-01 to 2024-01-01:\n1. 2024-01-01 12:00:00\tFood\t$20.00\tLunch\n" in output
+            assert "No expenses found in that range." in output
+
+def test_stats_cli(clear_expenses, expense_tracker: ExpenseTracker):
+    """Test showing the performance statistics of the session via the CLI menu"""
+    inputs = [
+        "test_expenses.txt",  # Load default file name
+        "10",  # Nothing recorded yet
+        "1", "Food", "20.00", "Lunch",  # Add an expense
+        "2",  # View all expenses
+        "10",  # Show statistics
+        "7"  # Exit the menu
+    ]
+
+    with mock.patch("builtins.input", side_effect=inputs):
+        with mock.patch("sys.stdout", new_callable=io.StringIO) as mock_stdout:
+            display_menu()
+            output = mock_stdout.getvalue()
+
+            assert "No operations recorded yet." in output
+            assert "add_expense: 1 calls" in output
+            assert "iter_expenses: 1 calls" in output
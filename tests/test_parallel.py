@@ -0,0 +1,61 @@
+import pytest
+
+from src.expense import ExpenseTracker
+from src.parallel import parse_ledger, split_ranges
+from src.record import Expense, ExpenseTable
+
+
+@pytest.fixture
+def ledger(tmp_path):
+    """A ledger mixing expenses of several categories with free text and an unterminated last line"""
+    lines = []
+    for row in range(60):
+        if row % 7 == 3:
+            lines.append(f"note {row}")
+        else:
+            lines.append(Expense(3600 * row, f"Cat {row % 4 if row < 30 else row % 5}", row * 10, f"Row {row}").to_line())
+    path = tmp_path / "ledger.txt"
+    path.write_text("\n".join(lines))
+    return path
+
+
+class TestSplitRanges:
+    """Test cutting a file into line-aligned byte ranges"""
+
+    def test_ranges_cover_the_file(self, ledger):
+        """Test that ranges are contiguous and start at line starts"""
+        data = ledger.read_bytes()
+        ranges = split_ranges(ledger, 7)
+        assert ranges[0][0] == 0 and ranges[-1][1] == len(data)
+        for (_, end), (start, _) in zip(ranges, ranges[1:]):
+            assert end == start and data[start - 1:start] == b"\n"
+
+    def test_more_parts_than_lines(self, tmp_path):
+        path = tmp_path / "short.txt"
+        path.write_text("a\nb\n")
+        assert split_ranges(path, 10) == [(0, 2), (2, 4)]
+
+
+class TestParseLedger:
+    """Test parsing a ledger in worker processes"""
+
+    @pytest.mark.parametrize("workers", [1, 3])
+    def test_matches_sequential_parse(self, ledger, workers):
+        """Test that rows, categories and line numbers equal a single-process parse"""
+        expected = ExpenseTable.from_lines(ledger.read_text().splitlines())
+        table = parse_ledger(ledger, workers=workers, range_bytes=256)
+        assert list(table) == list(expected)
+        assert list(table.line_numbers) == list(expected.line_numbers)
+        assert table.categories == expected.categories
+
+    def test_empty(self, tmp_path):
+        path = tmp_path / "empty.txt"
+        path.write_text("")
+        assert len(parse_ledger(path, workers=2)) == 0
+
+    def test_tracker_load_table(self, ledger):
+        """Test that line numbers follow find_expense"""
+        tracker = ExpenseTracker(ledger.name, ledger.parent)
+        table = tracker.load_table(workers=2)
+        assert Expense.parse(tracker.find_expense(table.line_numbers[10])) == table[10]
+        assert list(table) == list(tracker.load_table())
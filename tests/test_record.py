@@ -0,0 +1,120 @@
+import pytest
+import src.record
+from src.record import (Expense, ExpenseTable, parse_timestamp, format_timestamp,
+                        parse_amount, parse_amounts, format_amount, divide_amount)
+
+LINES = [
+    "2024-01-01 12:00:00\tFood\t$20.00\tLunch\n",
+    "not an expense\n",
+    "2024-01-02 08:30:00\tTransport\t$-1.50\tRefund\n",
+    "2024-01-03 19:45:10\tFood\t$7.05\tCafé\n",
+]
+
+
+class TestParsing:
+    """Test parsing and formatting of ledger fields"""
+
+    def test_timestamp_round_trip(self):
+        """Test that timestamps survive a parse/format round trip"""
+        assert parse_timestamp("1970-01-02 00:00:01") == 86401
+        assert format_timestamp(parse_timestamp("2024-02-29 23:59:59")) == "2024-02-29 23:59:59"
+
+    def test_invalid_timestamp(self):
+        """Test that malformed timestamps are rejected"""
+        with pytest.raises(ValueError):
+            parse_timestamp("2024-01-01")
+        with pytest.raises(ValueError):
+            parse_timestamp("2024-13-01 00:00:00")
+
+    @pytest.mark.parametrize("text, cents", [
+        ("$20.00", 2000), ("20", 2000), ("25.5", 2550), (".75", 75),
+        ("$-1.50", -150), ("-0.5", -50), ("1.005", 101), (" 3.20 ", 320), ("$.50", 50), ("$1.999", 200),
+    ])
+    def test_parse_amount(self, text, cents):
+        """Test parsing amounts into integer cents"""
+        assert parse_amount(text) == cents
+
+    @pytest.mark.parametrize("text", ["", "$", "abc", "1.2.3", "1e3", "$1,000", "\uff11\uff12"])
+    def test_parse_invalid_amount(self, text):
+        """Test that anything but a plain decimal amount is rejected"""
+        with pytest.raises(ValueError):
+            parse_amount(text)
+
+    def test_format_amount(self):
+        """Test formatting like the ledger's '${amount:.2f}'"""
+        assert format_amount(2000) == "$20.00"
+        assert format_amount(-150) == "$-1.50"
+        assert format_amount(5) == "$0.05"
+
+    def test_currency(self):
+        """Test that another currency sign can be parsed and written, or none at all"""
+        assert parse_amount("€12.50", currency="€") == 1250
+        assert parse_amount("12.50", currency="€") == 1250
+        with pytest.raises(ValueError):
+            parse_amount("$12.50", currency="€")
+        assert format_amount(-1250, currency="€") == "€-12.50"
+        assert format_amount(1250, currency="") == "12.50"
+
+    def test_parse_amounts(self, monkeypatch):
+        """Test that a column parses like each of its amounts, even past the cache size"""
+        texts = ["$20.00", "1.005", "$20.00", "-0.5", "3"]
+        assert parse_amounts(texts).tolist() == [parse_amount(text) for text in texts]
+        assert parse_amounts(iter(["$1.00"] * 3)).tolist() == [100] * 3
+        monkeypatch.setattr(src.record, "AMOUNT_CACHE", 0)
+        assert parse_amounts(["$123.45", "$678.90"]).tolist() == [12345, 67890]
+        with pytest.raises(ValueError):
+            parse_amounts(["$1.00", "abc"])
+
+    @pytest.mark.parametrize("cents, count, mean", [(250, 2, 125), (5, 2, 3), (-5, 2, -3), (10, 3, 3), (0, 0, 0)])
+    def test_divide_amount(self, cents, count, mean):
+        """Test integer means rounded half away from zero"""
+        assert divide_amount(cents, count) == mean
+
+
+class TestExpense:
+    """Test the Expense record"""
+
+    def test_parse_and_format_line(self):
+        """Test that a ledger line round-trips through Expense"""
+        expense = Expense.parse(LINES[0])
+        assert expense == Expense(parse_timestamp("2024-01-01 12:00:00"), "Food", 2000, "Lunch")
+        assert expense.to_line() + "\n" == LINES[0]
+
+    def test_parse_rejects_free_text(self):
+        """Test that lines that aren't expenses raise ValueError"""
+        with pytest.raises(ValueError):
+            Expense.parse(LINES[1])
+
+    def test_slots(self):
+        """Test that records don't carry a per-instance __dict__"""
+        with pytest.raises(AttributeError):
+            Expense(0, "Food", 1).note = "x"
+
+
+class TestExpenseTable:
+    """Test the columnar expense table"""
+
+    def test_from_lines(self):
+        """Test loading lines into columns, skipping non-expenses"""
+        table = ExpenseTable.from_lines(LINES)
+        assert len(table) == 3
+        assert list(table.amounts) == [2000, -150, 705]
+        assert list(table.line_numbers) == [1, 3, 4]
+        assert table.categories == ["Food", "Transport"]
+        assert list(table.category_codes) == [0, 1, 0]
+        assert table.description(2) == "Café"
+
+    def test_rows_and_lines(self):
+        """Test reading rows back as records and ledger lines"""
+        table = ExpenseTable.from_lines(LINES)
+        assert table[-1] == Expense.parse(LINES[3])
+        assert [line + "\n" for line in table.to_lines()] == [LINES[0], LINES[2], LINES[3]]
+
+    def test_append(self):
+        """Test appending records"""
+        table = ExpenseTable()
+        table.append(Expense(0, "Food", 100, "Tea"), line_number=7)
+        table.append(Expense(1, "Food", 200))
+        assert [expense.description for expense in table] == ["Tea", ""]
+        assert table.category_code("Food") == 0
+        assert list(table.line_numbers) == [7, 0]
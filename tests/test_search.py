@@ -0,0 +1,181 @@
+import pytest
+from src.search import KeywordIndex, tokenize, expense_tokens, LOG_SUFFIX
+import src.search
+
+LINES = [
+    "2024-01-01 12:00:00\tFood\t$20.00\tLunch with Sam",
+    "2024-01-01 18:00:00\tFood\t$10.00\tDinner",
+    "2024-01-02 08:00:00\tTransport\t$2.50\tBus fare",
+    "Coffee $5 at the station",
+]
+
+
+@pytest.fixture
+def ledger(tmp_path):
+    path = tmp_path / "ledger.txt"
+    path.write_text("\n".join(LINES) + "\n")
+    return path
+
+
+@pytest.fixture
+def index(ledger):
+    index = KeywordIndex(ledger)
+    index.rebuild(enumerate(LINES, 1))
+    return index
+
+
+class TestTokens:
+    """Test splitting text into keywords"""
+
+    def test_tokenize(self):
+        """Test lowercasing and splitting on punctuation"""
+        assert tokenize("Bus-fare, Lunch!") == {"bus", "fare", "lunch"}
+
+    def test_expense_tokens(self):
+        """Test that only category and description of an expense are indexed"""
+        assert expense_tokens(LINES[2]) == {"transport", "bus", "fare"}
+        assert expense_tokens(LINES[3]) == {"coffee", "5", "at", "the", "station"}
+
+
+class TestKeywordIndex:
+    """Test keyword and amount lookups"""
+
+    def test_lookup(self, index):
+        """Test that every word of the query must match"""
+        assert index.lookup("food") == [1, 2]
+        assert index.lookup("FOOD lunch") == [1]
+        assert index.lookup("coffee") == [4]
+        assert index.lookup("pizza") == []
+        assert index.lookup("") == []
+
+    def test_amount_range(self, index):
+        """Test finding lines by amount"""
+        assert index.amount_range(1000, 2000) == [1, 2]
+        assert index.amount_range(250, 250) == [3]
+        assert index.amount_range(1, 100) == []
+
+    def test_add_update_remove(self, index):
+        """Test keeping postings and line numbers current"""
+        index.add(5, "2024-01-03 09:00:00\tFood\t$10.00\tBreakfast")
+        index.update(2, LINES[1], "2024-01-01 18:00:00\tDrinks\t$7.00\tBar")
+        assert index.lookup("food") == [1, 5]
+        assert index.amount_range(1000, 1000) == [5]
+        index.remove(1, LINES[0])
+        assert index.lookup("food") == [4]
+        assert index.lookup("bar") == [1]
+        assert index.amount_range(0, 100000) == [1, 2, 4]
+        assert index.lookup("lunch") == []
+
+    def test_save_and_load(self, index, ledger):
+        """Test that logged changes are replayed on load"""
+        added = "2024-01-03 09:00:00\tFood\t$10.00\tBreakfast"
+        with ledger.open("a") as f:
+            f.write(added + "\n")
+        index.add(5, added)
+        index.save()
+        assert index.is_current()
+        assert ledger.with_name(ledger.name + LOG_SUFFIX).exists()
+        reloaded = KeywordIndex(ledger)
+        assert reloaded.load()
+        assert reloaded.lookup("breakfast") == [5]
+        assert reloaded.amount_range(1000, 1000) == [2, 5]
+
+    def test_catch_up_with_other_writer(self, index, ledger):
+        """Test that a loaded index replays only what another writer logged since"""
+        reader = KeywordIndex(ledger)
+        assert reader.load()
+        added = "2024-01-03 09:00:00\tFood\t$10.00\tBreakfast"
+        with ledger.open("a") as f:
+            f.write(added + "\n")
+        index.add(5, added)
+        index.save()
+        assert not reader.is_current()
+        assert reader.load()
+        assert reader.lookup("breakfast") == [5]
+        assert reader.lookup("food") == [1, 2, 5]
+
+    def test_log_compaction(self, index, ledger, monkeypatch):
+        """Test that a long log is folded back into the snapshot"""
+        monkeypatch.setattr(src.search, "LOG_LIMIT", 0)
+        index.add(5, "Tea")
+        index.save()
+        # Only the state of the new snapshot is left in the log
+        assert len(ledger.with_name(ledger.name + LOG_SUFFIX).read_text().splitlines()) == 1
+        reloaded = KeywordIndex(ledger)
+        assert reloaded.load()
+        assert reloaded.lookup("tea") == [5]
+
+    @pytest.mark.parametrize("attached", [False, True])
+    def test_long_append_run_is_not_logged(self, index, ledger, monkeypatch, attached):
+        """Test that past the log limit a run of appends goes to the snapshot, or is left for a rebuild"""
+        monkeypatch.setattr(src.search, "LOG_LIMIT", 3)
+        appender = KeywordIndex(ledger)
+        assert appender.attach() if attached else appender.load()
+        for line_number in range(5, 11):
+            with ledger.open("a") as f:
+                f.write(f"Tea {line_number}\n")
+            appender.add(line_number, f"Tea {line_number}")
+            appender.checkpoint()
+        appender.save()
+        log = ledger.with_name(ledger.name + LOG_SUFFIX).read_text()
+        assert "Tea 9" not in log and "Tea 10" not in log
+        reloaded = KeywordIndex(ledger)
+        assert reloaded.load() != attached
+        if not attached:
+            assert reloaded.lookup("tea") == list(range(5, 11))
+
+    @pytest.mark.parametrize("tail", [0, 100])
+    def test_amount_tail(self, index, monkeypatch, tail):
+        """Test that amounts added recently are found and removed whether or not they were merged yet"""
+        monkeypatch.setattr(src.search, "AMOUNT_TAIL", tail)
+        index.add(5, "2024-01-03 09:00:00\tFood\t$10.00\tBreakfast")
+        index.add(6, "2024-01-03 10:00:00\tFood\t$1.00\tTea")
+        assert index.amount_range(100, 100) == [6]
+        assert index.amount_range(1000, 1000) == [2, 5]
+        index.remove(1, LINES[0])
+        assert index.amount_range(100, 100) == [5]
+        assert index.amount_range(1000, 1000) == [1, 4]
+        index.remove(5, "2024-01-03 10:00:00\tFood\t$1.00\tTea", renumber=False)
+        assert index.amount_range(100, 100) == []
+
+    def test_merged_amounts_stay_sorted(self, index, monkeypatch):
+        """Test that a tail merged into the arrays keeps them sorted by amount, then line"""
+        monkeypatch.setattr(src.search, "AMOUNT_TAIL", 3)
+        for line_number, cents in enumerate([1000, 5, 99999, 250, 1000, 5, 300], 5):
+            index.add(line_number, f"2024-01-04 09:00:00\tFood\t${cents // 100}.{cents % 100:02d}\tSnack")
+        index._merge_amounts()
+        pairs = list(zip(index._amounts, index._amount_lines))
+        assert pairs == sorted(pairs) and len(pairs) == 10
+        assert index.amount_range(1000, 1000) == [2, 5, 9]
+
+    def test_attach_logs_appends(self, index, ledger):
+        """Test that an attached index logs appends without reading the snapshot"""
+        attached = KeywordIndex(ledger)
+        assert attached.attach()
+        assert attached.lookup("food") == []  # Nothing was loaded
+        added = "2024-01-03 09:00:00\tFood\t$10.00\tBreakfast"
+        with ledger.open("a") as f:
+            f.write(added + "\n")
+        attached.add(5, added)
+        attached.save()
+        reloaded = KeywordIndex(ledger)
+        assert reloaded.load()
+        assert reloaded.lookup("breakfast") == [5]
+        assert reloaded.lookup("food") == [1, 2, 5]
+
+    def test_attach_rejects_stale_log(self, index, ledger):
+        """Test that attaching fails once the ledger moved past the logged state"""
+        with ledger.open("a") as f:
+            f.write("Tea\n")
+        assert not KeywordIndex(ledger).attach()
+
+    def test_attach_rejects_long_log(self, index, ledger, monkeypatch):
+        """Test that a long log is left for a full load to fold into the snapshot"""
+        monkeypatch.setattr(src.search, "ATTACH_LOG_BYTES", 0)
+        assert not KeywordIndex(ledger).attach()
+
+    def test_stale_after_external_change(self, index, ledger):
+        """Test that the index is rejected once the ledger changes"""
+        ledger.write_text("Tea\n")
+        assert not index.is_current()
+        assert not KeywordIndex(ledger).load()
@@ -0,0 +1,128 @@
+import pytest
+
+from src.expense import ExpenseTracker
+from src.record import Expense
+from src.segments import Segment, SegmentedBackend
+from src.summary import Summary
+
+DAY = 86400
+
+
+def expenses(count: int, first_day: int = 0) -> list:
+    return [Expense((first_day + day) * DAY, "Food" if day % 2 else "Rent", 100 * (day + 1), f"item {day}").to_line()
+            for day in range(count)]
+
+
+@pytest.fixture
+def backend(tmp_path):
+    """A segmented backend sealing every 3 lines, holding 7 expenses and a free-text line"""
+    backend = SegmentedBackend(tmp_path / "ledger.seg", segment_rows=3)
+    backend.append(expenses(7) + ["just a note"])
+    yield backend
+    backend.close()
+
+
+def names(backend) -> list:
+    return sorted(path.name for path in backend.path.iterdir() if path.name[0].isdigit())
+
+
+class TestSegmentedBackend:
+    """Test the compressed, rotating segment storage backend"""
+
+    def test_rotation_by_rows(self, backend):
+        """Test that full segments are sealed and lines keep their numbers across them"""
+        assert names(backend) == ["000001.seg", "000002.seg", "000003.txt"]
+        assert len(backend) == 8
+        assert backend.read(4) == expenses(7)[3]
+        assert list(backend.iter_lines(3, 5)) == [line + "\n" for line in expenses(7)[2:5]]
+        assert list(backend.iter_lines())[-1] == "just a note\n"
+        with pytest.raises(ValueError):
+            backend.read(9)
+
+    def test_rotation_by_month(self, tmp_path):
+        """Test that with by_month a segment is sealed when an expense of another month arrives"""
+        backend = SegmentedBackend(tmp_path / "ledger.seg", by_month=True, codec="lzma")
+        backend.append(expenses(3, 29) + ["note"] + expenses(2, 59))
+        assert names(backend) == ["000001.seg", "000002.seg", "000003.txt"]
+        assert [segment.rows for segment in backend._sealed] == [2, 2]
+        assert backend._sealed[0].footer["codec"] == "lzma"
+        assert len(backend) == 6
+
+    def test_queries_match_a_text_ledger(self, backend, tmp_path):
+        """Test that footers and skipped segments give the same answers as reading every line"""
+        tracker = ExpenseTracker("ledger.txt", tmp_path)
+        tracker.add_expenses(list(backend.iter_lines()))
+        assert backend.summary("month") == tracker.summary("month")
+        assert backend.summary("category") == tracker.summary("category")
+        assert backend.totals() == {"Food": Summary(3, 1200), "Rent": Summary(4, 1600)}
+        assert list(backend.lookup("item 5")) == [(6, expenses(7)[5])]
+        assert list(backend.lookup("note")) == [(8, "just a note")]
+        assert list(backend.amount_range(300, 400)) == [(3, expenses(7)[2]), (4, expenses(7)[3])]
+        assert list(backend.time_range(4 * DAY, 6 * DAY)) == [(5, expenses(7)[4]), (6, expenses(7)[5])]
+
+    def test_skipped_segments_are_not_read(self, backend, monkeypatch):
+        """Test that a sealed segment the footer rules out is never decompressed"""
+        monkeypatch.setattr(Segment, "lines", lambda segment: pytest.fail(f"{segment.path.name} was read"))
+        assert list(backend.time_range(6 * DAY, 7 * DAY)) == [(7, expenses(7)[6])]
+        assert list(backend.lookup("nothing")) == []
+        assert backend.summary("day")
+
+    def test_remove_and_update(self, backend):
+        """Test that changing a line rewrites its segment and renumbers the ones after it"""
+        backend.remove(2)
+        assert backend.read(2) == expenses(7)[2]
+        assert len(backend) == 7
+        backend.update(6, "changed")
+        backend.update(7, "also changed")
+        assert list(backend.iter_lines(5)) == [expenses(7)[5] + "\n", "changed\n", "also changed\n"]
+        assert backend.summary("category")["Rent"].count == 3
+        backend.remove(1)
+        backend.remove(1)
+        assert names(backend) == ["000002.seg", "000003.txt"]
+        assert backend.read(1) == expenses(7)[3]
+        with pytest.raises(ValueError):
+            backend.update(1, "two\nlines")
+
+    def test_reopen_and_clear(self, backend):
+        """Test that another backend on the directory sees the segments, and clearing empties it"""
+        backend.append(["one more"])
+        reopened = SegmentedBackend(backend.path, segment_rows=3)
+        assert len(reopened) == 9
+        assert reopened.read(9) == "one more"
+        reopened.append(["and another"])
+        assert backend.read(10) == "and another"
+        reopened.close()
+        backend.clear()
+        assert len(backend) == 0 and names(backend) == []
+        assert list(backend.iter_lines()) == []
+
+    def test_unfinished_seal_is_cleaned(self, backend):
+        """Test that an active segment left next to its sealed copy is dropped on open"""
+        (backend.path / "000002.txt").write_text("stale\n")
+        reopened = SegmentedBackend(backend.path, segment_rows=3)
+        assert len(reopened) == 8
+        assert "000002.txt" not in names(reopened)
+        reopened.close()
+
+    def test_unknown_codec(self, tmp_path):
+        with pytest.raises(ValueError):
+            SegmentedBackend(tmp_path / "ledger.seg", codec="snappy")
+
+
+class TestSegmentedTracker:
+    """Test an ExpenseTracker kept in segments"""
+
+    def test_suffix_selects_segments(self, tmp_path):
+        tracker = ExpenseTracker("ledger.seg", tmp_path)
+        tracker.add_expense(Expense(0, "Food", 250, "Coffee"))
+        assert isinstance(tracker._backend, SegmentedBackend)
+        assert tracker.find_expense(1) == Expense(0, "Food", 250, "Coffee").to_line()
+
+    def test_configured_backend(self, tmp_path):
+        """Test that a tracker can be given a backend with its own settings"""
+        tracker = ExpenseTracker(backend=SegmentedBackend(tmp_path / "ledger.seg", segment_rows=2))
+        tracker.add_expenses(expenses(5))
+        assert tracker.get_total_lines() == 5
+        assert list(tracker.search("item 4")) == [(5, expenses(5)[4])]
+        assert tracker.summary("category") == {"Rent": Summary(3, 900, 100, 500), "Food": Summary(2, 600, 200, 400)}
+        assert len(names(tracker._backend)) == 3
@@ -0,0 +1,98 @@
+import pytest
+
+from src.expense import ExpenseTracker
+from src.record import Expense, ExpenseTable
+from src.snapshot import Snapshot, write_snapshot
+from src.summary import summarize
+
+
+@pytest.fixture
+def table():
+    """A small table with repeated categories and an empty description"""
+    table = ExpenseTable()
+    table.append(Expense(0, "Food", 250, "Coffee"))
+    table.append(Expense(86400, "Travel", -1200, ""))
+    table.append(Expense(172800, "Food", 999, "Café au lait"))
+    return table
+
+
+class TestSnapshot:
+    """Test writing and memory-mapping binary snapshots"""
+
+    def test_round_trip(self, table, tmp_path):
+        """Test that every row reads back unchanged"""
+        write_snapshot(table, tmp_path / "ledger.snap")
+        with Snapshot(tmp_path / "ledger.snap", verify=True) as snapshot:
+            assert len(snapshot) == 3
+            assert list(snapshot) == list(table)
+            assert list(snapshot.to_lines()) == list(table.to_lines())
+            assert isinstance(snapshot.amounts, memoryview)
+
+    def test_summarize(self, table, tmp_path):
+        """Test that a snapshot can be summarised like any table"""
+        write_snapshot(table, tmp_path / "ledger.snap")
+        with Snapshot(tmp_path / "ledger.snap") as snapshot:
+            assert summarize(snapshot, "category") == summarize(table, "category")
+            assert summarize(snapshot, "day") == summarize(table, "day")
+
+    def test_empty(self, tmp_path):
+        """Test that an empty table makes a valid snapshot"""
+        write_snapshot(ExpenseTable(), tmp_path / "empty.snap")
+        with Snapshot(tmp_path / "empty.snap", verify=True) as snapshot:
+            assert len(snapshot) == 0
+            assert list(snapshot) == []
+
+    def test_empty_category(self, table, tmp_path):
+        """Test that a table whose only category is empty keeps it"""
+        only_empty = ExpenseTable.from_lines(["2024-01-01 12:00:00\t\t$1.00\tx"])
+        write_snapshot(only_empty, tmp_path / "empty.snap")
+        with Snapshot(tmp_path / "empty.snap", verify=True) as snapshot:
+            assert snapshot.categories == [""]
+            assert snapshot[0] == only_empty[0]
+
+    def test_read_only(self, table, tmp_path):
+        """Test that rows can't be added to a snapshot"""
+        write_snapshot(table, tmp_path / "ledger.snap")
+        with Snapshot(tmp_path / "ledger.snap") as snapshot:
+            with pytest.raises(TypeError):
+                snapshot.append(Expense(0, "Food", 1))
+
+    def test_rejects_bad_files(self, table, tmp_path):
+        """Test that foreign, truncated and corrupt files are refused"""
+        path = tmp_path / "ledger.snap"
+        path.write_bytes(b"not a snapshot at all, not even close to one")
+        with pytest.raises(ValueError):
+            Snapshot(path)
+        write_snapshot(table, path)
+        data = path.read_bytes()
+        path.write_bytes(data[:-1])
+        with pytest.raises(ValueError):
+            Snapshot(path)
+        path.write_bytes(data[:-1] + bytes([data[-1] ^ 1]))
+        Snapshot(path).close()  # Only verification reads the body
+        with pytest.raises(ValueError):
+            Snapshot(path, verify=True)
+
+
+class TestTrackerSnapshots:
+    """Test converting ledgers to and from snapshots"""
+
+    def test_export_and_import(self, tmp_path):
+        """Test that a ledger converts to a snapshot and back without loss"""
+        tracker = ExpenseTracker(file_path="ledger.txt", directory=tmp_path)
+        lines = [Expense(0, "Food", 250, "Coffee").to_line(), Expense(60, "Rent", 80000, "May").to_line()]
+        tracker.add_expenses(lines)
+        path = tracker.export_snapshot()
+        assert path == tmp_path / "ledger.txt.snap"
+        with tracker.open_snapshot() as snapshot:
+            assert list(snapshot.to_lines()) == lines
+        other = ExpenseTracker(file_path="copy.txt", directory=tmp_path)
+        other.import_snapshot(path)
+        assert other.get_expenses() == tracker.get_expenses()
+
+    def test_export_rejects_free_text(self, tmp_path):
+        """Test that lines which aren't expenses aren't silently dropped"""
+        tracker = ExpenseTracker(file_path="notes.txt", directory=tmp_path)
+        tracker.add_expenses(["just a note"])
+        with pytest.raises(ValueError):
+            tracker.export_snapshot()
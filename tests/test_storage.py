@@ -0,0 +1,120 @@
+import pytest
+
+from src.expense import ExpenseTracker
+from src.record import Expense
+from src.storage import SQLiteBackend
+from src.summary import Summary
+
+
+@pytest.fixture
+def backend(tmp_path):
+    """An SQLite backend holding two expenses and a free-text line"""
+    backend = SQLiteBackend(tmp_path / "ledger.db")
+    backend.append([Expense(0, "Food", 250, "Morning coffee").to_line(),
+                    "just a note",
+                    Expense(86400 * 40, "Travel", 1200, "Train ticket").to_line()])
+    yield backend
+    backend.close()
+
+
+class TestSQLiteBackend:
+    """Test the SQLite storage backend"""
+
+    def test_lines_keep_their_order(self, backend):
+        """Test that lines are numbered in the order they were added"""
+        assert len(backend) == 3
+        assert backend.read(2) == "just a note"
+        assert list(backend.iter_lines(2, 3))[0] == "just a note\n"
+        assert len(list(backend.iter_lines())) == 3
+
+    def test_remove_and_update_renumber(self, backend):
+        """Test that removing a line shifts the ones after it"""
+        backend.remove(1)
+        assert backend.read(1) == "just a note"
+        backend.update(1, "another note")
+        assert list(backend.iter_lines()) == ["another note\n", backend.read(2) + "\n"]
+        with pytest.raises(ValueError):
+            backend.read(3)
+        with pytest.raises(ValueError):
+            backend.update(1, "two\nlines")
+
+    def test_lookup_and_amount_range(self, backend):
+        """Test that keyword and amount searches use the line numbering"""
+        assert [number for number, _ in backend.lookup("train TICKET")] == [3]
+        assert list(backend.lookup("note")) == [(2, "just a note")]
+        assert [number for number, _ in backend.amount_range(1000, 2000)] == [3]
+        backend.remove(2)
+        assert [number for number, _ in backend.amount_range(0, 2000)] == [1, 2]
+
+    def test_time_range(self, backend):
+        """Test that a time range skips free text and excludes its end"""
+        assert [number for number, _ in backend.time_range(0, 86400 * 40)] == [1]
+        assert [number for number, _ in backend.time_range(0, 86400 * 40 + 1)] == [1, 3]
+        assert list(backend.time_range(1, 2)) == []
+
+    def test_summary(self, backend):
+        """Test grouping in SQL, with days rolled up into months"""
+        assert backend.summary("category") == {"Food": Summary(1, 250, 250, 250),
+                                               "Travel": Summary(1, 1200, 1200, 1200)}
+        assert set(backend.summary("month")) == {"1970-01", "1970-02"}
+        assert backend.totals("category")["Food"] == Summary(1, 250)
+        with pytest.raises(ValueError):
+            backend.totals("day")
+
+    def test_persisted(self, backend, tmp_path):
+        """Test that a reopened database holds the same lines"""
+        backend.close()
+        reopened = SQLiteBackend(tmp_path / "ledger.db")
+        assert reopened.read(2) == "just a note"
+        reopened.close()
+
+    def test_numbers_stay_dense(self, backend):
+        """Test that line numbers are kept in the database as lines come and go"""
+        backend.append(["fourth", "fifth"])
+        backend.remove(2)
+        backend.append(["sixth"])
+        numbers = backend._connection.execute("SELECT number FROM expenses ORDER BY id").fetchall()
+        assert [number for (number,) in numbers] == [1, 2, 3, 4, 5]
+        assert backend.read(5) == "sixth"
+        assert list(backend.lookup("fifth")) == [(4, "fifth")]
+
+
+class TestTrackerBackends:
+    """Test selecting a storage backend for ExpenseTracker"""
+
+    def test_selected_by_extension(self, tmp_path):
+        """Test that a .db ledger is stored in SQLite"""
+        tracker = ExpenseTracker(file_path="ledger.db", directory=tmp_path)
+        tracker.add_expenses(["Coffee", "Lunch"])
+        assert tracker.get_total_lines() == 2
+        assert tracker.find_expense(2) == "Lunch"
+        assert tracker.remove_expense(1)
+        assert tracker.get_expenses() == ["Lunch\n"]
+        tracker.close()
+
+    def test_selected_by_argument(self, tmp_path):
+        """Test that the backend argument overrides the extension"""
+        tracker = ExpenseTracker(file_path="ledger.txt", directory=tmp_path, backend="sqlite")
+        tracker.add_expense(Expense(0, "Food", 100, "Tea"))
+        tracker.update_expense(1, Expense(0, "Food", 300, "Green tea").to_line())
+        assert list(tracker.search("green")) == [(1, Expense(0, "Food", 300, "Green tea").to_line())]
+        assert list(tracker.search("GREEN", substring=True))[0][0] == 1
+        assert tracker.totals() == {"Food": Summary(1, 300)}
+        assert tracker.summary() == {"Food": Summary(1, 300, 300, 300)}
+        tracker.close()
+
+    def test_update_refreshes_count(self, tmp_path):
+        """Test that an update picks up lines another connection added, like adds and removes do"""
+        tracker = ExpenseTracker(file_path="ledger.db", directory=tmp_path)
+        tracker.add_expense("Coffee")
+        other = SQLiteBackend(tmp_path / "ledger.db")
+        other.append(["Lunch"])
+        other.close()
+        tracker.update_expense(1, "Tea")
+        assert tracker.get_total_lines() == 2
+        tracker.close()
+
+    def test_unknown_backend(self, tmp_path):
+        """Test that an unknown backend name is rejected"""
+        with pytest.raises(ValueError):
+            ExpenseTracker(file_path="ledger.txt", directory=tmp_path, backend="csv")
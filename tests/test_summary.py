@@ -0,0 +1,158 @@
+import pytest
+from src.record import ExpenseTable
+from src.summary import Summary, SummaryCache, summarize, merge_summaries, bucket_label
+
+LINES = [
+    "2024-01-01 12:00:00\tFood\t$20.00\tLunch",
+    "2024-01-01 18:00:00\tFood\t$10.00\tDinner",
+    "2024-01-08 08:00:00\tTransport\t$2.50\tBus",
+    "2024-02-01 09:00:00\tFood\t$5.00\tCoffee",
+    "not an expense",
+]
+
+
+@pytest.fixture
+def table():
+    return ExpenseTable.from_lines(LINES)
+
+
+class TestSummary:
+    """Test the Summary accumulator"""
+
+    def test_of_and_mean(self):
+        """Test summarising a group of amounts"""
+        summary = Summary.of([100, 300, 200])
+        assert summary == Summary(3, 600, 100, 300)
+        assert summary.mean == 200 and isinstance(summary.mean, int)
+        assert Summary.of([5, -10, 10]).mean == 2  # 5 / 3 cents
+        assert Summary.of([1, 2]).mean == 2  # Half a cent rounds away from zero
+
+    def test_merge(self):
+        """Test folding summaries together, including empty ones"""
+        summary = Summary().merge(Summary.of([5])).merge(Summary()).merge(Summary.of([-5, 20]))
+        assert summary == Summary(3, 20, -5, 20)
+
+    def test_empty_mean(self):
+        """Test that an empty summary has a zero mean"""
+        assert Summary().mean == 0
+
+
+class TestSummarize:
+    """Test grouping a table"""
+
+    def test_by_category(self, table):
+        """Test totals per category"""
+        result = summarize(table)
+        assert result == {"Food": Summary(3, 3500, 500, 2000), "Transport": Summary(1, 250, 250, 250)}
+
+    def test_by_day(self, table):
+        """Test totals per day"""
+        result = summarize(table, by="day")
+        assert result["2024-01-01"] == Summary(2, 3000, 1000, 2000)
+        assert len(result) == 3
+
+    def test_by_week(self, table):
+        """Test totals per ISO week"""
+        result = summarize(table, by="week")
+        assert set(result) == {"2024-W01", "2024-W02", "2024-W05"}
+
+    def test_by_month(self, table):
+        """Test totals per month"""
+        result = summarize(table, by="month")
+        assert result == {"2024-01": Summary(3, 3250, 250, 2000), "2024-02": Summary(1, 500, 500, 500)}
+
+    def test_unknown_grouping(self, table):
+        """Test that an unknown grouping is rejected"""
+        with pytest.raises(ValueError):
+            summarize(table, by="year")
+
+    def test_merge_chunks(self):
+        """Test that summarising chunks separately gives the same result"""
+        first = summarize(ExpenseTable.from_lines(LINES[:2]))
+        second = summarize(ExpenseTable.from_lines(LINES[2:]))
+        assert merge_summaries(first, second) == summarize(ExpenseTable.from_lines(LINES))
+
+    def test_bucket_label(self):
+        """Test labels of time buckets"""
+        assert bucket_label(0, "day") == "1970-01-01"
+        assert bucket_label(0, "week") == "1970-W01"
+        assert bucket_label(31, "month") == "1970-02"
+
+
+class TestSummaryCache:
+    """Test the persisted running totals"""
+
+    @pytest.fixture
+    def ledger(self, tmp_path):
+        path = tmp_path / "ledger.txt"
+        path.write_text("\n".join(LINES) + "\n")
+        return path
+
+    def test_rebuild_and_load(self, ledger):
+        """Test that rebuilt totals are persisted and reloaded"""
+        cache = SummaryCache(ledger)
+        assert not cache.load()
+        cache.rebuild([ExpenseTable.from_lines(LINES)])
+        reloaded = SummaryCache(ledger)
+        assert reloaded.load()
+        assert reloaded.totals("month") == {"2024-01": Summary(3, 3250), "2024-02": Summary(1, 500)}
+
+    def test_stale_after_external_change(self, ledger):
+        """Test that the sidecar is rejected once the ledger changes"""
+        SummaryCache(ledger).rebuild([ExpenseTable.from_lines(LINES)])
+        with ledger.open("a") as f:
+            f.write(LINES[0] + "\n")
+        cache = SummaryCache(ledger)
+        assert not cache.load()
+
+    def test_add_and_remove(self, ledger):
+        """Test adjusting the counters, dropping groups that become empty"""
+        cache = SummaryCache(ledger)
+        table = ExpenseTable.from_lines(LINES)
+        cache.add(table[0])
+        cache.add(table[2])
+        cache.remove(table[2])
+        assert cache.totals() == {"Food": Summary(1, 2000)}
+        with pytest.raises(ValueError):
+            cache.totals("day")
+
+    def test_extremes(self, ledger):
+        """Test that minimum and maximum are kept until a removal takes one of them away"""
+        cache = SummaryCache(ledger)
+        cache.rebuild([ExpenseTable.from_lines(LINES)])
+        table = ExpenseTable.from_lines(LINES)
+        cache.add(table[3])
+        assert cache.summaries("category")["Food"] == Summary(4, 4000, 500, 2000)
+        cache.remove(table[1])
+        assert cache.summaries("category")["Food"] == Summary(3, 3000, 500, 2000)
+        cache.remove(table[0])
+        assert cache.summaries("category") is None
+        assert cache.totals()["Food"] == Summary(2, 1000)
+
+    def test_saves_append_changes(self, ledger, table, monkeypatch):
+        """Test that a save appends the changed groups, and the sidecar is rewritten past the limit"""
+        monkeypatch.setattr("src.summary.SUMMARY_LOG_LIMIT", 2)
+        SummaryCache(ledger).rebuild([table])
+        cache = SummaryCache(ledger)
+        assert cache.load()
+        for count in range(1, 4):
+            cache.add(table[2])
+            with ledger.open("a") as f:
+                f.write(LINES[2] + "\n")
+            cache.save()
+            reloaded = SummaryCache(ledger)
+            assert reloaded.load()
+            assert reloaded.totals() == cache.totals()
+            assert reloaded.summaries("day")["2024-01-08"] == Summary(1 + count, 250 * (1 + count), 250, 250)
+            assert len(cache.path.read_text().splitlines()) == [2, 3, 1][count - 1]
+            if count < 3:
+                assert "2024-02-01" not in cache.path.read_text().splitlines()[-1]  # Only the changed day
+
+    @pytest.mark.parametrize("by", ["category", "day", "week", "month"])
+    def test_summaries_roll_up_days(self, ledger, table, by):
+        """Test that cached days roll up into the same weeks and months as a full summary"""
+        cache = SummaryCache(ledger)
+        cache.rebuild([table])
+        assert cache.summaries(by) == summarize(table, by)
+        with pytest.raises(ValueError):
+            cache.summaries("year")
@@ -0,0 +1,110 @@
+import pytest
+
+from src import transfer
+from src.expense import ExpenseTracker
+from src.record import Expense
+from src.transfer import TransferReport, ledger_line, read_columnar, read_rows, transfer_format
+
+
+@pytest.fixture
+def tracker(tmp_path):
+    """A ledger of a few expenses, one of them with a comma and quotes in the description"""
+    tracker = ExpenseTracker("ledger.txt", tmp_path)
+    tracker.add_expenses([
+        Expense(0, "Food", 250, "Coffee"),
+        Expense(86400, "Travel", -1200),
+        Expense(172800, "Food", 999, 'Café, "au lait"'),
+    ])
+    return tracker
+
+
+class TestTransfer:
+    """Test importing and exporting CSV, JSONL and columnar files"""
+
+    @pytest.mark.parametrize("suffix", [".csv", ".jsonl", ".cols"])
+    def test_round_trip(self, tracker, tmp_path, suffix):
+        """Test that an exported ledger imports back unchanged"""
+        report = tracker.export_to(tmp_path / f"dump{suffix}")
+        assert (report.rows, report.skipped) == (3, 0)
+        copy = ExpenseTracker("copy.txt", tmp_path)
+        report = copy.import_from(tmp_path / f"dump{suffix}")
+        assert (report.rows, report.skipped) == (3, 0)
+        assert copy.get_expenses() == tracker.get_expenses()
+
+    def test_csv_columns(self, tmp_path):
+        """Test that CSV columns are found by name and the description may be missing"""
+        path = tmp_path / "in.csv"
+        path.write_text("amount,category,timestamp\n12.5,Food,2024-01-02 03:04:05\n")
+        tracker = ExpenseTracker("ledger.txt", tmp_path)
+        tracker.import_from(path)
+        assert tracker.get_expenses() == ["2024-01-02 03:04:05\tFood\t$12.50\t\n"]
+        path.write_text("when,category,amount\n")
+        with pytest.raises(ValueError, match="header"):
+            tracker.import_from(path)
+
+    def test_invalid_rows(self, tmp_path):
+        """Test that invalid rows raise by default and are counted when skipped"""
+        path = tmp_path / "in.jsonl"
+        path.write_text(
+            '{"timestamp": "2024-01-02 03:04:05", "category": "Food", "amount": 3}\n'
+            '{"timestamp": "2024-01-02", "category": "Food", "amount": "1"}\n'
+            '\n'
+            '{"timestamp": "2024-01-02 03:04:05", "category": "Food", "amount": "abc"}\n'
+            '{"timestamp": "2024-01-02 03:04:05", "category": "Food", "amount": 1, "description": "a\\tb"}\n'
+            '[1, 2]\n'
+            'not json\n'
+            '{"timestamp": "2024-01-03 00:00:00", "category": "Rent", "amount": "-2.25"}\n'
+        )
+        tracker = ExpenseTracker("ledger.txt", tmp_path)
+        with pytest.raises(ValueError, match="Row 2"):
+            tracker.import_from(path)
+        tracker.clear_expenses()
+        report = tracker.import_from(path, errors="skip")
+        assert (report.rows, report.skipped) == (2, 5)
+        assert tracker.get_expenses() == ["2024-01-02 03:04:05\tFood\t$3.00\t\n",
+                                          "2024-01-03 00:00:00\tRent\t$-2.25\t\n"]
+
+    def test_export_free_text(self, tracker, tmp_path):
+        """Test that lines which aren't expenses raise or are skipped on export"""
+        tracker.add_expense("A note")
+        for suffix in (".csv", ".cols"):
+            with pytest.raises(ValueError, match="Line 4"):
+                tracker.export_to(tmp_path / f"dump{suffix}")
+            report = tracker.export_to(tmp_path / f"dump{suffix}", errors="skip")
+            assert (report.rows, report.skipped) == (3, 1)
+
+    def test_columnar_groups(self, tracker, tmp_path, monkeypatch):
+        """Test that a columnar dump is written and read one row group at a time"""
+        monkeypatch.setattr(transfer, "ROW_GROUP", 2)
+        tracker.export_to(tmp_path / "dump.cols")
+        tables = list(read_columnar(tmp_path / "dump.cols"))
+        assert [len(table) for table in tables] == [2, 1]
+        assert [line for table in tables for line in table.to_lines()] == [
+            line.rstrip("\n") for line in tracker.get_expenses()]
+        (tmp_path / "bad.cols").write_bytes(b"EXPCOL02" + b"\x01" * 10)
+        with pytest.raises(ValueError, match="Truncated"):
+            list(read_rows(tmp_path / "bad.cols", "columnar", "raise", TransferReport()))
+
+    def test_columnar_empty_category(self, tmp_path, monkeypatch):
+        """Test that a row group whose only category is empty imports back"""
+        monkeypatch.setattr(transfer, "ROW_GROUP", 1)
+        line = "2024-01-01 12:00:00\t\t$1.00\tx"
+        source = ExpenseTracker("source.txt", tmp_path)
+        source.add_expenses([line, Expense(0, "Food", 250, "Coffee").to_line()])
+        source.export_to(tmp_path / "dump.cols")
+        copy = ExpenseTracker("copy.txt", tmp_path)
+        copy.import_from(tmp_path / "dump.cols")
+        assert copy.get_expenses() == source.get_expenses()
+
+    def test_format(self):
+        assert transfer_format("a.CSV") == "csv"
+        assert transfer_format("a.txt", "jsonl") == "jsonl"
+        with pytest.raises(ValueError, match="Unknown format"):
+            transfer_format("a.txt")
+
+    def test_ledger_line(self):
+        assert ledger_line("2024-01-02 03:04:05", "Food", 1.5, "Tea ") == "2024-01-02 03:04:05\tFood\t$1.50\tTea"
+        with pytest.raises(ValueError, match="Missing category"):
+            ledger_line("2024-01-02 03:04:05", "", "1")
+        with pytest.raises(ValueError, match="must be text"):
+            ledger_line("2024-01-02 03:04:05", None, "1")